@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Participant Aggregates
+Materialized count/moment tables that back every dashboard metric
+"""
+
+import numpy as np
+import pandas as pd
+
+# Aggregate tables and the dimensions each one is grouped by. Missing values
+# of label dimensions are counted under UNKNOWN; rows with no date or rating
+# are left out of the tables grouped by those.
+CUBE_TABLES = {
+    'core': ['category', 'payment_status', 'attendance_day1', 'attendance_day2',
+             'institution', 'specialty'],
+    'profile': ['qualification', 'hta_knowledge', 'designation', 'experience_band'],
+    'timeline': ['registration_date', 'payment_status'],
+    'rating': ['feedback_rating'],
+}
+
+# Numeric columns summarised as count / sum / sum of squares in every cell
+MEASURES = ['quiz_score', 'feedback_rating']
+
+EXPERIENCE_BINS = [0, 2, 5, 10, 15, 20]
+EXPERIENCE_LABELS = ['0-2 years', '3-5 years', '6-10 years', '11-15 years', '15+ years']
+
+UNKNOWN = 'Unknown'
+
+QUIZ_HISTOGRAM_BINS = 10
+MAX_BOXPLOT_FLIERS = 500
+
+
+def _with_unknown(codes, labels):
+    """Point missing (-1) codes at an UNKNOWN label, adding it when needed
+
+    Only text labels get one; dates and ratings keep -1.
+    """
+    categories = getattr(labels, 'categories', labels)
+    if not (codes < 0).any() or not pd.api.types.is_string_dtype(categories):
+        return codes, labels
+    if UNKNOWN in categories:
+        unknown = categories.get_loc(UNKNOWN)
+    else:
+        unknown = len(categories)
+        categories = categories.append(pd.Index([UNKNOWN]))
+        labels = (pd.CategoricalDtype(categories, ordered=labels.ordered)
+                  if isinstance(labels, pd.CategoricalDtype) else categories)
+    return np.where(codes < 0, unknown, codes), labels
+
+
+def _dimension_codes(df, dim):
+    """Return (integer codes, labels) for one cube dimension
+
+    Labels are a CategoricalDtype for categorical dimensions and a plain
+    Index of values (dates, ratings) otherwise. Missing text values are
+    coded as UNKNOWN; missing dates and ratings as -1.
+    """
+    if dim == 'experience_band':
+        band = pd.cut(df['experience_years'], bins=EXPERIENCE_BINS, labels=EXPERIENCE_LABELS,
+                      include_lowest=True)
+        return _with_unknown(band.cat.codes.to_numpy(), band.dtype)
+    column = df[dim]
+    if dim == 'registration_date':
+        column = column.dt.normalize()
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return _with_unknown(column.cat.codes.to_numpy(), column.dtype)
+    codes, uniques = pd.factorize(column, sort=True)
+    return _with_unknown(codes, pd.Index(uniques))
+
+
+def _group_table(df, dims, measures):
+    """Count rows and accumulate measure moments for every occupied cell
+
+    The cell key is built by re-factorizing (key so far, next code) one
+    dimension at a time, so it never exceeds the number of rows however
+    many labels the dimensions have. Factorizing sorted keeps the cells in
+    dimension order.
+    """
+    codes, labels = zip(*(_dimension_codes(df, dim) for dim in dims))
+    rows = np.flatnonzero(np.logical_and.reduce([c >= 0 for c in codes]))
+    codes = [c[rows] for c in codes]
+    key = np.zeros(len(rows), dtype=np.int64)
+    for c, lab in zip(codes, labels):
+        key, _ = pd.factorize(key * len(getattr(lab, 'categories', lab)) + c, sort=True)
+    n_cells = int(key.max()) + 1 if len(key) else 0
+    # One row per cell to read the cell's dimension codes from
+    first = np.empty(n_cells, dtype=np.int64)
+    first[key[::-1]] = np.arange(len(key) - 1, -1, -1)
+
+    stats = {'count': np.bincount(key, minlength=n_cells)}
+    for measure in measures:
+        values = df[measure].to_numpy(dtype=float, na_value=np.nan)[rows]
+        valid = ~np.isnan(values)
+        k, v = key[valid], values[valid]
+        stats[f'{measure}_n'] = np.bincount(k, minlength=n_cells)
+        stats[f'{measure}_sum'] = np.bincount(k, weights=v, minlength=n_cells)
+        stats[f'{measure}_sumsq'] = np.bincount(k, weights=v * v, minlength=n_cells)
+
+    table = {}
+    for dim, c, lab in zip(dims, codes, labels):
+        if isinstance(lab, pd.CategoricalDtype):
+            table[dim] = pd.Categorical.from_codes(c[first], dtype=lab)
+        else:
+            table[dim] = lab.take(c[first])
+    table.update(stats)
+    return pd.DataFrame(table)
+
+
+def _quiz_distribution(scores):
+    """Histogram and box-plot statistics for the quiz score distribution"""
+    if len(scores) == 0:
+        return None
+    counts, edges = np.histogram(scores, bins=QUIZ_HISTOGRAM_BINS)
+    q1, median, q3 = np.percentile(scores, [25, 50, 75])
+    iqr = q3 - q1
+    inside = scores[(scores >= q1 - 1.5 * iqr) & (scores <= q3 + 1.5 * iqr)]
+    fliers = np.sort(scores[(scores < q1 - 1.5 * iqr) | (scores > q3 + 1.5 * iqr)])
+    if len(fliers) > MAX_BOXPLOT_FLIERS:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, MAX_BOXPLOT_FLIERS).astype(int)]
+    return {
+        'histogram': (counts, edges),
+        'boxplot': {
+            'med': median, 'q1': q1, 'q3': q3,
+            'whislo': inside.min(), 'whishi': inside.max(),
+            'fliers': fliers, 'mean': scores.mean(),
+        },
+        'max': scores.max(),
+    }
+
+
+class ParticipantCube:
+    """Pre-aggregated participant counts and measure moments
+
+    Every query runs against the small per-table cell frames, so its cost
+    depends on the number of groups rather than the number of participants.
+    """
+
+    def __init__(self, tables, total, measure_totals, quiz_distribution):
+        self.tables = tables
+        self.total = total
+        self.measure_totals = measure_totals
+        self.quiz_distribution = quiz_distribution
+
+    def _cells(self, dims, filters):
+        """Cells of the first table that covers the requested dimensions"""
+        wanted = set(dims) | set(filters)
+        for name, table_dims in CUBE_TABLES.items():
+            if wanted <= set(table_dims):
+                cells = self.tables[name]
+                break
+        else:
+            raise KeyError(f"No aggregate table covers dimensions {sorted(wanted)}")
+        for dim, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            cells = cells[cells[dim].isin(values)]
+        return cells
+
+    def count(self, **filters):
+        """Number of participants matching the filters"""
+        if not filters:
+            return self.total
+        dims = list(filters)[:1]
+        return int(self._cells(dims, filters)['count'].sum())
+
+    def counts(self, *dims, **filters):
+        """Participant counts by one or more dimensions, largest first"""
+        cells = self._cells(dims, filters)
+        grouped = cells.groupby(list(dims), observed=True)['count'].sum()
+        grouped = grouped[grouped > 0]
+        return grouped.sort_values(ascending=False, kind='stable')
+
+    def stats(self, measure, by, **filters):
+        """Mean, count and sample standard deviation of a measure per group"""
+        cells = self._cells([by], filters)
+        columns = [f'{measure}_n', f'{measure}_sum', f'{measure}_sumsq']
+        moments = cells.groupby(by, observed=True)[columns].sum()
+        n, total, sumsq = (moments[c] for c in columns)
+        mean = total / n.where(n > 0)
+        var = (sumsq - total * mean) / (n - 1).where(n > 1)
+        return pd.DataFrame({
+            'mean': mean,
+            'count': n.astype(int),
+            'std': np.sqrt(var.clip(lower=0)),
+        })
+
+    def overall(self, measure):
+        """(count, mean) of a measure across all participants"""
+        return self.measure_totals[measure]
+
+
+def build_participant_cube(df):
+    """Materialize every aggregate table for a participant frame"""
+    tables = {name: _group_table(df, dims, MEASURES) for name, dims in CUBE_TABLES.items()}
+    measure_totals = {}
+    for measure in MEASURES:
+        values = df[measure].to_numpy(dtype=float, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        measure_totals[measure] = (len(values), values.mean() if len(values) else float('nan'))
+        if measure == 'quiz_score':
+            scores = values
+    return ParticipantCube(tables, len(df), measure_totals, _quiz_distribution(scores))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Live Attendance
+Headcounts by day, category and institution kept current from the check-in event log
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from checkin import ATTENDANCE_COLUMNS, CHECKIN_LOG, apply_attendance
+from registration_ingest import RegistrationStore
+from sample_data import generate_participants
+
+DIMENSIONS = ('category', 'institution')
+
+
+class AttendanceCounters:
+    """Attendance counters updated event by event from the check-in log
+
+    Counters start from the participants' attendance_day* fields; every
+    logged check-in or check-out then adjusts a few integers (the day totals
+    and one cell per dimension), so reading them never rescans the
+    participant frame. poll() reads only the bytes appended since the last
+    call and replays the log from the start if it was truncated or replaced.
+    Safe to share between threads.
+    """
+
+    def __init__(self, participants, log_path=None, dimensions=DIMENSIONS):
+        self.participants = participants
+        self.log_path = log_path
+        self.days = list(ATTENDANCE_COLUMNS)
+        self.participant_ids = participants['id'].astype(str).to_numpy()
+        self.index = {pid: row for row, pid in enumerate(self.participant_ids)}
+        self.codes, self.labels, self.totals = {}, {}, {}
+        for dim in dimensions:
+            if dim in participants:
+                codes, labels = pd.factorize(participants[dim].astype(str), sort=True)
+                self.codes[dim], self.labels[dim] = codes, labels
+                self.totals[dim] = np.bincount(codes, minlength=len(labels))
+        self._lock = threading.Lock()
+        self._reset()
+        self.poll()
+
+    def _reset(self):
+        n = len(self.participant_ids)
+        # Copied: under copy-on-write to_numpy() hands back a read-only view
+        self.present = {day: (self.participants[column].astype(str) == 'Present').to_numpy().copy()
+                        if column in self.participants else np.zeros(n, dtype=bool)
+                        for day, column in ATTENDANCE_COLUMNS.items()}
+        self.on_site = {day: np.zeros(n, dtype=bool) for day in self.days}
+        self.checked_in = {day: int(self.present[day].sum()) for day in self.days}
+        self.headcount = {day: 0 for day in self.days}
+        self.full = int(np.logical_and.reduce([self.present[day] for day in self.days]).sum())
+        self.by = {dim: {
+            'checked_in': {day: np.bincount(codes[self.present[day]], minlength=len(self.labels[dim]))
+                           for day in self.days},
+            'on_site': {day: np.zeros(len(self.labels[dim]), dtype=np.int64) for day in self.days},
+        } for dim, codes in self.codes.items()}
+        self.events = 0
+        self.ignored = 0
+        self.updated = None
+        self._offset = 0
+        self._inode = None
+
+    def _apply(self, record):
+        row = self.index.get(str(record.get('id')))
+        day = record.get('day')
+        if row is None or day not in self.on_site:
+            self.ignored += 1
+            return
+        entering = record.get('event', 'check_in') == 'check_in'
+        if self.on_site[day][row] != entering:
+            self.on_site[day][row] = entering
+            step = 1 if entering else -1
+            self.headcount[day] += step
+            for dim, codes in self.codes.items():
+                self.by[dim]['on_site'][day][codes[row]] += step
+        if entering and not self.present[day][row]:
+            self.present[day][row] = True
+            self.checked_in[day] += 1
+            for dim, codes in self.codes.items():
+                self.by[dim]['checked_in'][day][codes[row]] += 1
+            if all(self.present[d][row] for d in self.days):
+                self.full += 1
+        self.events += 1
+
+    def poll(self):
+        """Apply events appended to the log since the last poll; returns how many"""
+        if not self.log_path:
+            return 0
+        with self._lock:
+            try:
+                stat = os.stat(self.log_path)
+            except FileNotFoundError:
+                return 0
+            if stat.st_size < self._offset or (self._inode is not None and stat.st_ino != self._inode):
+                self._reset()
+            self._inode = stat.st_ino
+            if stat.st_size == self._offset:
+                return 0
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read(stat.st_size - self._offset)
+            # A line still being written is left for the next poll
+            end = data.rfind(b'\n') + 1
+            applied = 0
+            for line in data[:end].splitlines():
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line torn by a crash and later terminated by the next check-in
+                        self.ignored += 1
+                        continue
+                    self._apply(record)
+                    applied += 1
+            self._offset += end
+            if applied:
+                self.updated = datetime.now()
+            return applied
+
+    def version(self):
+        """Token that changes whenever an event has been applied"""
+        return (self._inode, self._offset, self.events)
+
+    def summary(self):
+        """Overall headcounts: checked in and on site per day, full attendance"""
+        with self._lock:
+            return {
+                'total': len(self.participant_ids),
+                'checked_in': dict(self.checked_in),
+                'on_site': dict(self.headcount),
+                'full': self.full,
+                'events': self.events,
+                'updated': self.updated,
+            }
+
+    def table(self, dim):
+        """Registrants, checked in and on site per day for every value of a dimension"""
+        with self._lock:
+            columns = {'total': self.totals[dim]}
+            for day in self.days:
+                columns[f'day{day}_checked_in'] = self.by[dim]['checked_in'][day].copy()
+                columns[f'day{day}_on_site'] = self.by[dim]['on_site'][day].copy()
+        return pd.DataFrame(columns, index=pd.Index(self.labels[dim], name=dim))
+
+    def apply(self, participants):
+        """Copy of participants with checked-in days marked 'Present'"""
+        with self._lock:
+            checkins = pd.concat([pd.DataFrame({'id': self.participant_ids[flags], 'day': day})
+                                  for day, flags in self.present.items()], ignore_index=True)
+        return apply_attendance(participants, checkins)
+
+
+def main():
+    """Command-line entry point for following live attendance"""
+    parser = argparse.ArgumentParser(description="Live workshop headcounts from the check-in event log")
+    parser.add_argument('registrations', nargs='?',
+                        help="registration store directory (default: simulated participants)")
+    parser.add_argument('-n', '--sample', type=int, default=45, help="simulated participants without a store")
+    parser.add_argument('--log', help="check-in log (default: checkins.jsonl in the registration store)")
+    parser.add_argument('--by', choices=DIMENSIONS, default='category')
+    parser.add_argument('-f', '--follow', type=float, metavar='SECONDS',
+                        help="keep polling the log at this interval")
+    args = parser.parse_args()
+
+    if args.registrations:
+        participants = RegistrationStore(args.registrations).read()
+    else:
+        participants = generate_participants(args.sample)
+    log_path = args.log or (os.path.join(args.registrations, CHECKIN_LOG) if args.registrations else None)
+
+    counters = AttendanceCounters(participants, log_path)
+    while True:
+        summary = counters.summary()
+        days = ', '.join(f"day {day}: {summary['checked_in'][day]:,} in / {summary['on_site'][day]:,} on site"
+                         for day in counters.days)
+        print(f"👥 {summary['total']:,} registered; {days}; {summary['full']:,} both days "
+              f"({summary['events']:,} events)")
+        if not args.follow:
+            print(counters.table(args.by).to_string())
+            break
+        time.sleep(args.follow)
+        counters.poll()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Certificate Generator
+Eligibility rules and bulk PDF/PNG certificates streamed into one zip
+"""
+
+import argparse
+import io
+import json
+import os
+import re
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from matplotlib import font_manager
+from PIL import Image, ImageDraw, ImageFont
+
+from package_builder import ZIP_DEFLATED, ZIP_STORED, PackageWriter
+from report_engine import TEMPLATES_DIR, CompiledTemplate
+from sample_data import generate_participants
+from workshop_registry import load_workshop_metadata
+
+CERTIFICATE_TYPES = ['Excellence', 'Completion', 'Participation']
+ACHIEVEMENTS = {
+    'Excellence': 'has completed with distinction',
+    'Completion': 'has successfully completed',
+    'Participation': 'has participated in',
+}
+ACCENTS = {'Excellence': (176, 132, 24), 'Completion': (0, 82, 155), 'Participation': (0, 128, 128)}
+# Quiz percentage needed on top of full attendance
+PASS_MARK = 60
+EXCELLENCE_MARK = 85
+
+TEMPLATE_FILE = 'certificate.txt.tmpl'
+FORMATS = ('pdf', 'png')
+# A4 landscape
+PAGE_INCHES = (11.69, 8.27)
+DEFAULT_DPI = 150
+# Text styles by line marker: (font weight, style, points, gap after in points)
+STYLES = {
+    '#': ('bold', 'normal', 34, 18),
+    '##': ('bold', 'italic', 30, 6),
+    '###': ('bold', 'normal', 20, 6),
+    '': ('normal', 'normal', 14, 10),
+}
+TEXT_COLOUR = (40, 40, 40)
+# Rendered certificates waiting to be written, per worker
+WINDOW_PER_WORKER = 2
+
+
+def certificate_eligibility(participants, pass_mark=PASS_MARK, excellence_mark=EXCELLENCE_MARK):
+    """Certificate type earned by every participant (None if not eligible)
+
+    Full attendance (every attendance_* column 'Present') with a quiz score
+    of at least the excellence or pass mark earns Excellence or Completion;
+    attending at least one day earns Participation.
+    """
+    attendance = participants.filter(like='attendance_')
+    if attendance.columns.empty:
+        raise ValueError("Participant data has no attendance_* columns")
+    present = attendance.eq('Present').to_numpy()
+    every_day, any_day = present.all(axis=1), present.any(axis=1)
+    score = pd.to_numeric(participants['quiz_score'], errors='coerce').to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        earned = np.select([every_day & (score >= excellence_mark), every_day & (score >= pass_mark), any_day],
+                           CERTIFICATE_TYPES, default=None)
+    return pd.Series(earned, index=participants.index, name='certificate_type', dtype=object)
+
+
+@lru_cache(maxsize=None)
+def _font_path(weight, style):
+    return font_manager.findfont(font_manager.FontProperties(family='DejaVu Serif', weight=weight,
+                                                             style=style))
+
+
+@lru_cache(maxsize=None)
+def _font(weight, style, pixels):
+    return ImageFont.truetype(_font_path(weight, style), pixels)
+
+
+class CertificateTemplate:
+    """Certificate layout compiled once per workshop
+
+    Each template line becomes a CompiledTemplate at a fixed position.
+    Lines that only use workshop fields are drawn once into a background
+    per certificate type, so a certificate only draws its participant's
+    lines on a copy of that background before encoding.
+    """
+
+    def __init__(self, workshop, dpi=DEFAULT_DPI, text=None):
+        if text is None:
+            with open(os.path.join(TEMPLATES_DIR, TEMPLATE_FILE), 'r', encoding='utf-8') as f:
+                text = f.read()
+        self.dpi = dpi
+        self.size = tuple(round(inches * dpi) for inches in PAGE_INCHES)
+        self.workshop = {
+            'title': workshop.get('title', ''), 'date': workshop.get('date', ''),
+            'venue': workshop.get('venue', ''), 'organizer': workshop.get('organizer', ''),
+            # "2 days" reads as "the 2-day workshop"
+            'duration': re.sub(r'(\d+)\s*days?\b', r'\1-day', workshop.get('duration', '')).strip(),
+        }
+
+        self.lines = []
+        y = 0.22 * self.size[1]
+        for line in text.strip('\n').splitlines():
+            marker, _, content = line.partition(' ') if line.startswith('#') else ('', '', line)
+            weight, style, points, gap = STYLES[marker]
+            pixels = self._pixels(points)
+            y += pixels / 2
+            self.lines.append((CompiledTemplate(content, TEMPLATE_FILE), weight, style, pixels, y))
+            y += pixels / 2 + self._pixels(gap)
+        shared = set(self._context(CERTIFICATE_TYPES[0]))
+        self.participant_lines = [line for line in self.lines if not set(line[0].fields) <= shared]
+        self.participant_fields = sorted({field for template, *_ in self.participant_lines
+                                          for field in template.fields} - shared)
+        self.backgrounds = {kind: self._background(kind, workshop) for kind in CERTIFICATE_TYPES}
+
+    def _pixels(self, points):
+        return round(points * self.dpi / 72)
+
+    def _context(self, certificate_type):
+        return dict(self.workshop, certificate_type=certificate_type,
+                    achievement=ACHIEVEMENTS[certificate_type])
+
+    def _draw_line(self, draw, text, weight, style, pixels, y, fill):
+        # Shrink long lines (names, venues) until they fit inside the border
+        width = 0.8 * self.size[0]
+        font = _font(weight, style, pixels)
+        while font.getlength(text) > width and pixels > 8:
+            pixels -= 2
+            font = _font(weight, style, pixels)
+        draw.text((self.size[0] / 2, y), text, font=font, fill=fill, anchor='mm')
+
+    def _draw_template(self, draw, line, context, accent):
+        template, weight, style, pixels, y = line
+        fill = accent if weight == 'bold' else TEXT_COLOUR
+        self._draw_line(draw, template.render(context), weight, style, pixels, y, fill)
+
+    def _background(self, certificate_type, workshop):
+        width, height = self.size
+        accent = ACCENTS[certificate_type]
+        image = Image.new('RGB', self.size, 'white')
+        draw = ImageDraw.Draw(image)
+        margin = self._pixels(24)
+        draw.rectangle([margin, margin, width - margin, height - margin], outline=accent,
+                       width=self._pixels(5))
+        inner = margin + self._pixels(9)
+        draw.rectangle([inner, inner, width - inner, height - inner], outline=accent,
+                       width=max(1, self._pixels(1)))
+        self._draw_line(draw, self.workshop['organizer'], 'bold', 'normal', self._pixels(16),
+                        0.13 * height, accent)
+
+        context = self._context(certificate_type)
+        for line in self.lines:
+            if line not in self.participant_lines:
+                self._draw_template(draw, line, context, accent)
+
+        person = workshop.get('resource_person') or {}
+        signatures = [
+            (0.28, person.get('name', ''), ', '.join(filter(None, [person.get('designation'),
+                                                                    person.get('department')]))),
+            (0.72, 'Workshop Coordinator', workshop.get('coordinator', '')),
+        ]
+        small = _font('normal', 'normal', self._pixels(11))
+        bold = _font('bold', 'normal', self._pixels(12))
+        line_y = 0.82 * height
+        for x, name, role in signatures:
+            x *= width
+            draw.line([x - 0.14 * width, line_y, x + 0.14 * width, line_y], fill=TEXT_COLOUR,
+                      width=max(1, self._pixels(0.75)))
+            draw.text((x, line_y + self._pixels(12)), name, font=bold, fill=TEXT_COLOUR, anchor='mm')
+            draw.text((x, line_y + self._pixels(27)), role, font=small, fill=TEXT_COLOUR, anchor='mm')
+        return image
+
+    def render(self, participant, certificate_type, fmt='pdf'):
+        """Encoded certificate for one participant record"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown certificate format {fmt!r}; expected one of {FORMATS}")
+        image = self.backgrounds[certificate_type].copy()
+        draw = ImageDraw.Draw(image)
+        context = dict(participant, **self._context(certificate_type))
+        for line in self.participant_lines:
+            self._draw_template(draw, line, context, ACCENTS[certificate_type])
+        out = io.BytesIO()
+        if fmt == 'pdf':
+            image.save(out, 'PDF', resolution=self.dpi)
+        else:
+            image.save(out, 'PNG', compress_level=1)
+        return out.getvalue()
+
+
+@lru_cache(maxsize=4)
+def _compiled_template(workshop_json, dpi):
+    """Template compiled once per process and workshop"""
+    return CertificateTemplate(json.loads(workshop_json), dpi=dpi)
+
+
+def certificate_prefix(workshop):
+    """Short certificate number prefix, e.g. HTA20250215 for the 2025 HTA workshop"""
+    words = re.findall(r'[a-z]+|\d+', str(workshop.get('id', 'hta')).lower())
+    return ''.join(w[0] for w in words if w.isalpha()).upper() + ''.join(w for w in words if w.isdigit())
+
+
+def certificate_records(participants, workshop, types=None):
+    """One record per certificate to issue, with its number and file name
+
+    types overrides the computed eligibility (a Series aligned with
+    participants); participants without a type are skipped.
+    """
+    types = certificate_eligibility(participants) if types is None else types
+    issued = participants[types.notna()]
+    prefix = certificate_prefix(workshop)
+    affiliation = (issued['designation'].fillna('').astype(str) + ', '
+                   + issued['institution'].fillna('').astype(str)).str.strip(', ')
+    records = pd.DataFrame({
+        'id': issued['id'].astype(str),
+        'name': issued['name'].astype(str),
+        'affiliation': affiliation,
+        'certificate_type': types[types.notna()],
+    })
+    records['certificate_id'] = prefix + '-' + records['id']
+    return records.reset_index(drop=True)
+
+
+def _render_chunk(workshop_json, dpi, fmt, records):
+    """Render a chunk of certificates; runs inside a worker process"""
+    template = _compiled_template(workshop_json, dpi)
+    rendered = []
+    for record in records:
+        data = template.render(record, record['certificate_type'], fmt)
+        rendered.append((f"{record['certificate_type']}/{record['certificate_id']}.{fmt}",
+                         zlib.crc32(data), data))
+    return rendered
+
+
+def write_certificates(fileobj, records, workshop, fmt='pdf', dpi=DEFAULT_DPI, workers=None,
+                       chunk_size=25):
+    """Stream every certificate plus a register CSV into a zip file object
+
+    Chunks of certificates are rendered on a process pool (inline with
+    workers=1) and written in order as they arrive, with only a small
+    window of rendered chunks held in memory. Certificates are stored
+    uncompressed since PDF and PNG are already compressed.
+    """
+    workshop_json = json.dumps(workshop, sort_keys=True, default=str)
+    rows = records.to_dict('records')
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks) or 1)
+    mtime = time.time()
+    writer = PackageWriter(fileobj)
+
+    def write(rendered):
+        for arcname, crc, data in rendered:
+            writer.add_entry(arcname, ZIP_STORED, crc, len(data), len(data), mtime, 0o644, [data])
+
+    if workers == 1:
+        for chunk in chunks:
+            write(_render_chunk(workshop_json, dpi, fmt, chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            queue = iter(chunks)
+            for chunk in queue:
+                pending.append(pool.submit(_render_chunk, workshop_json, dpi, fmt, chunk))
+                if len(pending) >= workers * WINDOW_PER_WORKER:
+                    break
+            while pending:
+                rendered = pending.popleft().result()
+                for chunk in queue:
+                    pending.append(pool.submit(_render_chunk, workshop_json, dpi, fmt, chunk))
+                    break
+                write(rendered)
+
+    register = records.assign(file=records['certificate_type'] + '/' + records['certificate_id'] + f'.{fmt}')
+    data = register.to_csv(index=False).encode('utf-8')
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    packed = compressor.compress(data) + compressor.flush()
+    writer.add_entry('certificates.csv', ZIP_DEFLATED, zlib.crc32(data), len(packed), len(data),
+                     mtime, 0o644, [packed])
+    writer.close()
+    return register
+
+
+def generate_certificates(zip_filename, participants, workshop=None, fmt='pdf', dpi=DEFAULT_DPI,
+                          workers=None, types=None):
+    """Certificates for every eligible participant in one zip; returns the register"""
+    workshop = load_workshop_metadata() if workshop is None else workshop
+    records = certificate_records(participants, workshop, types)
+    tmp_filename = zip_filename + '.partial'
+    try:
+        with open(tmp_filename, 'wb') as out:
+            register = write_certificates(out, records, workshop, fmt=fmt, dpi=dpi, workers=workers)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    os.replace(tmp_filename, zip_filename)
+    return register
+
+
+def main():
+    """Command-line entry point for issuing certificates in bulk"""
+    parser = argparse.ArgumentParser(description="Generate workshop certificates into one zip")
+    parser.add_argument('output', help="zip file to write")
+    parser.add_argument('--participants', help="participant CSV (default: generated sample data)")
+    parser.add_argument('-n', '--sample', type=int, default=45, help="sample participants without a CSV")
+    parser.add_argument('--workshop', help="workshop id in the registry (default: the current edition)")
+    parser.add_argument('--format', choices=FORMATS, default='pdf', help="certificate file format")
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI, help="render resolution")
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.participants:
+        participants = pd.read_csv(args.participants)
+    else:
+        participants = generate_participants(args.sample)
+    workshop = load_workshop_metadata(args.workshop)
+
+    start = time.perf_counter()
+    register = generate_certificates(args.output, participants, workshop, fmt=args.format,
+                                     dpi=args.dpi, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    counts = register['certificate_type'].value_counts().reindex(CERTIFICATE_TYPES, fill_value=0)
+    print(f"🎓 {len(register):,} certificates for {len(participants):,} participants "
+          f"written to {args.output} in {elapsed:.2f}s")
+    print(', '.join(f"{kind}: {count}" for kind, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
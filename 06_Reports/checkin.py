@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop QR Check-in
+Signed entry passes, batch QR codes and offline scan verification at the venue
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import io
+import json
+import os
+import secrets
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from package_builder import ZIP_DEFLATED, ZIP_STORED, PackageWriter
+from registration_ingest import STATE_DIR, RegistrationStore
+from sample_data import generate_participants
+from workshop_registry import load_workshop_metadata
+
+try:
+    import qrcode
+except ImportError:  # pragma: no cover - qrcode is optional, without it there are no QR images
+    qrcode = None
+
+SECRET_FILE = '.checkin_secret'
+TOKEN_PREFIX = 'HTA1'
+# Truncated HMAC-SHA256; 96 bits keeps passes short (QR version 2) and unforgeable
+SIGNATURE_BYTES = 12
+ATTENDANCE_COLUMNS = {1: 'attendance_day1', 2: 'attendance_day2'}
+CHECKIN_LOG = 'checkins.jsonl'
+CHECKIN_EVENTS = ('check_in', 'check_out')
+QR_SCALE = 8
+QR_BORDER = 4
+# Any mask pattern is valid (readers take it from the format bits); fixing it
+# skips qrcode scoring all eight, which is most of the encoding time
+QR_MASK_PATTERN = 0
+# QR chunks waiting to be written, per worker
+WINDOW_PER_WORKER = 2
+
+
+def secret_path(store=None):
+    """Pass signing key file for a registration store
+
+    HTA_CHECKIN_SECRET_FILE wins; otherwise the key is kept in the store
+    (HTA_REGISTRATION_STORE when none is given), or in the per-user state
+    directory without one, never inside the package tree. Everything that
+    signs or verifies passes for a store resolves its key here.
+    """
+    if os.environ.get('HTA_CHECKIN_SECRET_FILE'):
+        return os.environ['HTA_CHECKIN_SECRET_FILE']
+    return os.path.join(store or os.environ.get('HTA_REGISTRATION_STORE') or STATE_DIR, SECRET_FILE)
+
+
+SECRET_PATH = secret_path()
+
+
+def load_secret(path=SECRET_PATH):
+    """Signing key for entry passes, created on first use
+
+    HTA_CHECKIN_SECRET (hex) overrides the key file. The file is created
+    with owner-only permissions; keep it with the registration store, since
+    passes already sent out stop verifying if it changes.
+    """
+    if os.environ.get('HTA_CHECKIN_SECRET'):
+        return bytes.fromhex(os.environ['HTA_CHECKIN_SECRET'])
+    try:
+        with open(path, 'rb') as f:
+            return bytes.fromhex(f.read().decode('ascii').strip())
+    except FileNotFoundError:
+        key = secrets.token_bytes(32)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='ascii') as f:
+            f.write(key.hex() + '\n')
+        return key
+
+
+def _signatures(participant_ids, emails, workshop_id, secret):
+    """Pass signatures over workshop, participant id and email"""
+    return [base64.urlsafe_b64encode(hmac.new(secret, f'{workshop_id}|{pid}|{email.lower()}'.encode('utf-8'),
+                                              hashlib.sha256).digest()[:SIGNATURE_BYTES]).decode('ascii')
+            for pid, email in zip(participant_ids, emails)]
+
+
+def checkin_tokens(participants, workshop=None, secret=None):
+    """Entry pass token for every participant, aligned with the frame
+
+    Tokens look like HTA1.P001.<signature>; the workshop id is signed but
+    not embedded, so a pass from another edition fails verification.
+    """
+    workshop = load_workshop_metadata() if workshop is None else workshop
+    secret = load_secret() if secret is None else secret
+    ids = participants['id'].astype(str)
+    signatures = _signatures(ids, participants['email'].astype(str), workshop['id'], secret)
+    return pd.Series([f'{TOKEN_PREFIX}.{pid}.{sig}' for pid, sig in zip(ids, signatures)],
+                     index=participants.index, name='token')
+
+
+def qr_image(token, scale=QR_SCALE, border=QR_BORDER):
+    """1-bit PIL image of the QR code for a token"""
+    if qrcode is None:
+        raise ImportError("QR images need the qrcode package (pip install qrcode)")
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=border,
+                       mask_pattern=QR_MASK_PATTERN)
+    qr.add_data(token)
+    qr.make(fit=True)
+    light = ~np.array(qr.get_matrix(), dtype=bool)
+    return Image.fromarray(light.repeat(scale, axis=0).repeat(scale, axis=1))
+
+
+def _qr_chunk(records, scale):
+    """Encode a chunk of passes as PNG; runs inside a worker process"""
+    encoded = []
+    for participant_id, token in records:
+        out = io.BytesIO()
+        qr_image(token, scale).save(out, 'PNG', optimize=False)
+        data = out.getvalue()
+        encoded.append((f'{participant_id}.png', zlib.crc32(data), data))
+    return encoded
+
+
+def write_checkin_codes(fileobj, participants, workshop=None, secret=None, scale=QR_SCALE, workers=None,
+                        chunk_size=200):
+    """Stream a QR code PNG per participant plus a tokens CSV into a zip
+
+    Chunks are encoded on a process pool (inline with workers=1) and
+    written in order, holding only a small window of chunks in memory.
+    Returns the participant id / token frame written as checkin_tokens.csv.
+    """
+    tokens = pd.DataFrame({'id': participants['id'].astype(str), 'name': participants['name'].astype(str),
+                           'email': participants['email'].astype(str),
+                           'token': checkin_tokens(participants, workshop, secret)})
+    rows = list(zip(tokens['id'], tokens['token']))
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks) or 1)
+    mtime = time.time()
+    writer = PackageWriter(fileobj)
+
+    def write(encoded):
+        for arcname, crc, data in encoded:
+            writer.add_entry(arcname, ZIP_STORED, crc, len(data), len(data), mtime, 0o644, [data])
+
+    if workers == 1:
+        for chunk in chunks:
+            write(_qr_chunk(chunk, scale))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            queue = iter(chunks)
+            pending = deque(pool.submit(_qr_chunk, chunk, scale)
+                            for _, chunk in zip(range(workers * WINDOW_PER_WORKER), queue))
+            while pending:
+                encoded = pending.popleft().result()
+                for chunk in queue:
+                    pending.append(pool.submit(_qr_chunk, chunk, scale))
+                    break
+                write(encoded)
+
+    data = tokens.to_csv(index=False).encode('utf-8')
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    packed = compressor.compress(data) + compressor.flush()
+    writer.add_entry('checkin_tokens.csv', ZIP_DEFLATED, zlib.crc32(data), len(packed), len(data),
+                     mtime, 0o644, [packed])
+    writer.close()
+    return tokens
+
+
+class CheckInDesk:
+    """Verifies scanned passes offline and records attendance by day
+
+    Expected signatures are precomputed into a dict keyed by participant
+    id, so a scan costs one split, one hash lookup and one constant-time
+    comparison regardless of the number of registrants. Check-ins and
+    check-outs are appended to a JSONL event log (when given) and replayed
+    on start, so a desk restart keeps everyone already admitted.
+    """
+
+    def __init__(self, participants, workshop=None, secret=None, log_path=None):
+        workshop = load_workshop_metadata() if workshop is None else workshop
+        secret = load_secret() if secret is None else secret
+        self.participant_ids = participants['id'].astype(str).to_numpy()
+        self.names = participants['name'].astype(str).to_numpy()
+        signatures = _signatures(self.participant_ids, participants['email'].astype(str), workshop['id'], secret)
+        self.index = {pid: (row, sig.encode('ascii'))
+                      for row, (pid, sig) in enumerate(zip(self.participant_ids, signatures))}
+        self.present = {day: np.zeros(len(self.participant_ids), dtype=bool) for day in ATTENDANCE_COLUMNS}
+        self.on_site = {day: np.zeros(len(self.participant_ids), dtype=bool) for day in ATTENDANCE_COLUMNS}
+        self.log_path = log_path
+        for participant_id, day, event in read_checkin_log(log_path)[['id', 'day', 'event']].itertuples(index=False):
+            entry = self.index.get(participant_id)
+            if entry is not None and day in self.present:
+                self.present[day][entry[0]] |= event == 'check_in'
+                self.on_site[day][entry[0]] = event == 'check_in'
+
+    def verify(self, token):
+        """Row of the participant a token belongs to, or None if it is not genuine"""
+        prefix, _, rest = token.strip().partition('.')
+        participant_id, _, signature = rest.partition('.')
+        entry = self.index.get(participant_id)
+        if prefix != TOKEN_PREFIX or entry is None:
+            return None
+        return entry[0] if hmac.compare_digest(signature.encode('ascii', 'replace'), entry[1]) else None
+
+    def scan(self, token, day, event='check_in', at=None):
+        """Verify a scanned pass and check the participant in (or out) for a day
+
+        Returns a dict with status ('checked_in', 'already_checked_in',
+        'checked_out', 'not_checked_in' or 'invalid'), the participant id
+        and name. Only events that change who is on site are logged.
+        """
+        if day not in self.present:
+            raise ValueError(f"Unknown workshop day {day}; expected one of {list(self.present)}")
+        if event not in CHECKIN_EVENTS:
+            raise ValueError(f"Unknown check-in event {event!r}; expected one of {CHECKIN_EVENTS}")
+        row = self.verify(token)
+        if row is None:
+            return {'status': 'invalid', 'id': None, 'name': None, 'day': day}
+        result = {'status': None, 'id': self.participant_ids[row], 'name': self.names[row], 'day': day}
+        entering = event == 'check_in'
+        if self.on_site[day][row] == entering:
+            result['status'] = 'already_checked_in' if entering else 'not_checked_in'
+            return result
+        result['status'] = 'checked_in' if entering else 'checked_out'
+        self.on_site[day][row] = entering
+        self.present[day][row] |= entering
+        if self.log_path:
+            at = (at or datetime.now()).isoformat(timespec='seconds')
+            with open(self.log_path, 'a+b') as f:
+                # Terminate a torn last line so this event starts a line of its own
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+                f.write((json.dumps({'id': result['id'], 'day': day, 'event': event, 'at': at}) + '\n')
+                        .encode('utf-8'))
+        return result
+
+    def counts(self):
+        """Participants checked in (at any time) per day"""
+        return {day: int(present.sum()) for day, present in self.present.items()}
+
+    def checkins(self):
+        """Checked-in (id, day) pairs"""
+        return pd.concat([pd.DataFrame({'id': self.participant_ids[present], 'day': day})
+                          for day, present in self.present.items()], ignore_index=True)
+
+    def apply(self, participants):
+        """Copy of participants with today's check-ins marked 'Present'"""
+        return apply_attendance(participants, self.checkins())
+
+
+def read_checkin_log(log_path):
+    """Check-in event log as an id, day, event, at frame (empty when there is no log)
+
+    Lines that do not decode, such as one torn by a crash mid-write, are skipped.
+    """
+    records = []
+    if log_path and os.path.exists(log_path):
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    log = pd.DataFrame(records, columns=['id', 'day', 'event', 'at'])
+    log['event'] = log['event'].fillna('check_in')
+    return log
+
+
+def apply_attendance(participants, checkins):
+    """Copy of participants with the attendance_day* of checked-in days set to 'Present'
+
+    Rows are matched on id; attendance of participants not (yet) checked
+    in is left as it was.
+    """
+    ids = participants['id'].astype(str)
+    out = participants.copy()
+    for day, column in ATTENDANCE_COLUMNS.items():
+        entered = (checkins['day'] == day) & (checkins.get('event', 'check_in') == 'check_in')
+        present = ids.isin(checkins.loc[entered, 'id']).to_numpy()
+        values = out[column].astype(object) if column in out else pd.Series('Unknown', index=out.index, dtype=object)
+        out[column] = values.where(~present, 'Present').astype('category')
+    return out
+
+
+def apply_checkins(participants, log_path):
+    """Participant frame with attendance from a check-in log, if there is one"""
+    if not log_path or not os.path.exists(log_path):
+        return participants
+    return apply_attendance(participants, read_checkin_log(log_path))
+
+
+def main():
+    """Command-line entry point for entry passes and venue check-in"""
+    parser = argparse.ArgumentParser(description="Generate QR entry passes or check participants in")
+    parser.add_argument('registrations', nargs='?',
+                        help="registration store directory (default: simulated participants)")
+    parser.add_argument('-n', '--sample', type=int, default=45, help="simulated participants without a store")
+    parser.add_argument('--workshop', help="workshop id in the registry (default: current workshop)")
+    parser.add_argument('--codes', help="write a zip of QR code PNGs and a token CSV")
+    parser.add_argument('-w', '--workers', type=int, help="processes for QR encoding (default: CPU count)")
+    parser.add_argument('--scan', nargs='*', metavar='TOKEN',
+                        help="check in scanned tokens (read from stdin when none are given)")
+    parser.add_argument('--day', type=int, default=1, choices=sorted(ATTENDANCE_COLUMNS))
+    parser.add_argument('--check-out', action='store_true', help="record scans as check-outs")
+    parser.add_argument('--log', help="check-in log (default: checkins.jsonl in the registration store)")
+    parser.add_argument('--secret', help=f"pass signing key file (default: {SECRET_FILE} in the registration "
+                                         f"store, or {SECRET_PATH} without one)")
+    args = parser.parse_args()
+
+    if args.registrations:
+        participants = RegistrationStore(args.registrations).read()
+    else:
+        participants = generate_participants(args.sample)
+    workshop = load_workshop_metadata(args.workshop)
+    secret = load_secret(args.secret or secret_path(args.registrations))
+
+    if args.codes:
+        start = time.perf_counter()
+        with open(args.codes, 'wb') as f:
+            tokens = write_checkin_codes(f, participants, workshop, secret, workers=args.workers)
+        print(f"🎫 {len(tokens):,} entry passes written to {args.codes} in {time.perf_counter() - start:.1f}s")
+
+    if args.scan is not None:
+        log_path = args.log or (os.path.join(args.registrations, CHECKIN_LOG) if args.registrations else None)
+        desk = CheckInDesk(participants, workshop, secret, log_path)
+        for token in args.scan or (line.strip() for line in sys.stdin if line.strip()):
+            result = desk.scan(token, args.day, 'check_out' if args.check_out else 'check_in')
+            symbol = {'checked_in': '✅', 'checked_out': '👋', 'already_checked_in': '🔁',
+                      'not_checked_in': '⚠️', 'invalid': '❌'}[result['status']]
+            print(f"{symbol} {result['status']}: {result['id'] or token} {result['name'] or ''}".rstrip())
+        print(f"Day {args.day}: {desk.counts()[args.day]:,} of {len(participants):,} checked in, "
+              f"{int(desk.on_site[args.day].sum()):,} on site")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Email Dispatcher
+Bulk confirmation, reminder and coordinator emails over pooled SMTP connections
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import html
+import json
+import os
+import random
+import re
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email.header import Header
+from email.utils import formataddr, formatdate
+from functools import lru_cache
+from urllib.parse import quote
+
+import pandas as pd
+
+from checkin import SECRET_FILE, SECRET_PATH, checkin_tokens, load_secret, secret_path
+from registration_ingest import STATE_DIR, RegistrationStore
+from report_engine import TEMPLATES_DIR, CompiledTemplate
+from sample_data import generate_participants
+from workshop_registry import load_workshop_metadata, parse_start_date
+
+SENDER = os.environ.get('HTA_MAIL_SENDER', 'hta2025@shrideviinstitutes.edu.in')
+COORDINATOR = os.environ.get('HTA_COORDINATOR_EMAIL', SENDER)
+OUTBOX_PATH = os.environ.get('HTA_OUTBOX', os.path.join(STATE_DIR, 'outbox.jsonl'))
+
+# Message kind -> (body template, subject, recipient); see registration_form.gs
+MESSAGE_KINDS = {
+    'confirmation': ('confirmation_email.html.tmpl', 'HTA Workshop {year} Registration Confirmed', 'participant'),
+    'reminder': ('reminder_email.html.tmpl', 'Reminder: {title} Workshop on {date}', 'participant'),
+    'notification': ('coordinator_notification.txt.tmpl', 'New HTA Workshop Registration - {name}', 'coordinator'),
+}
+
+# Registrant-supplied values must never start a new header line
+_LINE_BREAKS = re.compile(r'[\r\n]+')
+
+DEFAULT_CONNECTIONS = 8
+# Outbox records written per flush; a crash resends at most this many
+OUTBOX_BATCH = 100
+# Messages sent over one connection before it is reopened (relays cap this)
+MESSAGES_PER_CONNECTION = 100
+MAX_ATTEMPTS = 4
+BACKOFF_SECONDS = 0.5
+SMTP_TIMEOUT = 30
+
+
+class PermanentError(Exception):
+    """Delivery refused with a 5xx reply; retrying will not help"""
+
+
+@lru_cache(maxsize=None)
+def load_email_template(name):
+    """Compiled body or subject template, parsed once per process"""
+    if name.endswith('.tmpl'):
+        with open(os.path.join(TEMPLATES_DIR, name), 'r', encoding='utf-8') as f:
+            return CompiledTemplate(f.read(), name)
+    return CompiledTemplate(name, 'subject')
+
+
+def confirmation_qr_url(token):
+    """Entry pass QR image URL for a signed check-in token"""
+    return f"https://api.qrserver.com/v1/create-qr-code/?size=200x200&data={quote(token, safe='')}"
+
+
+def _header(value):
+    """Header value on one line, RFC 2047-encoded unless it is plain ASCII"""
+    value = _LINE_BREAKS.sub(' ', value)
+    return value if value.isascii() else Header(value, 'utf-8').encode(linesep='\r\n')
+
+
+def _address(name, address):
+    """From/To value with the display name and address each kept on one line
+
+    formataddr only encodes non-ASCII names, so line breaks in an ASCII name
+    or an address are removed here.
+    """
+    return formataddr((_LINE_BREAKS.sub(' ', name), _LINE_BREAKS.sub('', address)), 'utf-8')
+
+
+def _mime_message(headers, parts, boundary):
+    """RFC 5322 message bytes from header pairs and (text, subtype) parts
+
+    Parts are UTF-8 in base64 with CRLF line endings, as smtplib expects;
+    more than one part becomes a multipart/alternative.
+    """
+    def part(text, subtype):
+        body = base64.encodebytes(text.encode('utf-8')).replace(b'\n', b'\r\n')
+        return (f'Content-Type: text/{subtype}; charset="utf-8"\r\n'
+                f'Content-Transfer-Encoding: base64\r\n\r\n').encode('ascii') + body
+
+    head = ''.join(f'{name}: {value}\r\n' for name, value in headers) + 'MIME-Version: 1.0\r\n'
+    if len(parts) == 1:
+        return head.encode('ascii') + part(*parts[0])
+    boundary = f'=_{boundary}'
+    head += f'Content-Type: multipart/alternative; boundary="{boundary}"\r\n\r\n'
+    delimiter = f'--{boundary}\r\n'.encode('ascii')
+    return (head.encode('ascii') + b''.join(delimiter + part(*p) for p in parts)
+            + f'--{boundary}--\r\n'.encode('ascii'))
+
+
+def message_contexts(participants, workshop, secret=None):
+    """Template fields for every participant, built column-wise
+
+    amount and reference come from ingested registrations
+    (amount_paid, transaction_reference) and fall back to the category fee
+    and participant id for records without them. qr_url encodes the
+    participant's signed check-in pass, signed with secret (the default
+    key file when None).
+    """
+    df = participants.reset_index(drop=True)
+    amount = df['amount_paid'] if 'amount_paid' in df else pd.Series(float('nan'), index=df.index)
+    fee = pd.to_numeric(df['category'].astype(str).str.extract(r'₹([\d,]+)')[0].str.replace(',', ''),
+                        errors='coerce') if 'category' in df else amount
+    amount = amount.fillna(fee)
+    reference = df['transaction_reference'] if 'transaction_reference' in df else pd.Series('', index=df.index)
+    reference = reference.astype(str).where(reference.astype(str).str.strip() != '', df['id'].astype(str))
+    frame = pd.DataFrame({
+        'name': df['name'].astype(str),
+        'email': df['email'].astype(str),
+        'designation': df['designation'].astype(str) if 'designation' in df else '',
+        'institution': df['institution'].astype(str) if 'institution' in df else '',
+        'mobile': df['mobile'].astype(str) if 'mobile' in df else '',
+        'amount': amount.map(lambda v: '' if pd.isna(v) else f'{v:,.0f}'),
+        'reference': reference,
+    })
+    frame['qr_url'] = checkin_tokens(df, workshop, secret).map(confirmation_qr_url)
+
+    person = workshop.get('resource_person', {})
+    start = parse_start_date(workshop.get('date'))
+    shared = {
+        'title': workshop.get('title', ''),
+        'date': workshop.get('date', ''),
+        'venue': workshop.get('venue', ''),
+        'organizer': workshop.get('organizer', ''),
+        'resource_name': person.get('name', ''),
+        'resource_role': ', '.join(filter(None, [person.get('designation'), person.get('department')])),
+        'resource_email': person.get('email', ''),
+        'resource_phone': person.get('phone', ''),
+        'year': start.year if start else datetime.now().year,
+    }
+    return [{**shared, **row} for row in frame.to_dict('records')]
+
+
+def build_messages(participants, kind='confirmation', workshop=None, sender=SENDER, coordinator=COORDINATOR,
+                   secret=None):
+    """Rendered messages as (message id, sender, recipients, bytes)
+
+    Messages are serialized once so retries resend the same bytes; the MIME
+    structure is written directly because building 10k EmailMessage objects
+    costs more than sending them. The id depends only on kind, recipient
+    and registration reference (never on render time), which is what makes
+    the outbox idempotent across runs.
+    """
+    workshop = load_workshop_metadata() if workshop is None else workshop
+    body_name, subject, audience = MESSAGE_KINDS[kind]
+    body, subject = load_email_template(body_name), load_email_template(subject)
+    is_html = body_name.endswith('.html.tmpl')
+    date, domain = formatdate(localtime=True), sender.rpartition('@')[2]
+    messages = []
+    for context in message_contexts(participants, workshop, secret):
+        recipient = _LINE_BREAKS.sub('', context['email']) if audience == 'participant' else coordinator
+        key = f"{kind}|{context['email'].lower()}|{context['reference']}|{context['date']}"
+        message_id = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+        to = _address(context['name'], recipient) if audience == 'participant' else recipient
+        headers = [
+            ('Subject', _header(subject.render(context))),
+            ('From', _address(f"{context['title']} Workshop", sender)),
+            ('To', to),
+            ('Reply-To', coordinator),
+            ('Date', date),
+            ('Message-ID', f'<{message_id}@{domain}>'),
+        ]
+        if is_html:
+            escaped = {field: html.escape(value) if isinstance(value, str) else value
+                       for field, value in context.items()}
+            plain = f"Dear {context['name']},\n\nPlease view this message in an HTML-capable mail client.\n"
+            data = _mime_message(headers, [(plain, 'plain'), (body.render(escaped), 'html')], message_id)
+        else:
+            data = _mime_message(headers, [(body.render(context), 'plain')], message_id)
+        messages.append((message_id, sender, [recipient], data))
+    return messages
+
+
+class Outbox:
+    """Append-only JSONL journal of delivery outcomes, keyed by message id
+
+    Messages whose latest record says 'sent' are never sent again. Records
+    are buffered and flushed (with fsync) every OUTBOX_BATCH outcomes, so an
+    interrupted run resends at most one batch.
+    """
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self.records = {}
+        self._pending = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line torn by a crash mid-write; records after it still count
+                        continue
+                    self.records[record['id']] = record
+        except FileNotFoundError:
+            pass
+
+    def is_sent(self, message_id):
+        return self.records.get(message_id, {}).get('status') == 'sent'
+
+    def record(self, message_id, recipients, status, attempts, error=None):
+        record = {'id': message_id, 'to': recipients, 'status': status, 'attempts': attempts,
+                  'error': error, 'at': datetime.now().isoformat(timespec='seconds')}
+        self.records[message_id] = record
+        self._pending.append(record)
+        if len(self._pending) >= OUTBOX_BATCH:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a+b') as f:
+            # Terminate a torn last line so the first new record starts a line of its own
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            f.write(''.join(json.dumps(record) + '\n' for record in self._pending).encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = []
+
+    def summary(self):
+        """Number of messages per latest status"""
+        return pd.Series([r['status'] for r in self.records.values()], dtype=object).value_counts()
+
+
+class EmailDispatcher:
+    """Sends messages over a fixed pool of reused SMTP connections
+
+    Each of `connections` workers owns one smtplib connection, driven from a
+    thread of its own so the event loop never blocks on the network. 4xx
+    replies and dropped connections are retried with exponential backoff
+    and jitter on a fresh connection; 5xx replies fail the message at once.
+    """
+
+    def __init__(self, host='localhost', port=25, outbox=None, connections=DEFAULT_CONNECTIONS,
+                 username=None, password=None, starttls=False, max_attempts=MAX_ATTEMPTS,
+                 backoff=BACKOFF_SECONDS, timeout=SMTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.outbox = Outbox() if outbox is None else outbox
+        self.connections = connections
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.starttls:
+            smtp.starttls()
+            smtp.ehlo()
+        if self.username:
+            smtp.login(self.username, self.password)
+        return smtp
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _send(self, connection, sender, recipients, data):
+        """Send one message on a worker's connection (runs in its thread)
+
+        connection is the worker's [smtp, messages sent] slot; the
+        connection is opened lazily, recycled after MESSAGES_PER_CONNECTION
+        and dropped after any failure.
+        """
+        smtp, count = connection
+        if smtp is not None and count >= MESSAGES_PER_CONNECTION:
+            self._close(smtp)
+            smtp = None
+        try:
+            if smtp is None:
+                smtp, count = self._connect(), 0
+            connection[:] = [smtp, count]
+            smtp.sendmail(sender, recipients, data)
+            connection[1] = count + 1
+        except smtplib.SMTPRecipientsRefused as error:
+            codes = [code for code, _ in error.recipients.values()]
+            if all(500 <= code < 600 for code in codes):
+                raise PermanentError(f"recipients refused: {error.recipients}") from error
+            raise
+        except smtplib.SMTPResponseException as error:
+            if 500 <= error.smtp_code < 600:
+                raise PermanentError(f"{error.smtp_code} {error.smtp_error!r}") from error
+            raise
+        except Exception:
+            if connection[0] is not None:
+                connection[0].close()
+            connection[:] = [None, 0]
+            raise
+
+    async def _worker(self, queue, executor, results):
+        loop = asyncio.get_running_loop()
+        connection = [None, 0]
+        try:
+            while True:
+                try:
+                    message_id, sender, recipients, data = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                for attempt in range(1, self.max_attempts + 1):
+                    try:
+                        await loop.run_in_executor(executor, self._send, connection, sender, recipients, data)
+                        status, error = 'sent', None
+                        break
+                    except PermanentError as exc:
+                        status, error = 'failed', str(exc)
+                        break
+                    except (smtplib.SMTPException, OSError) as exc:
+                        status, error = 'failed', f"{type(exc).__name__}: {exc}"
+                        if attempt < self.max_attempts:
+                            delay = self.backoff * 2 ** (attempt - 1)
+                            await asyncio.sleep(delay + random.uniform(0, delay))
+                self.outbox.record(message_id, recipients, status, attempt, error)
+                results[status] += 1
+        finally:
+            if connection[0] is not None:
+                await loop.run_in_executor(executor, self._close, connection[0])
+
+    async def dispatch(self, messages):
+        """Send every message not already marked sent in the outbox
+
+        Returns counts of sent, failed and skipped (already sent) messages.
+        """
+        results = {'sent': 0, 'failed': 0, 'skipped': 0}
+        queue = asyncio.Queue()
+        for message in messages:
+            if self.outbox.is_sent(message[0]):
+                results['skipped'] += 1
+            else:
+                queue.put_nowait(message)
+        workers = min(self.connections, queue.qsize())
+        if workers:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='smtp') as executor:
+                try:
+                    await asyncio.gather(*(self._worker(queue, executor, results) for _ in range(workers)))
+                finally:
+                    self.outbox.flush()
+        return results
+
+
+class SMTPSink:
+    """Local SMTP server that accepts and keeps every message, for testing
+
+    Speaks just enough ESMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET,
+    NOOP, QUIT). `latency` delays every DATA reply to mimic a real relay and
+    `fail_every` answers every n-th DATA with a 451 to exercise retries.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fail_every=0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.fail_every = fail_every
+        self.messages = []
+        self.received = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, reader, writer):
+        def reply(text):
+            writer.write(text.encode('ascii') + b'\r\n')
+
+        sender, recipients = None, []
+        reply(f'220 {self.host} HTA workshop SMTP sink')
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command, _, argument = line.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+                command = command.upper()
+                if command == 'EHLO':
+                    reply(f'250-{self.host}\r\n250-8BITMIME\r\n250-PIPELINING\r\n250 SMTPUTF8')
+                elif command == 'HELO':
+                    reply(f'250 {self.host}')
+                elif command == 'MAIL':
+                    sender, recipients = argument.partition(':')[2].strip(), []
+                    reply('250 OK')
+                elif command == 'RCPT':
+                    recipients.append(argument.partition(':')[2].strip())
+                    reply('250 OK')
+                elif command == 'DATA':
+                    reply('354 End data with <CR><LF>.<CR><LF>')
+                    await writer.drain()
+                    lines = []
+                    while True:
+                        data = await reader.readline()
+                        if data in (b'.\r\n', b'.\n', b''):
+                            break
+                        lines.append(data[1:] if data.startswith(b'.') else data)
+                    self.received += 1
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    if self.fail_every and self.received % self.fail_every == 0:
+                        reply('451 Temporary failure, try again later')
+                    else:
+                        self.messages.append((sender, recipients, b''.join(lines)))
+                        reply('250 OK: queued')
+                    sender, recipients = None, []
+                elif command in ('RSET', 'NOOP'):
+                    if command == 'RSET':
+                        sender, recipients = None, []
+                    reply('250 OK')
+                elif command == 'QUIT':
+                    reply('221 Bye')
+                    break
+                else:
+                    reply('502 Command not implemented')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def _run(args, participants, workshop, secret):
+    messages = build_messages(participants, args.kind, workshop, args.sender, args.coordinator, secret)
+    sink = await SMTPSink(args.host, args.port, args.sink_latency, args.sink_fail_every).start() \
+        if args.sink else None
+    try:
+        dispatcher = EmailDispatcher(args.host, sink.port if sink else args.port, Outbox(args.outbox),
+                                     args.connections, args.username, os.environ.get('HTA_SMTP_PASSWORD'),
+                                     args.starttls)
+        start = time.perf_counter()
+        results = await dispatcher.dispatch(messages)
+        return results, time.perf_counter() - start, sink
+    finally:
+        if sink:
+            await sink.stop()
+
+
+def main():
+    """Command-line entry point for bulk workshop emails"""
+    parser = argparse.ArgumentParser(description="Send workshop emails to registrants over pooled SMTP connections")
+    parser.add_argument('registrations', nargs='?',
+                        help="registration store directory (default: simulated participants)")
+    parser.add_argument('-n', '--sample', type=int, default=45, help="simulated participants without a store")
+    parser.add_argument('--kind', choices=sorted(MESSAGE_KINDS), default='confirmation')
+    parser.add_argument('--workshop', help="workshop id in the registry (default: current workshop)")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=25)
+    parser.add_argument('--username', help="SMTP login (password from HTA_SMTP_PASSWORD)")
+    parser.add_argument('--starttls', action='store_true')
+    parser.add_argument('-c', '--connections', type=int, default=DEFAULT_CONNECTIONS)
+    parser.add_argument('--sender', default=SENDER)
+    parser.add_argument('--coordinator', default=COORDINATOR)
+    parser.add_argument('--outbox', default=OUTBOX_PATH, help="JSONL delivery journal")
+    parser.add_argument('--secret', help=f"pass signing key file (default: {SECRET_FILE} in the registration "
+                                         f"store, or {SECRET_PATH} without one)")
+    parser.add_argument('--sink', action='store_true',
+                        help="deliver to a local SMTP sink started on --host/--port (0 picks a free port)")
+    parser.add_argument('--sink-latency', type=float, default=0.0, help="seconds the sink waits per message")
+    parser.add_argument('--sink-fail-every', type=int, default=0, help="sink answers every n-th message with 451")
+    args = parser.parse_args()
+
+    if args.registrations:
+        participants = RegistrationStore(args.registrations).read()
+    else:
+        participants = generate_participants(args.sample)
+    workshop = load_workshop_metadata(args.workshop)
+    secret = load_secret(args.secret or secret_path(args.registrations))
+
+    results, elapsed, sink = asyncio.run(_run(args, participants, workshop, secret))
+    print(f"📧 {args.kind}: {results['sent']:,} sent, {results['failed']:,} failed, "
+          f"{results['skipped']:,} already sent in {elapsed:.1f}s")
+    if sink:
+        print(f"📥 Sink accepted {len(sink.messages):,} of {sink.received:,} messages")
+    if results['failed']:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
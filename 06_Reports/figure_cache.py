@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Figure Cache
+Process-wide LRU cache of serialized dashboard charts keyed by data fingerprint
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import plotly.io as pio
+
+# Memory cap for all cached figures together (serialized bytes)
+DEFAULT_MAX_BYTES = int(float(os.environ.get('HTA_FIGURE_CACHE_MB', '64')) * 1024 * 1024)
+DEFAULT_MAX_ENTRIES = 256
+
+
+def fingerprint(*parts):
+    """Stable digest of the aggregates (and options) a chart is drawn from"""
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.Series, pd.DataFrame, pd.Index)):
+            if isinstance(part, pd.Index):
+                part = part.to_series(index=pd.RangeIndex(len(part)))
+            labels = list(part.columns) if isinstance(part, pd.DataFrame) else part.name
+            digest.update(repr((labels, part.index.names)).encode('utf-8'))
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            digest.update(repr((part.dtype.str, part.shape)).encode('utf-8'))
+            digest.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, dict):
+            digest.update(fingerprint(*sorted(part.items(), key=repr)).encode('utf-8'))
+        elif isinstance(part, (list, tuple)):
+            digest.update(fingerprint(*part).encode('utf-8'))
+        else:
+            digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Thread-safe LRU cache of serialized figures with a byte budget
+
+    Values are Plotly figure JSON (str) or rendered image bytes; the size of
+    an entry is its serialized length. Entries larger than the whole budget
+    are rendered but never stored.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = len(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key))
+            if size > self.max_bytes:
+                return
+            self._entries[key] = value
+            self.size += size
+            while self.size > self.max_bytes or len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Entry count, bytes used and hit/miss counters"""
+        return {'entries': len(self._entries), 'bytes': self.size,
+                'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+
+_default_cache = FigureCache()
+
+
+def default_cache():
+    """Cache shared by every session of the dashboard process"""
+    return _default_cache
+
+
+def plotly_figure(name, data, build, cache=None):
+    """Plotly figure for a chart, rebuilt from cached JSON when data is unchanged
+
+    `data` is whatever the chart is drawn from (aggregate series, frames,
+    options); `build` is only called on a miss.
+    """
+    cache = _default_cache if cache is None else cache
+    key = ('plotly', name, fingerprint(data))
+    text = cache.get(key)
+    if text is not None:
+        return pio.from_json(text)
+    figure = build()
+    cache.put(key, figure.to_json())
+    return figure
+
+
+def matplotlib_png(name, data, build, cache=None, dpi=200):
+    """PNG bytes for a Matplotlib chart, rendered only when data has changed
+
+    `build` returns a Matplotlib figure, which is closed after rendering. The
+    defaults match st.pyplot (dpi 200, tight bounding box).
+    """
+    cache = _default_cache if cache is None else cache
+    key = ('png', name, dpi, fingerprint(data))
+    png = cache.get(key)
+    if png is not None:
+        return png
+    figure = build()
+    buffer = io.BytesIO()
+    try:
+        figure.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    finally:
+        plt.close(figure)
+    png = buffer.getvalue()
+    cache.put(key, png)
+    return png
@@ -12,9 +12,48 @@ import seaborn as sns
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import json
+import os
 from datetime import datetime
 import calendar
+import io
+
+from aggregates import build_participant_cube
+from attendance_stream import AttendanceCounters
+from certificates import (CERTIFICATE_TYPES, CertificateTemplate, certificate_eligibility,
+                          certificate_records, write_certificates)
+from checkin import CHECKIN_LOG
+from figure_cache import matplotlib_png, plotly_figure
+from hta_engine import efficiency_frontier, net_monetary_benefit, optimal_strategies, run_psa
+from hta_engine.psa import HYPERTENSION_PARAMETERS, HYPERTENSION_STRATEGIES, hypertension_model
+from item_analysis import ItemAnalysisStore, accumulate, analyze_items
+from lecture_index import LectureIndex
+from quiz_scoring import load_answer_key
+from registration_ingest import RegistrationStore
+from sample_data import generate_participants, generate_quiz_responses
+from workshop_registry import load_registry
+
+# Every page shares one cached participant frame. Copy-on-write stops
+# derived frames from writing back into it (always on from pandas 3.0).
+if int(pd.__version__.split('.')[0]) < 3:
+    try:
+        pd.set_option('mode.copy_on_write', True)
+    except KeyError:
+        pass
+
+# Registration store fed from form exports dropped into the inbox directory
+REGISTRATION_STORE_PATH = os.environ.get('HTA_REGISTRATION_STORE', '')
+REGISTRATION_INBOX_PATH = os.environ.get('HTA_REGISTRATION_INBOX', '')
+# Exported participant data (CSV); falls back to sample data when unset
+PARTICIPANT_DATA_PATH = os.environ.get('HTA_PARTICIPANT_DATA', '')
+# Sample cohort size, raise it to load-test the dashboard pages
+SAMPLE_ROWS = int(os.environ.get('HTA_SAMPLE_ROWS', '45'))
+# Exported quiz response batches for item analysis; sample responses when unset
+QUIZ_RESPONSES_PATH = os.environ.get('HTA_QUIZ_RESPONSES', '')
+# Check-in event log behind the live headcounts (defaults to the registration store's)
+CHECKIN_LOG_PATH = os.environ.get('HTA_CHECKIN_LOG', '') or (
+    os.path.join(REGISTRATION_STORE_PATH, CHECKIN_LOG) if REGISTRATION_STORE_PATH else '')
+# Seconds between live attendance refreshes
+LIVE_REFRESH_SECONDS = int(os.environ.get('HTA_LIVE_REFRESH', '5'))
 
 # Configure page
 st.set_page_config(
@@ -50,70 +89,147 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Sample data generation (replace with actual Google Sheets data)
-def generate_sample_data():
-    np.random.seed(42)
-
-    # Participant data
-    participants = []
-    for i in range(45):
-        reg_date = pd.Timestamp('2025-01-01') + pd.Timedelta(days=np.random.randint(0, 30))
-
-        participant = {
-            'id': f'P{i+1:03d}',
-            'name': f'Participant {i+1}',
-            'email': f'participant{i+1}@example.com',
-            'designation': np.random.choice([
-                'PG Resident (MD)', 'PG Resident (MS)', 'Assistant Professor',
-                'Researcher', 'Medical Officer', 'Consultant'
-            ]),
-            'institution': np.random.choice([
-                'PGIMER Chandigarh', 'AIIMS Delhi', 'CMC Vellore', 'KMC Manipal',
-                'MAMC Delhi', 'JIPMER Puducherry', 'Other'
-            ]),
-            'specialty': np.random.choice([
-                'Community Medicine', 'Internal Medicine', 'Surgery', 'Pediatrics',
-                'Obstetrics & Gynecology', 'Pathology', 'Other'
-            ]),
-            'qualification': np.random.choice([
-                'MBBS', 'MD/MS', 'DM/MCh', 'PhD', 'MPH'
-            ]),
-            'experience_years': np.random.randint(1, 15),
-            'hta_knowledge': np.random.choice([
-                'None - Complete beginner', 'Basic understanding',
-                'Intermediate knowledge', 'Advanced expertise'
-            ]),
-            'category': np.random.choice(['PG Resident (₹2,000)', 'Faculty/Researcher (₹3,000)']),
-            'payment_status': np.random.choice(['Paid', 'Pending'], p=[0.85, 0.15]),
-            'registration_date': reg_date,
-            'attendance_day1': np.random.choice(['Present', 'Absent'], p=[0.92, 0.08]),
-            'attendance_day2': np.random.choice(['Present', 'Absent'], p=[0.88, 0.12]),
-            'quiz_score': np.random.normal(75, 15) if np.random.random() > 0.1 else None,
-            'feedback_rating': np.random.randint(3, 6),
-            'accommodation_required': np.random.choice(['Yes', 'No'], p=[0.3, 0.7])
-        }
-
-        participants.append(participant)
-
-    return pd.DataFrame(participants)
+@st.cache_resource
+def _registration_store(path):
+    """Registration store handle shared by all sessions"""
+    return RegistrationStore(path)
+
+def participant_data_version(path=None):
+    """Return a token that changes whenever the participant data source changes
+
+    For a registration store only the inbox batches and the state file are
+    stat'ed; ingestion runs (under the store's lock) when a batch is new or
+    has changed.
+    """
+    if path is None and REGISTRATION_STORE_PATH:
+        store = _registration_store(os.path.abspath(REGISTRATION_STORE_PATH))
+        if (REGISTRATION_INBOX_PATH and os.path.isdir(REGISTRATION_INBOX_PATH)
+                and store.pending(REGISTRATION_INBOX_PATH)):
+            store.ingest_directory(REGISTRATION_INBOX_PATH)
+        else:
+            store.refresh()
+        for batch, failure in store.failed.items():
+            st.warning(f"Registration batch {os.path.basename(batch)} was skipped: {failure['error']}")
+        return ('store', store.path) + store.version()
+    path = PARTICIPANT_DATA_PATH if path is None else path
+    if path and os.path.exists(path):
+        stat = os.stat(path)
+        return ('csv', os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    return ('sample', 42, SAMPLE_ROWS)
+
+@st.cache_resource(max_entries=2, show_spinner="Loading participant data...")
+def _load_participant_frame(version):
+    """Build the participant frame for one data-source version
+
+    Check-ins are not applied here: they arrive without changing the version,
+    so attendance is read from the live counters instead.
+    """
+    if version[0] == 'store':
+        df = RegistrationStore(version[1]).read()
+    elif version[0] == 'csv':
+        df = pd.read_csv(version[1], parse_dates=['registration_date'])
+    else:
+        df = generate_participants(n=version[2], seed=version[1])
+    return df
+
+def load_participant_data(version=None):
+    """Shared, read-only participant frame for all dashboard pages
+
+    The frame is built once per data-source version and the same object is
+    handed to every page and every rerun, so pages must not modify it in place.
+    """
+    return _load_participant_frame(participant_data_version() if version is None else version)
+
+@st.cache_resource(max_entries=2, show_spinner="Aggregating participant data...")
+def _load_participant_cube(version):
+    """Build the aggregate cube for one data-source version"""
+    return build_participant_cube(_load_participant_frame(version))
+
+def load_participant_cube(version=None):
+    """Shared aggregate cube that backs the dashboard metrics and charts"""
+    return _load_participant_cube(participant_data_version() if version is None else version)
+
+@st.cache_resource(max_entries=2)
+def _load_attendance_counters(version):
+    """Live attendance counters over one participant data version"""
+    return AttendanceCounters(_load_participant_frame(version), CHECKIN_LOG_PATH or None)
+
+def load_attendance_counters(version=None):
+    """Shared live attendance counters, caught up with the check-in log
+
+    New check-ins only append to the log, so they do not change the data
+    version; each call applies just the events logged since the last one.
+    """
+    counters = _load_attendance_counters(participant_data_version() if version is None else version)
+    counters.poll()
+    return counters
+
+@st.cache_resource
+def _quiz_response_store(path):
+    """Item statistics cache over one quiz response directory, shared by all sessions"""
+    return ItemAnalysisStore(path)
+
+def item_analysis_version():
+    """Return a token that changes whenever a quiz response batch changes"""
+    if QUIZ_RESPONSES_PATH and os.path.isdir(QUIZ_RESPONSES_PATH):
+        path = os.path.abspath(QUIZ_RESPONSES_PATH)
+        store = _quiz_response_store(path)
+        store.refresh()
+        return ('responses', path) + store.version()
+    return ('sample', 42, SAMPLE_ROWS)
+
+@st.cache_resource(max_entries=2, show_spinner="Analysing quiz items...")
+def _load_item_analysis(version):
+    """Item analysis for one quiz response version"""
+    if version[0] == 'responses':
+        return _quiz_response_store(version[1]).analyze()
+    key = load_answer_key()
+    # Easy / medium / hard items sit at -1 / 0 / +1 on the ability scale
+    locations = np.where(key.difficulty_codes >= 0, key.difficulty_codes - 1, 0)
+    codes = generate_quiz_responses(key.answers, n=version[2], seed=version[1],
+                                    item_locations=locations)
+    return analyze_items(key, accumulate(key, codes))
+
+def load_item_analysis():
+    """Shared item analysis of every quiz response received so far"""
+    return _load_item_analysis(item_analysis_version())
+
+@st.cache_resource
+def load_lecture_index():
+    """Lecture search index shared by all sessions, refreshed from changed files only"""
+    return LectureIndex()
+
+@st.cache_resource(max_entries=4, show_spinner="Running probabilistic sensitivity analysis...")
+def load_hypertension_psa(iterations, max_wtp, seed=42):
+    """PSA of the lecture's hypertension example, shared by all sessions"""
+    wtp = np.linspace(0, max_wtp, 201)
+    return run_psa(hypertension_model, HYPERTENSION_PARAMETERS, HYPERTENSION_STRATEGIES,
+                   iterations, wtp, seed=seed, workers=1)
 
 # Load workshop metadata
-@st.cache_data
 def load_workshop_metadata():
-    try:
-        with open('HTA_Workshop_2025/06_Reports/workshop_metadata.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {
-            'title': 'HTA Workshop 2025',
-            'date': 'February 15-16, 2025',
-            'venue': 'PGIMER Chandigarh'
-        }
+    """Metadata of the selected workshop edition from the shared registry"""
+    registry = load_registry()
+    if len(registry) > 1:
+        editions = [record['id'] for record in registry]
+        workshop_id = st.sidebar.selectbox(
+            "Workshop edition:", editions, index=editions.index(registry.default()['id']),
+            format_func=lambda i: f"{registry.get(i)['title']} ({registry.get(i)['date']})")
+        return registry.get(workshop_id)
+    return registry.default() or {
+        'title': 'HTA Workshop 2025',
+        'date': 'February 15-16, 2025',
+        'venue': 'PGIMER Chandigarh'
+    }
 
 # Main dashboard
 def main():
-    # Load metadata
+    # Load metadata, the shared participant frame and its aggregates; the
+    # data source is checked once per run
     metadata = load_workshop_metadata()
+    version = participant_data_version()
+    df = load_participant_data(version)
+    cube = load_participant_cube(version)
 
     # Sidebar
     with st.sidebar:
@@ -135,59 +251,70 @@ def main():
             "📈 Attendance Tracking",
             "🧠 Assessment Results",
             "⭐ Feedback & Ratings",
+            "💹 Economic Evaluation",
+            "🔎 Lecture Search",
             "📋 Reports & Downloads"
         ])
         st.markdown('</div>', unsafe_allow_html=True)
 
     # Main content
     if selected_page == "📊 Overview Dashboard":
-        show_overview_dashboard(metadata)
+        show_overview_dashboard(metadata, cube, load_attendance_counters(version))
     elif selected_page == "👥 Participant Analytics":
-        show_participant_analytics()
+        show_participant_analytics(cube)
     elif selected_page == "💰 Payment Analytics":
-        show_payment_analytics()
+        show_payment_analytics(df, cube)
     elif selected_page == "📈 Attendance Tracking":
-        show_attendance_tracking()
+        show_attendance_tracking(df, load_attendance_counters(version))
     elif selected_page == "🧠 Assessment Results":
-        show_assessment_results()
+        show_assessment_results(cube, load_item_analysis())
     elif selected_page == "⭐ Feedback & Ratings":
-        show_feedback_ratings()
+        show_feedback_ratings(cube)
+    elif selected_page == "💹 Economic Evaluation":
+        show_economic_evaluation()
+    elif selected_page == "🔎 Lecture Search":
+        show_lecture_search()
     elif selected_page == "📋 Reports & Downloads":
-        show_reports_downloads()
+        show_reports_downloads(load_attendance_counters(version).apply(df), metadata)
+
+def show_no_registrations():
+    """Empty state for pages that report shares of the registered participants"""
+    st.info("No registrations yet. Figures will appear once the first registrations are received.")
 
-def show_overview_dashboard(metadata):
+def show_overview_dashboard(metadata, cube, counters):
     st.markdown('<div class="main-header">', unsafe_allow_html=True)
     st.title("🏥 HTA Workshop 2025 Analytics Dashboard")
     st.markdown("**PGIMER Chandigarh** • Real-time Insights & Data Visualization")
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Load sample data
-    df = generate_sample_data()
+    if not cube.total:
+        show_no_registrations()
+        return
 
     # Key metrics row
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        total_registrations = len(df)
+        total_registrations = cube.total
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
         st.metric("Total Registrations", total_registrations, f"{50-total_registrations} remaining")
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col2:
-        paid_count = len(df[df['payment_status'] == 'Paid'])
+        paid_count = cube.count(payment_status='Paid')
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("Payments Completed", paid_count, f"{paid_count/len(df)*100:.1f}%")
+        st.metric("Payments Completed", paid_count, f"{paid_count/cube.total*100:.1f}%")
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col3:
-        attendance_day1 = len(df[df['attendance_day1'] == 'Present'])
+        attendance_day1 = counters.summary()['checked_in'][1]
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
-        st.metric("Day 1 Attendance", attendance_day1, f"{attendance_day1/len(df)*100:.1f}%")
+        st.metric("Day 1 Attendance", attendance_day1, f"{attendance_day1/cube.total*100:.1f}%")
         st.markdown('</div>', unsafe_allow_html=True)
 
     with col4:
-        quiz_scores = df['quiz_score'].dropna()
-        avg_score = quiz_scores.mean() if len(quiz_scores) > 0 else 0
+        quiz_count, avg_score = cube.overall('quiz_score')
+        avg_score = avg_score if quiz_count > 0 else 0
         st.markdown('<div class="metric-card">', unsafe_allow_html=True)
         st.metric("Avg Quiz Score", f"{avg_score:.1f}%", "Above target")
         st.markdown('</div>', unsafe_allow_html=True)
@@ -197,22 +324,30 @@ def show_overview_dashboard(metadata):
 
     with col1:
         st.subheader("📅 Registration Trend")
-        daily_regs = df.groupby(df['registration_date'].dt.date).size().reset_index()
+        daily_regs = cube.counts('registration_date').sort_index().reset_index()
         daily_regs.columns = ['Date', 'Registrations']
 
-        fig = px.line(daily_regs, x='Date', y='Registrations',
-                     title="Daily Registration Pattern")
-        fig.update_traces(mode='lines+markers', line_color='#0066CC', marker_color='#CC0066')
+        def build_trend():
+            fig = px.line(daily_regs, x='Date', y='Registrations',
+                         title="Daily Registration Pattern")
+            fig.update_traces(mode='lines+markers', line_color='#0066CC', marker_color='#CC0066')
+            return fig
+
+        fig = plotly_figure('overview_trend', daily_regs, build_trend)
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
         st.subheader("🏥 Participant Distribution by Institution")
-        inst_counts = df['institution'].value_counts()
+        inst_counts = cube.counts('institution')
+
+        def build_institutions():
+            fig = px.pie(values=inst_counts.values, names=inst_counts.index,
+                        title="Institution Representation",
+                        color_discrete_sequence=px.colors.sequential.Blues_r)
+            fig.update_traces(textinfo='percent+label')
+            return fig
 
-        fig = px.pie(values=inst_counts.values, names=inst_counts.index,
-                    title="Institution Representation",
-                    color_discrete_sequence=px.colors.sequential.Blues_r)
-        fig.update_traces(textinfo='percent+label')
+        fig = plotly_figure('overview_institutions', inst_counts, build_institutions)
         st.plotly_chart(fig, use_container_width=True)
 
     # Progress indicators
@@ -223,106 +358,118 @@ def show_overview_dashboard(metadata):
         st.metric("Registration Progress", f"{total_registrations}/50", f"{(total_registrations/50)*100:.1f}%")
 
     with col2:
-        confirmed_seats = len(df[df['payment_status'] == 'Paid'])
+        confirmed_seats = cube.count(payment_status='Paid')
         st.metric("Confirmed Seats", f"{confirmed_seats}/50", f"{(confirmed_seats/50)*100:.1f}%")
 
     with col3:
-        active_participants = len(df[(df['payment_status'] == 'Paid') &
-                                   (df['attendance_day1'].isin(['Present', 'Unknown']))])
+        active_participants = cube.count(payment_status='Paid',
+                                         attendance_day1=['Present', 'Unknown'])
         st.metric("Active Participants", active_participants, "Workshop ready")
 
-def show_participant_analytics():
+def show_participant_analytics(cube):
     st.subheader("👥 Participant Analytics")
 
-    df = generate_sample_data()
+    if not cube.total:
+        show_no_registrations()
+        return
 
     # Demographics
     col1, col2, col3 = st.columns(3)
 
     with col1:
         st.markdown("### Academic Qualifications")
-        qual_counts = df['qualification'].value_counts()
-        fig = px.bar(x=qual_counts.index, y=qual_counts.values,
-                    title="Qualification Distribution", color=qual_counts.values,
-                    color_continuous_scale='Blues')
+        qual_counts = cube.counts('qualification')
+        fig = plotly_figure('participants_qualification', qual_counts, lambda: px.bar(
+            x=qual_counts.index, y=qual_counts.values,
+            title="Qualification Distribution", color=qual_counts.values,
+            color_continuous_scale='Blues'))
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
         st.markdown("### Medical Specialties")
-        spec_counts = df['specialty'].value_counts()
-        fig = px.bar(x=spec_counts.index, y=spec_counts.values,
-                    title="Specialty Distribution", color=spec_counts.values,
-                    color_continuous_scale='Reds', orientation='h')
+        spec_counts = cube.counts('specialty')
+        fig = plotly_figure('participants_specialty', spec_counts, lambda: px.bar(
+            x=spec_counts.index, y=spec_counts.values,
+            title="Specialty Distribution", color=spec_counts.values,
+            color_continuous_scale='Reds', orientation='h'))
         st.plotly_chart(fig, use_container_width=True)
 
     with col3:
         st.markdown("### HTA Knowledge Levels")
-        knowledge_counts = df['hta_knowledge'].value_counts()
-        fig = px.pie(values=knowledge_counts.values, names=knowledge_counts.index,
-                    title="Prior HTA Knowledge")
+        knowledge_counts = cube.counts('hta_knowledge')
+        fig = plotly_figure('participants_knowledge', knowledge_counts, lambda: px.pie(
+            values=knowledge_counts.values, names=knowledge_counts.index,
+            title="Prior HTA Knowledge"))
         st.plotly_chart(fig, use_container_width=True)
 
     # Experience analysis
     st.markdown("### Experience Distribution")
-    exp_bins = pd.cut(df['experience_years'], bins=[0, 2, 5, 10, 15, 20],
-                     labels=['0-2 years', '3-5 years', '6-10 years', '11-15 years', '15+ years'])
-    exp_counts = exp_bins.value_counts()
+    exp_counts = cube.counts('experience_band')
 
-    fig = px.bar(x=exp_counts.index, y=exp_counts.values,
-                title="Years of Professional Experience",
-                color=exp_counts.values, color_continuous_scale='Purples')
+    fig = plotly_figure('participants_experience', exp_counts, lambda: px.bar(
+        x=exp_counts.index, y=exp_counts.values,
+        title="Years of Professional Experience",
+        color=exp_counts.values, color_continuous_scale='Purples'))
     st.plotly_chart(fig, use_container_width=True)
 
-def show_payment_analytics():
+def show_payment_analytics(df, cube):
     st.subheader("💰 Payment Analytics")
 
-    df = generate_sample_data()
+    if not cube.total:
+        show_no_registrations()
+        return
 
     # Payment status
     col1, col2 = st.columns(2)
 
     with col1:
         st.markdown("### Payment Status Overview")
-        payment_status = df['payment_status'].value_counts()
-
-        fig = make_subplots(rows=1, cols=2, specs=[[{'type':'domain'}, {'type':'table'}]])
-
-        # Pie chart
-        fig.add_trace(go.Pie(labels=payment_status.index, values=payment_status.values,
-                           name="Payment Status", marker_colors=['#28A745', '#DC3545']), 1, 1)
+        payment_status = cube.counts('payment_status')
 
         # Revenue table
         revenue_data = []
-        for category in df['category'].unique():
-            cat_df = df[df['category'] == category]
-            paid_count = len(cat_df[cat_df['payment_status'] == 'Paid'])
+        category_totals = cube.counts('category')
+        category_paid = cube.counts('category', payment_status='Paid')
+        for category, category_total in category_totals.items():
+            paid_count = int(category_paid.get(category, 0))
             if '2,000' in category:
                 amount_per = 2000
             else:
                 amount_per = 3000
             total_revenue = paid_count * amount_per
             revenue_data.append([category, paid_count, f"₹{amount_per:,}",
-                               f"₹{total_revenue:,}", f"{paid_count/len(cat_df)*100:.1f}%"])
+                               f"₹{total_revenue:,}", f"{paid_count/category_total*100:.1f}%"])
 
-        fig.add_trace(go.Table(
-            header=dict(values=['Category', 'Paid Count', 'Rate', 'Revenue', 'Completion %']),
-            cells=dict(values=np.array(revenue_data).T)
-        ), 1, 2)
+        def build_payment_status():
+            fig = make_subplots(rows=1, cols=2, specs=[[{'type':'domain'}, {'type':'table'}]])
 
-        fig.update_layout(title="Payment Status & Revenue Analysis")
+            # Pie chart
+            fig.add_trace(go.Pie(labels=payment_status.index, values=payment_status.values,
+                               name="Payment Status", marker_colors=['#28A745', '#DC3545']), 1, 1)
+
+            fig.add_trace(go.Table(
+                header=dict(values=['Category', 'Paid Count', 'Rate', 'Revenue', 'Completion %']),
+                cells=dict(values=np.array(revenue_data).T)
+            ), 1, 2)
+
+            fig.update_layout(title="Payment Status & Revenue Analysis")
+            return fig
+
+        fig = plotly_figure('payment_status', (payment_status, revenue_data), build_payment_status)
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
         st.markdown("### Payment Trend")
-        df_paid = df[df['payment_status'] == 'Paid'].copy()
-        df_paid['payment_date'] = df_paid['registration_date']
+        daily_payments = cube.counts('registration_date', payment_status='Paid').sort_index()
 
-        daily_payments = df_paid.groupby(df_paid['payment_date'].dt.date).size()
-
-        fig = px.area(x=daily_payments.index, y=daily_payments.values,
-                     title="Daily Payment Completions",
-                     color_discrete_sequence=['#28A745'])
-        st.plotly_chart(fig, use_container_width=True)
+        if daily_payments.empty:
+            st.info("No payments completed yet.")
+        else:
+            fig = plotly_figure('payment_trend', daily_payments, lambda: px.area(
+                x=daily_payments.index, y=daily_payments.values,
+                title="Daily Payment Completions",
+                color_discrete_sequence=['#28A745']))
+            st.plotly_chart(fig, use_container_width=True)
 
     # Outstanding payments
     st.markdown("### Pending Payments")
@@ -332,161 +479,348 @@ def show_payment_analytics():
     else:
         st.success("✅ All payments completed!")
 
-def show_attendance_tracking():
+def show_attendance_tracking(df, counters):
     st.subheader("📈 Attendance Tracking")
 
-    df = generate_sample_data()
+    if not len(df):
+        show_no_registrations()
+        return
+
+    show_live_attendance(df, counters)
+
+def _attendance_table(table, label):
+    """Display frame of checked-in counts and rates from a counters table"""
+    rows = pd.DataFrame({label: table.index})
+    for day in (1, 2):
+        present = table[f'day{day}_checked_in'].to_numpy()
+        rows[f'Day {day} Present'] = present
+        rows[f'Day {day} Rate'] = [f"{p/t*100:.1f}%" for p, t in zip(present, table['total'])]
+        rows[f'Day {day} On Site'] = table[f'day{day}_on_site'].to_numpy()
+    return rows
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def show_live_attendance(df, counters):
+    """Headcounts and the attendance report, refreshed on their own from the check-in event log"""
+    counters.poll()
+    summary = counters.summary()
+    total = summary['total']
 
     # Overall attendance
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        day1_attendance = len(df[df['attendance_day1'] == 'Present'])
-        st.metric("Day 1 Attendance", f"{day1_attendance}/{len(df)}",
-                 f"{day1_attendance/len(df)*100:.1f}%")
+        day1_attendance = summary['checked_in'][1]
+        st.metric("Day 1 Attendance", f"{day1_attendance}/{total}",
+                 f"{day1_attendance/total*100:.1f}%")
+        st.caption(f"On site now: {summary['on_site'][1]}")
 
     with col2:
-        day2_attendance = len(df[df['attendance_day2'] == 'Present'])
-        st.metric("Day 2 Attendance", f"{day2_attendance}/{len(df)}",
-                 f"{day2_attendance/len(df)*100:.1f}%")
+        day2_attendance = summary['checked_in'][2]
+        st.metric("Day 2 Attendance", f"{day2_attendance}/{total}",
+                 f"{day2_attendance/total*100:.1f}%")
+        st.caption(f"On site now: {summary['on_site'][2]}")
 
     with col3:
-        both_days = len(df[(df['attendance_day1'] == 'Present') &
-                          (df['attendance_day2'] == 'Present')])
-        st.metric("Full Attendance", f"{both_days}/{len(df)}",
-                 f"{both_days/len(df)*100:.1f}%")
+        both_days = summary['full']
+        st.metric("Full Attendance", f"{both_days}/{total}",
+                 f"{both_days/total*100:.1f}%")
+        if summary['updated']:
+            st.caption(f"{summary['events']} check-in events, last at {summary['updated']:%H:%M:%S}")
 
     # Attendance by category
     st.markdown("### Attendance by Participant Category")
+    st.dataframe(_attendance_table(counters.table('category'), 'Category'), hide_index=True)
 
-    attendance_data = []
-    for category in df['category'].unique():
-        cat_df = df[df['category'] == category]
-
-        day1_present = len(cat_df[cat_df['attendance_day1'] == 'Present'])
-        day2_present = len(cat_df[cat_df['attendance_day2'] == 'Present'])
-
-        attendance_data.append({
-            'Category': category,
-            'Day 1 Present': day1_present,
-            'Day 1 Rate': f"{day1_present/len(cat_df)*100:.1f}%",
-            'Day 2 Present': day2_present,
-            'Day 2 Rate': f"{day2_present/len(cat_df)*100:.1f}%"
-        })
-
-    attendance_df = pd.DataFrame(attendance_data)
-    st.dataframe(attendance_df)
+    with st.expander("Attendance by Institution"):
+        st.dataframe(_attendance_table(counters.table('institution'), 'Institution'), hide_index=True)
 
     # Detailed attendance view
     st.markdown("### Detailed Attendance Report")
     attendance_cols = ['name', 'institution', 'designation', 'attendance_day1', 'attendance_day2', 'payment_status']
-    st.dataframe(df[attendance_cols].sort_values(['attendance_day1', 'attendance_day2']))
+    st.dataframe(counters.apply(df)[attendance_cols].sort_values(['attendance_day1', 'attendance_day2']))
 
-def show_assessment_results():
+def show_assessment_results(cube, item_analysis):
     st.subheader("🧠 Assessment Results")
 
-    df = generate_sample_data()
-
     # Quiz score distribution
-    quiz_scores = df['quiz_score'].dropna()
+    quiz_count, quiz_mean = cube.overall('quiz_score')
+    quiz_distribution = cube.quiz_distribution
 
-    if len(quiz_scores) > 0:
+    if quiz_count > 0:
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            st.metric("Average Score", f"{quiz_scores.mean():.1f}%", "Above 70% target")
+            st.metric("Average Score", f"{quiz_mean:.1f}%", "Above 70% target")
         with col2:
-            st.metric("Highest Score", f"{quiz_scores.max():.1f}%")
+            st.metric("Highest Score", f"{quiz_distribution['max']:.1f}%")
         with col3:
-            st.metric("Completion Rate", f"{len(quiz_scores)/len(df)*100:.1f}%", "Quiz responses")
+            st.metric("Completion Rate", f"{quiz_count/cube.total*100:.1f}%", "Quiz responses")
 
         # Score distribution chart
         st.markdown("### Quiz Score Distribution")
 
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
+        def build_distribution():
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 5))
 
-        # Histogram
-        ax1.hist(quiz_scores, bins=10, alpha=0.7, color='#0066CC', edgecolor='black')
-        ax1.set_xlabel('Score (%)')
-        ax1.set_ylabel('Number of Participants')
-        ax1.set_title('Score Distribution')
-        ax1.grid(True, alpha=0.3)
+            # Histogram
+            hist_counts, hist_edges = quiz_distribution['histogram']
+            ax1.hist(hist_edges[:-1], bins=hist_edges, weights=hist_counts,
+                    alpha=0.7, color='#0066CC', edgecolor='black')
+            ax1.set_xlabel('Score (%)')
+            ax1.set_ylabel('Number of Participants')
+            ax1.set_title('Score Distribution')
+            ax1.grid(True, alpha=0.3)
 
-        # Box plot
-        ax2.boxplot(quiz_scores, vert=False, patch_artist=True,
+            # Box plot
+            ax2.bxp([quiz_distribution['boxplot']], vert=False, patch_artist=True,
                    boxprops=dict(facecolor='#CC0066', color='black'),
                    medianprops=dict(color='white', linewidth=2))
-        ax2.set_xlabel('Score (%)')
-        ax2.set_title('Score Variability')
-        ax2.grid(True, alpha=0.3)
+            ax2.set_xlabel('Score (%)')
+            ax2.set_title('Score Variability')
+            ax2.grid(True, alpha=0.3)
 
-        plt.tight_layout()
-        st.pyplot(fig)
+            plt.tight_layout()
+            return fig
+
+        # Rendering is the slowest step of this page, so the PNG itself is cached
+        st.image(matplotlib_png('assessment_distribution', quiz_distribution, build_distribution),
+                 width='stretch')
 
         # Scores by specialty
         st.markdown("### Performance by Specialty")
 
-        specialty_scores = df.groupby('specialty')['quiz_score'].agg(['mean', 'count', 'std']).round(1)
+        specialty_scores = cube.stats('quiz_score', by='specialty').round(1)
         specialty_scores = specialty_scores[specialty_scores['count'] > 0]
         specialty_scores.columns = ['Average Score', 'Count', 'Std Dev']
 
-        fig = px.bar(specialty_scores.reset_index(),
-                    x='specialty', y='Average Score',
-                    color='Count', title="Quiz Performance by Specialty")
+        fig = plotly_figure('assessment_specialty', specialty_scores, lambda: px.bar(
+            specialty_scores.reset_index(),
+            x='specialty', y='Average Score',
+            color='Count', title="Quiz Performance by Specialty"))
         st.plotly_chart(fig, use_container_width=True)
 
     else:
         st.info("No quiz scores available yet. Quiz will be held during workshop.")
 
-def show_feedback_ratings():
+    show_item_analysis(item_analysis)
+
+def show_item_analysis(item_analysis):
+    st.markdown("### Item Analysis")
+
+    respondents = item_analysis['respondents']
+    if respondents == 0:
+        st.info("Item statistics will appear once quiz responses are received.")
+        return
+
+    items = item_analysis['items']
+    topics = item_analysis['topics']
+    flagged = items[items['flags'] != '']
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Quiz Respondents", f"{respondents:,}")
+    with col2:
+        st.metric("Median Difficulty (p)", f"{items['p_value'].median():.2f}")
+    with col3:
+        st.metric("Items to Review", f"{len(flagged)}/{len(items)}")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        fig = plotly_figure('item_map', items, lambda: px.scatter(
+            items, x='p_value', y='point_biserial', color='topic',
+            hover_data=['question_id', 'difficulty_level', 'flags'],
+            title="Difficulty vs Discrimination",
+            labels={'p_value': 'Proportion Correct (p)', 'point_biserial': 'Point-Biserial'}))
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        st.markdown("#### Reliability by Topic (KR-20)")
+        reliability = topics[['items', 'mean_correct', 'kr20']].round(2)
+        reliability.columns = ['Items', 'Mean Correct', 'KR-20']
+        st.dataframe(reliability)
+
+    st.markdown("#### Item Statistics")
+    item_table = items.set_index('question_id')
+    option_columns = ['option_a', 'option_b', 'option_c', 'option_d', 'unanswered']
+    item_table[option_columns] = item_table[option_columns] * 100
+    st.dataframe(item_table.round({'p_value': 2, 'point_biserial': 2, **dict.fromkeys(option_columns, 1)}))
+
+def show_feedback_ratings(cube):
     st.subheader("⭐ Workshop Feedback & Ratings")
 
-    df = generate_sample_data()
+    rating_total, avg_rating = cube.overall('feedback_rating')
 
-    if 'feedback_rating' in df.columns:
+    if rating_total > 0:
         # Overall rating
-        avg_rating = df['feedback_rating'].mean()
+        rating_counts = cube.counts('feedback_rating').sort_index()
 
         col1, col2, col3 = st.columns(3)
 
         with col1:
             st.metric("Average Rating", f"{avg_rating:.2f}/5", "Very Good")
         with col2:
-            high_ratings = len(df[df['feedback_rating'] >= 4])
-            st.metric("Satisfied Participants", f"{high_ratings}/{len(df)}", f"{high_ratings/len(df)*100:.1f}%")
+            high_ratings = int(rating_counts[rating_counts.index >= 4].sum())
+            st.metric("Satisfied Participants", f"{high_ratings}/{cube.total}", f"{high_ratings/cube.total*100:.1f}%")
         with col3:
-            excellent_ratings = len(df[df['feedback_rating'] >= 5])
-            st.metric("Excellent Ratings", f"{excellent_ratings}/{len(df)}", f"{excellent_ratings/len(df)*100:.1f}%")
+            excellent_ratings = int(rating_counts[rating_counts.index >= 5].sum())
+            st.metric("Excellent Ratings", f"{excellent_ratings}/{cube.total}", f"{excellent_ratings/cube.total*100:.1f}%")
 
         # Rating distribution
         st.markdown("### Rating Distribution")
 
-        rating_counts = df['feedback_rating'].value_counts().sort_index()
+        def build_ratings():
+            fig = px.bar(x=rating_counts.index, y=rating_counts.values,
+                        title="Participant Feedback Ratings",
+                        labels={'x': 'Rating (1-5)', 'y': 'Number of Responses'},
+                        color_discrete_sequence=['#FF9900'])
+            fig.update_xaxes(type='category')
+            return fig
 
-        fig = px.bar(x=rating_counts.index, y=rating_counts.values,
-                    title="Participant Feedback Ratings",
-                    labels={'x': 'Rating (1-5)', 'y': 'Number of Responses'},
-                    color_discrete_sequence=['#FF9900'])
-        fig.update_xaxes(type='category')
+        fig = plotly_figure('feedback_ratings', rating_counts, build_ratings)
         st.plotly_chart(fig, use_container_width=True)
 
         # Rating by knowledge level
         st.markdown("### Feedback by Prior HTA Knowledge")
 
-        knowledge_ratings = df.groupby('hta_knowledge')['feedback_rating'].agg(['mean', 'count']).round(2)
+        knowledge_ratings = cube.stats('feedback_rating', by='hta_knowledge')[['mean', 'count']].round(2)
         knowledge_ratings.columns = ['Average Rating', 'Count']
 
-        fig = px.bar(knowledge_ratings.reset_index(),
-                    x='hta_knowledge', y='Average Rating',
-                    title="Feedback by Knowledge Level",
-                    color='Count')
-        fig.update_xaxes(tickangle=45)
+        def build_knowledge_ratings():
+            fig = px.bar(knowledge_ratings.reset_index(),
+                        x='hta_knowledge', y='Average Rating',
+                        title="Feedback by Knowledge Level",
+                        color='Count')
+            fig.update_xaxes(tickangle=45)
+            return fig
+
+        fig = plotly_figure('feedback_knowledge', knowledge_ratings, build_knowledge_ratings)
         st.plotly_chart(fig, use_container_width=True)
 
     else:
         st.info("Feedback data will be collected after workshop completion.")
 
-def show_reports_downloads():
+# Hypertension exercise from the Economic Evaluation Frameworks lecture, extended
+# with a dominated and an extendedly dominated option
+EXAMPLE_STRATEGIES = pd.DataFrame({
+    'strategy': ['Standard care', 'Lifestyle programme', 'New drug', 'Alternative drug',
+                 'Combination therapy'],
+    'cost': [10000, 12500, 15000, 16000, 22000],
+    'effect': [5.0, 5.1, 6.0, 5.5, 6.5],
+})
+
+def show_economic_evaluation():
+    st.subheader("💹 Economic Evaluation")
+    st.markdown("Edit the strategies to see the efficiency frontier, ICERs and net monetary benefit.")
+
+    strategies = st.data_editor(EXAMPLE_STRATEGIES, num_rows="dynamic", key="cea_strategies")
+    strategies = strategies.dropna().drop_duplicates('strategy')
+    if len(strategies) < 2:
+        st.info("Enter at least two strategies with a cost and an effect.")
+        return
+
+    max_wtp = st.slider("Willingness-to-pay range (₹ per QALY)", 10000, 1000000, 100000, step=10000)
+    wtp = np.linspace(0, max_wtp, 1001)
+
+    frontier = efficiency_frontier(strategies['cost'], strategies['effect'], strategies['strategy'])
+    best = strategies['strategy'].to_numpy()[optimal_strategies(strategies['cost'], strategies['effect'], wtp)]
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("### Cost-Effectiveness Plane")
+
+        def build_plane():
+            fig = px.scatter(frontier.reset_index(), x='effect', y='cost', color='status',
+                            text='strategy', title="Strategies and Efficiency Frontier",
+                            labels={'effect': 'Effect (QALYs)', 'cost': 'Cost (₹)'})
+            on_frontier = frontier[frontier['status'] == 'frontier'].sort_values('cost')
+            fig.add_trace(go.Scatter(x=on_frontier['effect'], y=on_frontier['cost'], mode='lines',
+                                     name='Frontier', line_color='#0066CC'))
+            fig.update_traces(textposition='top center', selector=dict(mode='markers+text'))
+            return fig
+
+        fig = plotly_figure('cea_plane', frontier, build_plane)
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        st.markdown("### Net Monetary Benefit")
+
+        def build_nmb():
+            nmb = pd.DataFrame(net_monetary_benefit(strategies['cost'], strategies['effect'], wtp),
+                               index=pd.Index(wtp, name='WTP'), columns=strategies['strategy'])
+            fig = px.line(nmb, title="NMB by Willingness to Pay",
+                          labels={'value': 'NMB (₹)', 'WTP': 'WTP (₹ per QALY)'})
+            return fig
+
+        fig = plotly_figure('cea_nmb', (strategies, max_wtp), build_nmb)
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("### Incremental Analysis")
+    st.dataframe(frontier.round(2))
+
+    switches = np.flatnonzero(best[1:] != best[:-1]) + 1
+    ranges = [f"**{best[0]}** from ₹0"] + [f"**{best[i]}** from ₹{wtp[i]:,.0f}" for i in switches]
+    st.markdown("Optimal strategy by threshold: " + " → ".join(ranges))
+
+    st.markdown("### Probabilistic Sensitivity Analysis")
+    st.markdown("Hypertension example: uncertainty in event risk, treatment effect, costs and utilities.")
+    iterations = st.select_slider("Monte Carlo draws", [1000, 10000, 50000, 100000], value=10000)
+    psa = load_hypertension_psa(iterations, max_wtp)
+    st.caption(f"{psa.iterations:,} draws in {psa.elapsed_seconds:.2f}s")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        def build_psa_plane():
+            plane = psa.incremental_plane(HYPERTENSION_STRATEGIES[0])
+            fig = px.scatter(plane, x='incremental_effect', y='incremental_cost', opacity=0.3,
+                             title=f"Incremental CE Plane vs {HYPERTENSION_STRATEGIES[0]}",
+                             labels={'incremental_effect': 'Incremental QALYs',
+                                     'incremental_cost': 'Incremental cost (₹)'})
+            fig.add_hline(y=0, line_color='grey')
+            fig.add_vline(x=0, line_color='grey')
+            return fig
+
+        fig = plotly_figure('psa_plane', (iterations, max_wtp), build_psa_plane)
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        def build_ceac():
+            fig = make_subplots(specs=[[{"secondary_y": True}]])
+            for strategy in psa.strategies:
+                fig.add_trace(go.Scatter(x=psa.wtp, y=psa.ceac[strategy], name=strategy))
+            fig.add_trace(go.Scatter(x=psa.wtp, y=psa.evpi, name='EVPI', line_dash='dot'),
+                          secondary_y=True)
+            fig.update_layout(title="CEAC and EVPI per Person", xaxis_title="WTP (₹ per QALY)")
+            fig.update_yaxes(title_text="Probability cost-effective", range=[0, 1], secondary_y=False)
+            fig.update_yaxes(title_text="EVPI (₹)", secondary_y=True)
+            return fig
+
+        fig = plotly_figure('psa_ceac', (iterations, max_wtp), build_ceac)
+        st.plotly_chart(fig, use_container_width=True)
+
+def show_lecture_search():
+    st.subheader("🔎 Lecture Search")
+
+    index = load_lecture_index()
+    index.refresh()
+    st.caption(f"{len(index)} sections across {len(index.files)} lecture files")
+
+    query = st.text_input("Search the lectures:", placeholder="e.g. QALY discounting, ICER threshold")
+    if not query:
+        return
+    results = index.search(query, limit=10)
+    if results.empty:
+        st.info(f"No sections mention \"{query}\".")
+        return
+
+    for row in results.itertuples():
+        with st.expander(f"**{row.title}** — {row.file} (line {row.line})"):
+            st.caption(row.path)
+            st.markdown(row.text or row.snippet)
+
+def show_reports_downloads(df, metadata):
     st.subheader("📋 Reports & Downloads")
 
     st.markdown("### Available Reports")
@@ -522,18 +856,58 @@ def show_reports_downloads():
 
     # Certificate generation section
     st.markdown("### Certificate Generation")
+    st.markdown("Certificate type follows attendance on both days and the quiz score.")
+
+    eligibility = certificate_eligibility(df)
+    counts = eligibility.value_counts()
+    cols = st.columns(len(CERTIFICATE_TYPES) + 1)
+    for col, kind in zip(cols, CERTIFICATE_TYPES):
+        col.metric(kind, int(counts.get(kind, 0)))
+    cols[-1].metric("Not eligible", int(eligibility.isna().sum()))
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        cert_format = st.radio("Format:", ["pdf", "png"], horizontal=True)
+    with col2:
+        if st.button("🎓 Generate All Certificates", type="primary"):
+            records = certificate_records(df, metadata, eligibility)
+            buffer = io.BytesIO()
+            with st.spinner(f"Rendering {len(records)} certificates..."):
+                write_certificates(buffer, records, metadata, fmt=cert_format)
+            st.session_state['certificates_zip'] = buffer.getvalue()
+    if 'certificates_zip' in st.session_state:
+        st.download_button("⬇️ Download certificates (zip)", st.session_state['certificates_zip'],
+                           file_name="hta_certificates.zip", mime="application/zip")
 
     with st.form("certificate_form"):
         st.markdown("Individual Certificate Generation:")
         participant_id = st.text_input("Enter Participant ID (e.g., P001):")
-        certificate_type = st.selectbox("Certificate Type:", ["Completion", "Participation", "Excellence"])
+        certificate_type = st.selectbox("Certificate Type:", ["As eligible"] + CERTIFICATE_TYPES)
 
         submitted = st.form_submit_button("Generate Certificate")
         if submitted:
-            if participant_id:
-                st.success(f"Certificate for {participant_id} would be generated here")
-            else:
+            match = df.index[df['id'].astype(str) == participant_id.strip()]
+            if not participant_id:
                 st.error("Please enter a participant ID")
+            elif not len(match):
+                st.error(f"No participant with ID {participant_id}")
+            else:
+                types = eligibility.loc[match]
+                if certificate_type != "As eligible":
+                    types = pd.Series(certificate_type, index=match, dtype=object)
+                records = certificate_records(df.loc[match], metadata, types)
+                if not len(records):
+                    st.warning(f"{participant_id} did not attend and is not eligible for a certificate")
+                else:
+                    record = records.iloc[0].to_dict()
+                    template = CertificateTemplate(metadata)
+                    st.session_state['certificate_file'] = (
+                        f"{record['certificate_id']}.pdf",
+                        template.render(record, record['certificate_type'], 'pdf'))
+                    st.success(f"{record['certificate_type']} certificate ready for {record['name']}")
+    if 'certificate_file' in st.session_state:
+        file_name, data = st.session_state['certificate_file']
+        st.download_button(f"⬇️ Download {file_name}", data, file_name=file_name, mime="application/pdf")
 
 if __name__ == "__main__":
     main()
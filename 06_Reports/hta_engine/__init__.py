@@ -0,0 +1,70 @@
+"""
+HTA Workshop Economic Evaluation Engine
+Vectorized cost-effectiveness, uncertainty and burden calculations for workshop exercises
+"""
+
+from .burden import (
+    LifeTable,
+    burden,
+    discounted_years,
+    quality_adjusted_life_years,
+    summarise_burden,
+    years_lived_with_disability,
+    years_of_life_lost,
+)
+from .cea import (
+    efficiency_frontier,
+    net_health_benefit,
+    net_monetary_benefit,
+    optimal_strategies,
+)
+from .markov import (
+    MarkovModel,
+    cycle_weights,
+    discount_factors,
+    evaluate,
+    from_off_diagonal,
+    run_cohort,
+)
+from .psa import (
+    Beta,
+    Fixed,
+    Gamma,
+    LogNormal,
+    PSAResult,
+    read_draws,
+    run_psa,
+    sample_parameters,
+)
+from .voi import evpi, evppi, evppi_from_draws
+
+__all__ = [
+    'Beta',
+    'Fixed',
+    'Gamma',
+    'LifeTable',
+    'LogNormal',
+    'MarkovModel',
+    'PSAResult',
+    'burden',
+    'cycle_weights',
+    'discount_factors',
+    'discounted_years',
+    'efficiency_frontier',
+    'evaluate',
+    'evpi',
+    'evppi',
+    'evppi_from_draws',
+    'from_off_diagonal',
+    'net_health_benefit',
+    'net_monetary_benefit',
+    'optimal_strategies',
+    'quality_adjusted_life_years',
+    'read_draws',
+    'run_cohort',
+    'run_psa',
+    'sample_parameters',
+    'summarise_burden',
+    'years_lived_with_disability',
+    'years_of_life_lost',
+]
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+HTA Engine: Burden of Disease
+Vectorized YLL, YLD, DALY and QALY calculation over patient-level records
+"""
+
+import argparse
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .markov import discount_factors
+
+# Remaining life expectancy by age, GBD 2019 reference life table (abridged)
+STANDARD_LIFE_TABLE = pd.Series(
+    [88.87, 88.00, 84.03, 79.05, 74.07, 69.11, 64.15, 59.20, 54.25, 49.32, 44.43,
+     39.63, 34.91, 30.25, 25.68, 21.29, 17.10, 13.24, 9.99, 7.62, 5.92],
+    index=pd.Index([0, 1] + list(range(5, 100, 5)), name='age'), name='life_expectancy')
+# Longest span (years) covered by the cumulative discount tables
+MAX_YEARS = 150
+MEASURES = ['yll', 'yld', 'daly']
+
+
+class LifeTable:
+    """Remaining life expectancy at any age from an abridged table
+
+    The table is expanded once to single years (linear between the listed
+    ages, flat beyond the last one), so each lookup is an index plus one
+    interpolation step however many records are evaluated.
+    """
+
+    def __init__(self, expectancy=STANDARD_LIFE_TABLE):
+        expectancy = pd.Series(expectancy).sort_index()
+        ages = expectancy.index.to_numpy(dtype=float)
+        if len(ages) < 2 or ages[0] != 0 or (np.diff(ages) <= 0).any():
+            raise ValueError("Life table ages must start at 0 and increase")
+        self.max_age = int(np.ceil(ages[-1]))
+        self.yearly = np.interp(np.arange(self.max_age + 2), ages, expectancy.to_numpy(dtype=float))
+
+    def expectancy(self, age):
+        return _lookup(self.yearly, np.clip(np.asarray(age, dtype=float), 0, self.max_age + 1))
+
+
+def _lookup(table, x):
+    """table[x] with linear interpolation for fractional x (x >= 0)"""
+    whole = np.minimum(np.floor(x).astype(np.int64), len(table) - 2)
+    return table[whole] + (x - whole) * (table[whole + 1] - table[whole])
+
+
+@lru_cache(maxsize=32)
+def _cumulative_years(rate):
+    cumulative = np.concatenate(([0.0], np.cumsum(discount_factors(rate, MAX_YEARS - 1))))
+    cumulative.flags.writeable = False
+    return cumulative
+
+
+@lru_cache(maxsize=8)
+def _default_life_table():
+    return LifeTable()
+
+
+def discounted_years(start, duration, rate=0.0):
+    """Present value of one year per year lived from `start` for `duration`
+
+    Years are discounted annually at (1 + rate)^-t, as in the Markov
+    models, and accrue evenly within a year. The cumulative discount table
+    is built once per rate, so any start and duration is two lookups.
+    """
+    start = np.asarray(start, dtype=float)
+    end = start + np.asarray(duration, dtype=float)
+    if rate == 0:
+        return end - start
+    if (start < 0).any() or (end > MAX_YEARS).any():
+        raise ValueError(f"Discounted spans must lie within 0..{MAX_YEARS} years")
+    cumulative = _cumulative_years(float(rate))
+    return _lookup(cumulative, end) - _lookup(cumulative, start)
+
+
+def years_of_life_lost(age_at_death, rate=0.0, life_table=None):
+    """YLL: (discounted) standard life expectancy remaining at death; NaN ages give 0"""
+    life_table = _default_life_table() if life_table is None else life_table
+    age_at_death = np.asarray(age_at_death, dtype=float)
+    died = ~np.isnan(age_at_death)
+    remaining = life_table.expectancy(np.where(died, age_at_death, 0))
+    return np.where(died, discounted_years(0, remaining, rate), 0.0)
+
+
+def years_lived_with_disability(duration, disability_weight, rate=0.0, start=0.0):
+    """YLD: disability weight x (discounted) years lived with the condition"""
+    return np.asarray(disability_weight, dtype=float) * discounted_years(start, duration, rate)
+
+
+def quality_adjusted_life_years(utilities, durations, rate=0.0, start=0.0):
+    """QALYs of consecutive health-state periods along the last axis
+
+    utilities and durations are (..., periods); period k starts where
+    period k-1 ends. Returns the batch shape, e.g. one total per patient.
+    """
+    durations = np.asarray(durations, dtype=float)
+    ends = np.asarray(start, dtype=float)[..., None] + np.cumsum(durations, axis=-1)
+    years = discounted_years(ends - durations, durations, rate)
+    return (np.asarray(utilities, dtype=float) * years).sum(axis=-1)
+
+
+def burden(records, rate=0.0, life_table=None):
+    """YLL, YLD and DALY (and QALYs when a utility column is given) per record
+
+    records has age_at_death (empty for survivors), duration (years lived
+    with the condition) and disability_weight columns; an optional utility
+    column adds QALYs lived over the same duration. Everything runs as
+    whole-column array operations, so millions of records take seconds.
+    The GBD convention of no discounting is the default.
+    """
+    age_at_death = records['age_at_death'].to_numpy(dtype=float, na_value=np.nan)
+    duration = records['duration'].fillna(0).to_numpy(dtype=float)
+    weight = records['disability_weight'].fillna(0).to_numpy(dtype=float)
+
+    result = pd.DataFrame({
+        'yll': years_of_life_lost(age_at_death, rate, life_table),
+        'yld': years_lived_with_disability(duration, weight, rate),
+    }, index=records.index)
+    result['daly'] = result['yll'] + result['yld']
+    if 'utility' in records:
+        result['qaly'] = records['utility'].to_numpy(dtype=float) * discounted_years(0, duration, rate)
+    return result
+
+
+def summarise_burden(records, by, rate=0.0, life_table=None):
+    """Totals of burden() per group, e.g. by district and condition"""
+    result = burden(records, rate, life_table)
+    keys = [by] if isinstance(by, str) else list(by)
+    result[keys] = records[keys]
+    summary = result.groupby(keys, observed=True, sort=True).sum()
+    summary.insert(0, 'records', result.groupby(keys, observed=True, sort=True).size())
+    return summary
+
+
+# Malaria example from the Valuing Health Outcomes lecture: deaths (YLL)
+# and clinical episodes (YLD) spread over districts
+EXAMPLE_CONDITIONS = pd.DataFrame({
+    'condition': ['Malaria, uncomplicated', 'Malaria, severe', 'Malaria, severe anaemia'],
+    'share': [0.90, 0.08, 0.02],
+    'disability_weight': [0.051, 0.133, 0.149],
+    'mean_duration': [0.02, 0.04, 0.08],
+    'case_fatality': [0.0005, 0.05, 0.04],
+})
+
+
+def example_records(n=1_000_000, districts=50, seed=42):
+    """Synthetic patient-level malaria episodes for trying the calculator"""
+    rng = np.random.default_rng(seed)
+    condition = rng.choice(len(EXAMPLE_CONDITIONS), size=n, p=EXAMPLE_CONDITIONS['share'])
+    table = EXAMPLE_CONDITIONS.iloc[condition]
+    age = np.clip(rng.gamma(1.5, 12, size=n), 0, 99)
+    died = rng.random(n) < table['case_fatality'].to_numpy()
+    return pd.DataFrame({
+        'district': pd.Categorical.from_codes(rng.integers(0, districts, size=n),
+                                              [f'District {i:02d}' for i in range(1, districts + 1)]),
+        'condition': pd.Categorical.from_codes(condition, EXAMPLE_CONDITIONS['condition']),
+        'age': age.round(1),
+        'age_at_death': np.where(died, age.round(1), np.nan),
+        'duration': rng.exponential(table['mean_duration'].to_numpy()),
+        'disability_weight': table['disability_weight'].to_numpy(),
+    })
+
+
+def main():
+    """Command-line entry point for district burden totals"""
+    parser = argparse.ArgumentParser(description="YLL, YLD and DALYs from patient-level records")
+    parser.add_argument('records', nargs='?',
+                        help="CSV with age_at_death, duration, disability_weight (default: synthetic malaria)")
+    parser.add_argument('-n', '--sample', type=int, default=1_000_000,
+                        help="synthetic records when no CSV is given")
+    parser.add_argument('--by', nargs='+', default=['district'], help="grouping columns")
+    parser.add_argument('--rate', type=float, default=0.0, help="annual discount rate")
+    parser.add_argument('-o', '--output', help="write the grouped totals to this CSV")
+    args = parser.parse_args()
+
+    records = pd.read_csv(args.records) if args.records else example_records(args.sample)
+    start = time.perf_counter()
+    summary = summarise_burden(records, args.by, rate=args.rate)
+    elapsed = time.perf_counter() - start
+    print(f"⚖️  {len(records):,} records in {elapsed:.2f}s")
+    print(summary.sort_values('daly', ascending=False).head(10).round(1).to_string())
+    print(summary[MEASURES].sum().round(1).to_string())
+    if args.output:
+        summary.round(4).to_csv(args.output)
+        print(f"Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
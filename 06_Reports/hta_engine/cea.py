@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+HTA Engine: Cost-Effectiveness Analysis
+Efficiency frontier, dominance, ICERs and net benefit over willingness-to-pay grids
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+FRONTIER = 'frontier'
+DOMINATED = 'dominated'
+EXTENDED_DOMINATED = 'extendedly dominated'
+
+
+def _as_strategy_arrays(costs, effects):
+    costs = np.asarray(costs, dtype=float)
+    effects = np.asarray(effects, dtype=float)
+    if costs.shape != effects.shape:
+        raise ValueError(f"costs and effects must have the same shape, got {costs.shape} and {effects.shape}")
+    return costs, effects
+
+
+def net_monetary_benefit(costs, effects, wtp):
+    """NMB = effect x WTP - cost for every threshold and strategy
+
+    costs and effects are (..., strategies) arrays, e.g. one row per PSA
+    draw; wtp is a scalar or 1-D grid. The result has shape
+    (..., thresholds, strategies), or (..., strategies) for a scalar wtp.
+    """
+    costs, effects = _as_strategy_arrays(costs, effects)
+    wtp = np.asarray(wtp, dtype=float)
+    if wtp.ndim == 0:
+        return effects * wtp - costs
+    return effects[..., None, :] * wtp[:, None] - costs[..., None, :]
+
+
+def net_health_benefit(costs, effects, wtp):
+    """NHB = effect - cost / WTP, in effect units (e.g. QALYs)"""
+    costs, effects = _as_strategy_arrays(costs, effects)
+    wtp = np.asarray(wtp, dtype=float)
+    if wtp.ndim == 0:
+        return effects - costs / wtp
+    return effects[..., None, :] - costs[..., None, :] / wtp[:, None]
+
+
+def _frontier_indexes(costs, effects):
+    """Strategy positions on the efficiency frontier plus dominance status
+
+    Strategies are ordered by cost (then by effect, best first) so strict
+    dominance is a running-maximum test; extended dominance is removed with
+    a monotone stack that keeps ICERs increasing along the frontier.
+    """
+    order = np.lexsort((-effects, costs))
+    sorted_effects = effects[order]
+    best_before = np.maximum.accumulate(np.concatenate(([-np.inf], sorted_effects[:-1])))
+    status = np.full(len(costs), DOMINATED, dtype=object)
+    candidates = order[sorted_effects > best_before]
+
+    frontier = []
+    for i in candidates:
+        while frontier:
+            j = frontier[-1]
+            icer = (costs[i] - costs[j]) / (effects[i] - effects[j])
+            if len(frontier) > 1:
+                k = frontier[-2]
+                previous = (costs[j] - costs[k]) / (effects[j] - effects[k])
+                if icer < previous:
+                    status[frontier.pop()] = EXTENDED_DOMINATED
+                    continue
+            break
+        frontier.append(i)
+    frontier = np.array(frontier, dtype=int)
+    status[frontier] = FRONTIER
+    return frontier, status
+
+
+def efficiency_frontier(costs, effects, strategies=None):
+    """Dominance status, comparator and ICER of every strategy
+
+    Returns one row per strategy (in input order) with its status
+    ('frontier', 'dominated' or 'extendedly dominated'), and for frontier
+    strategies the next cheaper frontier strategy it is compared with, the
+    incremental cost and effect, and the ICER. The cheapest frontier
+    strategy is the reference and has no ICER.
+    """
+    costs, effects = _as_strategy_arrays(costs, effects)
+    if costs.ndim != 1 or not len(costs):
+        raise ValueError("efficiency_frontier expects 1-D arrays with at least one strategy")
+    strategies = pd.Index(range(len(costs)) if strategies is None else strategies, name='strategy')
+
+    frontier, status = _frontier_indexes(costs, effects)
+    comparator = np.full(len(costs), -1)
+    comparator[frontier[1:]] = frontier[:-1]
+    on_frontier = comparator >= 0
+    inc_cost = np.where(on_frontier, costs - costs[comparator], np.nan)
+    inc_effect = np.where(on_frontier, effects - effects[comparator], np.nan)
+
+    return pd.DataFrame({
+        'cost': costs,
+        'effect': effects,
+        'status': status,
+        'comparator': np.where(on_frontier, strategies.take(comparator).astype(object), None),
+        'incremental_cost': inc_cost,
+        'incremental_effect': inc_effect,
+        'icer': inc_cost / inc_effect,
+    }, index=strategies)
+
+
+def optimal_strategies(costs, effects, wtp):
+    """Position of the strategy with the highest NMB at each threshold
+
+    With 1-D costs and effects the frontier is built once and each
+    threshold is located among the frontier ICERs by binary search, so
+    thousands of thresholds cost O(thresholds x log strategies). Batched
+    (..., strategies) inputs fall back to an argmax over the NMB tensor.
+    """
+    costs, effects = _as_strategy_arrays(costs, effects)
+    wtp = np.asarray(wtp, dtype=float)
+    if costs.ndim > 1:
+        return net_monetary_benefit(costs, effects, wtp).argmax(axis=-1)
+    frontier, _ = _frontier_indexes(costs, effects)
+    icers = np.diff(costs[frontier]) / np.diff(effects[frontier])
+    # A strategy is preferred once WTP reaches its ICER (ties go to the more effective one)
+    return frontier[np.searchsorted(icers, wtp, side='right')]
+
+
+def main():
+    """Command-line entry point for a strategy table CSV (strategy, cost, effect)"""
+    parser = argparse.ArgumentParser(description="Efficiency frontier and ICERs for a set of strategies")
+    parser.add_argument('strategies', help="CSV with strategy, cost and effect columns")
+    parser.add_argument('--wtp', type=float, nargs='*', default=[],
+                        help="willingness-to-pay thresholds to report the optimal strategy for")
+    args = parser.parse_args()
+
+    table = pd.read_csv(args.strategies)
+    result = efficiency_frontier(table['cost'], table['effect'], table['strategy'])
+    print(result.round(2).to_string())
+    if args.wtp:
+        best = optimal_strategies(table['cost'], table['effect'], args.wtp)
+        for wtp, i in zip(args.wtp, best):
+            print(f"💹 WTP {wtp:,.0f}: {table['strategy'].iat[i]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+HTA Engine: Markov Cohort Models
+Batched cohort traces with cached matrix powers, discounting and half-cycle correction
+"""
+
+import argparse
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Upper bound on cells in the cached matrix powers P^1..P^cycles of one model
+MAX_POWER_CELLS = 4_000_000
+# Batches at least this large are stepped with the batch on the last axis
+BATCH_LAST_MIN = 1024
+# Row sums of a transition matrix may differ from 1 by this much
+ROW_SUM_TOLERANCE = 1e-9
+
+
+@lru_cache(maxsize=256)
+def _discount_factors(rate, cycles, cycle_length):
+    factors = (1 + rate) ** -(np.arange(cycles + 1) * cycle_length)
+    factors.flags.writeable = False
+    return factors
+
+
+def discount_factors(rate, cycles, cycle_length=1.0):
+    """(1 + rate)^-t at the start of every cycle 0..cycles, t in years
+
+    Vectors are computed once per (rate, cycles, cycle length) and shared
+    read-only, so batched evaluations never rebuild them.
+    """
+    return _discount_factors(float(rate), int(cycles), float(cycle_length))
+
+
+def cycle_weights(cycles, half_cycle=True):
+    """Weight of each trace row 0..cycles when summing rewards over cycles
+
+    With half-cycle correction rewards are the trapezoid between the start
+    and end of each cycle, i.e. the first and last rows count half;
+    without it every cycle is credited with its end-of-cycle membership.
+    """
+    weights = np.ones(cycles + 1)
+    if half_cycle:
+        weights[[0, -1]] = 0.5
+    else:
+        weights[0] = 0
+    return weights
+
+
+def from_off_diagonal(probabilities):
+    """Transition matrices from their off-diagonal probabilities
+
+    The diagonal of the (..., states, states) input is ignored and replaced
+    by one minus the rest of the row, which is how models are usually
+    specified and keeps batched PSA draws valid row by row.
+    """
+    matrices = np.array(probabilities, dtype=float)
+    diagonal = np.arange(matrices.shape[-1])
+    matrices[..., diagonal, diagonal] = 0
+    matrices[..., diagonal, diagonal] = 1 - matrices.sum(axis=-1)
+    return matrices
+
+
+class MarkovModel:
+    """Cohort model over a (batch of) transition matrices
+
+    transitions has shape (..., states, states) with rows summing to one;
+    leading axes are batch axes, e.g. (PSA draws, strategies), and every
+    trace or outcome keeps them. With time_dependent=True the axis before
+    the states is the cycle, (..., cycles, states, states), and the last
+    matrix is reused once the cycles run out.
+    """
+
+    def __init__(self, transitions, states=None, time_dependent=False):
+        transitions = np.asarray(transitions, dtype=float)
+        if transitions.ndim < 2 + time_dependent or transitions.shape[-1] != transitions.shape[-2]:
+            raise ValueError(f"Transition matrices must be (..., states, states), got {transitions.shape}")
+        if (transitions < 0).any() or (transitions > 1).any():
+            raise ValueError("Transition probabilities must lie between 0 and 1")
+        row_sums = transitions.sum(axis=-1)
+        if not np.allclose(row_sums, 1, rtol=0, atol=ROW_SUM_TOLERANCE):
+            worst = np.abs(row_sums - 1).max()
+            raise ValueError(f"Transition matrix rows must sum to 1 (off by up to {worst:.3g})")
+
+        self.transitions = transitions
+        self.time_dependent = time_dependent
+        self.n_states = transitions.shape[-1]
+        self.batch_shape = transitions.shape[:-3 if time_dependent else -2]
+        self.states = pd.Index(range(self.n_states) if states is None else states, name='state')
+        if len(self.states) != self.n_states:
+            raise ValueError(f"{len(self.states)} state names for {self.n_states} states")
+        self.batch_size = int(np.prod(self.batch_shape, dtype=np.int64))
+        self._squares = [transitions] if not time_dependent else []
+        self._powers = {}
+        self._block = None
+        self._batch_last = None
+
+    def power(self, n):
+        """P^n for a time-homogeneous model, from cached repeated squares
+
+        P, P^2, P^4, ... are kept once computed, so any power costs at most
+        log2(n) products and repeated requests are free.
+        """
+        if self.time_dependent:
+            raise ValueError("Matrix powers need a time-homogeneous model")
+        if n not in self._powers:
+            identity = np.broadcast_to(np.eye(self.n_states), self.transitions.shape)
+            result, bit, remaining = None, 0, n
+            while remaining:
+                if bit == len(self._squares):
+                    self._squares.append(self._squares[-1] @ self._squares[-1])
+                if remaining & 1:
+                    result = self._squares[bit] if result is None else result @ self._squares[bit]
+                remaining >>= 1
+                bit += 1
+            self._powers[n] = identity.copy() if result is None else result
+        return self._powers[n]
+
+    def _power_block(self, cycles):
+        """P^1..P^cycles side by side, shape (..., states, cycles x states)
+
+        The block is cached and only extended when a longer trace is asked
+        for, so later traces (other starting cohorts, subgroups, the
+        dashboard re-running) are a single product with it.
+        """
+        have = 0 if self._block is None else self._block.shape[-1] // self.n_states
+        if cycles > have:
+            if self._block is None:
+                last, parts = np.broadcast_to(np.eye(self.n_states), self.transitions.shape), []
+            else:
+                last, parts = self._block[..., -self.n_states:], [self._block]
+            for _ in range(cycles - have):
+                last = last @ self.transitions
+                parts.append(last)
+            self._block = np.concatenate(parts, axis=-1)
+        return self._block[..., :cycles * self.n_states]
+
+    def state_at(self, initial, cycle):
+        """Cohort distribution after `cycle` cycles without the full trace"""
+        initial = np.asarray(initial, dtype=float)
+        return (initial[..., None, :] @ self.power(cycle))[..., 0, :]
+
+    def trace(self, initial, cycles):
+        """Share of the cohort in each state at the start of every cycle
+
+        Returns (..., cycles + 1, states), row 0 being the initial
+        distribution; initial broadcasts against the batch axes. Small
+        time-homogeneous models multiply the initial distribution once by
+        the cached powers P^1..P^cycles. Large batches are stepped cycle by
+        cycle with the batch on the last axis, so each step is a few
+        contiguous multiply-adds over all parameter sets at once.
+        """
+        initial = np.asarray(initial, dtype=float)
+        shape = np.broadcast_shapes(initial.shape[:-1], self.batch_shape)
+        if (not self.time_dependent and cycles
+                and self.batch_size * self.n_states ** 2 * cycles <= MAX_POWER_CELLS):
+            advanced = initial[..., None, :] @ self._power_block(cycles)
+            trace = np.empty(shape + (cycles + 1, self.n_states))
+            trace[..., 0, :] = initial
+            trace[..., 1:, :] = advanced.reshape(shape + (cycles, self.n_states))
+            return trace
+        if self.batch_size >= BATCH_LAST_MIN and shape == self.batch_shape:
+            return self._trace_batch_last(initial, cycles)
+
+        trace = np.empty(shape + (cycles + 1, self.n_states))
+        trace[..., 0, :] = initial
+        for t in range(cycles):
+            trace[..., t + 1, :] = (trace[..., t, None, :] @ self._step(t))[..., 0, :]
+        return trace
+
+    def _step(self, t):
+        if not self.time_dependent:
+            return self.transitions
+        return self.transitions[..., min(t, self.transitions.shape[-3] - 1), :, :]
+
+    def _trace_batch_last(self, initial, cycles):
+        if self._batch_last is None:
+            # (cycles, from, to, batch) so each row of every matrix is contiguous over the batch
+            matrices = self.transitions if self.time_dependent else self.transitions[..., None, :, :]
+            flat = matrices.reshape((self.batch_size,) + matrices.shape[-3:])
+            self._batch_last = np.ascontiguousarray(np.moveaxis(flat, 0, -1))
+        columns = self._batch_last
+        state = np.broadcast_to(initial, self.batch_shape + (self.n_states,))
+        trace = np.empty((cycles + 1, self.n_states, self.batch_size))
+        trace[0] = state.reshape(self.batch_size, self.n_states).T
+        for t in range(cycles):
+            step = columns[min(t, len(columns) - 1)]
+            following = trace[t + 1]
+            np.multiply(trace[t, 0], step[0], out=following)
+            for k in range(1, self.n_states):
+                following += trace[t, k] * step[k]
+        return np.moveaxis(trace, -1, 0).reshape(self.batch_shape + (cycles + 1, self.n_states))
+
+
+def evaluate(trace, values, discount_rate=0.035, cycle_length=1.0, half_cycle=True):
+    """Discounted total of per-cycle state values over a cohort trace
+
+    trace is (..., cycles + 1, states) from MarkovModel.trace and values is
+    (..., states), broadcasting over the batch axes (e.g. one row of state
+    costs per strategy). For QALYs pass utility x cycle length. Returns the
+    batch shape.
+    """
+    trace = np.asarray(trace, dtype=float)
+    values = np.asarray(values, dtype=float)
+    cycles = trace.shape[-2] - 1
+    weights = cycle_weights(cycles, half_cycle) * discount_factors(discount_rate, cycles, cycle_length)
+    per_cycle = (trace @ values[..., :, None])[..., 0]
+    return per_cycle @ weights
+
+
+def run_cohort(model, initial, cycles, costs, utilities, discount_costs=0.035,
+               discount_effects=0.035, cycle_length=1.0, half_cycle=True):
+    """Discounted costs and QALYs of a cohort, each with the model's batch shape
+
+    costs are per state and cycle; utilities are annual weights per state.
+    """
+    trace = model.trace(initial, cycles)
+    total_costs = evaluate(trace, costs, discount_costs, cycle_length, half_cycle)
+    qalys = evaluate(trace, np.asarray(utilities, dtype=float) * cycle_length,
+                     discount_effects, cycle_length, half_cycle)
+    return total_costs, qalys
+
+
+# Breast cancer exercise from the Valuing Health Outcomes lecture: a one-year
+# treatment tunnel state, then disease-free survival, over a 10-year horizon
+BREAST_CANCER_STATES = ['Treatment', 'Disease-free', 'Dead']
+BREAST_CANCER_STRATEGIES = ['Mastectomy + chemotherapy', 'Breast-conserving surgery']
+BREAST_CANCER_FIVE_YEAR_SURVIVAL = np.array([0.85, 0.82])
+BREAST_CANCER_UTILITIES = np.array([[0.6, 0.8, 0.0], [0.7, 0.9, 0.0]])
+
+
+def breast_cancer_transitions(five_year_survival):
+    """(..., strategies, 3, 3) matrices from five-year survival per strategy"""
+    survival = np.asarray(five_year_survival, dtype=float)
+    p_death = 1 - survival ** (1 / 5)
+    probabilities = np.zeros(survival.shape + (3, 3))
+    probabilities[..., 0, 1] = 1 - p_death
+    probabilities[..., 0, 2] = p_death
+    probabilities[..., 1, 2] = p_death
+    return from_off_diagonal(probabilities)
+
+
+def main():
+    """Command-line entry point running the lecture's breast cancer model"""
+    parser = argparse.ArgumentParser(description="Markov cohort model of the breast cancer exercise")
+    parser.add_argument('-n', '--draws', type=int, default=10_000,
+                        help="PSA parameter sets run as one batch (0 for the base case only)")
+    parser.add_argument('--cycles', type=int, default=10, help="yearly cycles (time horizon)")
+    parser.add_argument('--discount', type=float, default=0.035, help="annual discount rate")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    args = parser.parse_args()
+
+    model = MarkovModel(breast_cancer_transitions(BREAST_CANCER_FIVE_YEAR_SURVIVAL), BREAST_CANCER_STATES)
+    trace = model.trace([1, 0, 0], args.cycles)
+    qalys = evaluate(trace, BREAST_CANCER_UTILITIES, args.discount)
+    print(f"🩺 Base case over {args.cycles} years at {args.discount:.1%} discounting")
+    print(pd.Series(qalys, index=BREAST_CANCER_STRATEGIES, name='QALYs').round(3).to_string())
+
+    if args.draws:
+        rng = np.random.default_rng(args.seed)
+        # Five-year survival from 200-patient cohorts per arm
+        survival = rng.beta(BREAST_CANCER_FIVE_YEAR_SURVIVAL * 200,
+                            (1 - BREAST_CANCER_FIVE_YEAR_SURVIVAL) * 200, size=(args.draws, 2))
+        start = time.perf_counter()
+        batch = MarkovModel(breast_cancer_transitions(survival), BREAST_CANCER_STATES)
+        qalys = evaluate(batch.trace([1, 0, 0], args.cycles), BREAST_CANCER_UTILITIES, args.discount)
+        elapsed = time.perf_counter() - start
+        summary = pd.DataFrame({'mean': qalys.mean(axis=0), 'p2.5': np.percentile(qalys, 2.5, axis=0),
+                                'p97.5': np.percentile(qalys, 97.5, axis=0)}, index=BREAST_CANCER_STRATEGIES)
+        print(f"🎲 {args.draws:,} parameter sets in {elapsed:.2f}s")
+        print(summary.round(3).to_string())
+        better = (qalys[:, 1] > qalys[:, 0]).mean()
+        print(f"P({BREAST_CANCER_STRATEGIES[1]} has more QALYs) = {better:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+HTA Engine: Probabilistic Sensitivity Analysis
+Chunked, multi-process Monte Carlo with CE planes, CEACs and EVPI
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Draws evaluated per worker task; each chunk has its own random stream
+DEFAULT_CHUNK_SIZE = 100_000
+# Upper bound on draws x thresholds held at once while summarising
+MAX_NMB_CELLS = 8_000_000
+# Draws kept in memory for plotting the cost-effectiveness plane
+PLANE_SAMPLE_SIZE = 5_000
+
+
+class Beta:
+    """Beta(alpha, beta) for probabilities and utilities"""
+
+    def __init__(self, alpha, beta):
+        if alpha <= 0 or beta <= 0:
+            raise ValueError(f"Beta parameters must be positive, got {alpha}, {beta}")
+        self.alpha, self.beta = alpha, beta
+
+    @classmethod
+    def from_mean_sd(cls, mean, sd):
+        if not 0 < mean < 1 or sd <= 0 or sd ** 2 >= mean * (1 - mean):
+            raise ValueError(f"No beta distribution has mean {mean} and sd {sd}")
+        common = mean * (1 - mean) / sd ** 2 - 1
+        return cls(mean * common, (1 - mean) * common)
+
+    def sample(self, rng, size):
+        return rng.beta(self.alpha, self.beta, size)
+
+    def __repr__(self):
+        return f"Beta({self.alpha:g}, {self.beta:g})"
+
+
+class Gamma:
+    """Gamma(shape, scale) for costs and other positive, skewed quantities"""
+
+    def __init__(self, shape, scale):
+        if shape <= 0 or scale <= 0:
+            raise ValueError(f"Gamma parameters must be positive, got {shape}, {scale}")
+        self.shape, self.scale = shape, scale
+
+    @classmethod
+    def from_mean_sd(cls, mean, sd):
+        if mean <= 0 or sd <= 0:
+            raise ValueError(f"Gamma mean and sd must be positive, got {mean}, {sd}")
+        return cls((mean / sd) ** 2, sd ** 2 / mean)
+
+    def sample(self, rng, size):
+        return rng.gamma(self.shape, self.scale, size)
+
+    def __repr__(self):
+        return f"Gamma({self.shape:g}, {self.scale:g})"
+
+
+class LogNormal:
+    """LogNormal(mu, sigma) on the log scale, e.g. relative risks and hazard ratios"""
+
+    def __init__(self, mu, sigma):
+        if sigma <= 0:
+            raise ValueError(f"LogNormal sigma must be positive, got {sigma}")
+        self.mu, self.sigma = mu, sigma
+
+    @classmethod
+    def from_mean_sd(cls, mean, sd):
+        if mean <= 0 or sd <= 0:
+            raise ValueError(f"LogNormal mean and sd must be positive, got {mean}, {sd}")
+        sigma2 = np.log1p((sd / mean) ** 2)
+        return cls(np.log(mean) - sigma2 / 2, np.sqrt(sigma2))
+
+    @classmethod
+    def from_ci(cls, estimate, lower, upper, level=0.95):
+        """From a point estimate and confidence interval, as reported for ratios"""
+        from statistics import NormalDist
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        return cls(np.log(estimate), (np.log(upper) - np.log(lower)) / (2 * z))
+
+    def sample(self, rng, size):
+        return rng.lognormal(self.mu, self.sigma, size)
+
+    def __repr__(self):
+        return f"LogNormal({self.mu:g}, {self.sigma:g})"
+
+
+class Fixed:
+    """A parameter held at one value in every draw"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def sample(self, rng, size):
+        return np.full(size, self.value, dtype=float)
+
+    def __repr__(self):
+        return f"Fixed({self.value:g})"
+
+
+def sample_parameters(parameters, rng, size):
+    """Draw `size` values of every parameter, in the order they are listed"""
+    return {name: dist.sample(rng, size) for name, dist in parameters.items()}
+
+
+def _summarise(costs, effects, wtp):
+    """Per-threshold sums of NMB, optimal counts and max NMB for one chunk
+
+    Strategies are visited one at a time with a running maximum over a
+    (thresholds x draws) block, which keeps every pass contiguous.
+    """
+    n, n_strategies = costs.shape
+    nmb_sum = np.empty((len(wtp), n_strategies))
+    optimal = np.empty((len(wtp), n_strategies), dtype=np.int64)
+    max_sum = np.empty(len(wtp))
+    block = max(1, MAX_NMB_CELLS // max(1, n))
+    for start in range(0, len(wtp), block):
+        w = wtp[start:start + block, None]
+        best = np.empty((len(w), n))
+        best_strategy = np.zeros((len(w), n), dtype=np.int32)
+        for j in range(n_strategies):
+            nmb = w * effects[:, j] - costs[:, j]
+            nmb_sum[start:start + block, j] = nmb.sum(axis=1)
+            if j == 0:
+                best[:] = nmb
+                continue
+            better = nmb > best
+            best_strategy[better] = j
+            np.maximum(best, nmb, out=best)
+        for j in range(n_strategies):
+            optimal[start:start + block, j] = np.count_nonzero(best_strategy == j, axis=1)
+        max_sum[start:start + block] = best.sum(axis=1)
+    return nmb_sum, optimal, max_sum
+
+
+def _run_chunk(model, parameters, strategies, wtp, seed_sequence, index, first, size, output_dir,
+               plane_size):
+    """Sample, evaluate and summarise one chunk; optionally write its draws"""
+    rng = np.random.default_rng(seed_sequence)
+    params = sample_parameters(parameters, rng, size)
+    costs, effects = (np.asarray(a, dtype=float) for a in model(params))
+    if costs.shape != (size, len(strategies)) or effects.shape != costs.shape:
+        raise ValueError(f"Model must return (draws, strategies) costs and effects of shape "
+                         f"{(size, len(strategies))}, got {costs.shape} and {effects.shape}")
+
+    path = None
+    if output_dir:
+        draws = pd.DataFrame(params)
+        draws.insert(0, 'iteration', np.arange(first, first + size))
+        for j, name in enumerate(strategies):
+            draws[f'cost_{name}'] = costs[:, j]
+            draws[f'effect_{name}'] = effects[:, j]
+        path = os.path.join(output_dir, f'psa-{index + 1:05d}.parquet')
+        draws.to_parquet(path, index=False)
+
+    nmb_sum, optimal, max_sum = _summarise(costs, effects, wtp)
+    return {
+        'n': size,
+        'cost_sum': costs.sum(axis=0), 'effect_sum': effects.sum(axis=0),
+        'nmb_sum': nmb_sum, 'optimal': optimal, 'max_sum': max_sum,
+        'plane': (costs[:plane_size], effects[:plane_size]),
+        'path': path,
+    }
+
+
+class PSAResult:
+    """Summaries of a PSA run over a willingness-to-pay grid"""
+
+    def __init__(self, strategies, wtp, chunks, elapsed):
+        self.strategies = pd.Index(strategies, name='strategy')
+        self.wtp = pd.Index(wtp, name='wtp')
+        self.iterations = sum(c['n'] for c in chunks)
+        self.elapsed_seconds = elapsed
+        self.files = [c['path'] for c in chunks if c['path']]
+
+        n = self.iterations
+        self.mean_cost = pd.Series(sum(c['cost_sum'] for c in chunks) / n, index=self.strategies)
+        self.mean_effect = pd.Series(sum(c['effect_sum'] for c in chunks) / n, index=self.strategies)
+        expected = sum(c['nmb_sum'] for c in chunks) / n
+        self.expected_nmb = pd.DataFrame(expected, index=self.wtp, columns=self.strategies)
+        self.ceac = pd.DataFrame(sum(c['optimal'] for c in chunks) / n,
+                                 index=self.wtp, columns=self.strategies)
+        # EVPI = E[max NMB] - max E[NMB]
+        self.evpi = pd.Series(sum(c['max_sum'] for c in chunks) / n - expected.max(axis=1),
+                              index=self.wtp, name='evpi')
+
+        costs = np.concatenate([c['plane'][0] for c in chunks])
+        effects = np.concatenate([c['plane'][1] for c in chunks])
+        self.plane = pd.DataFrame({
+            'strategy': np.tile(np.asarray(self.strategies, dtype=object), len(costs)),
+            'cost': costs.ravel(), 'effect': effects.ravel(),
+        })
+
+    def optimal_strategy(self):
+        """Strategy with the highest expected NMB at each threshold (the CEAF)"""
+        return self.expected_nmb.idxmax(axis=1).rename('optimal')
+
+    def incremental_plane(self, comparator):
+        """CE plane sample as incremental cost and effect versus one strategy"""
+        plane = self.plane
+        base = plane[plane['strategy'] == comparator][['cost', 'effect']].to_numpy()
+        others = plane[plane['strategy'] != comparator]
+        reps = len(self.strategies) - 1
+        return others.assign(incremental_cost=others['cost'].to_numpy() - np.repeat(base[:, 0], reps),
+                             incremental_effect=others['effect'].to_numpy() - np.repeat(base[:, 1], reps))
+
+
+def run_psa(model, parameters, strategies, iterations, wtp, seed=42, chunk_size=DEFAULT_CHUNK_SIZE,
+            workers=None, output_dir=None):
+    """Run a probabilistic sensitivity analysis in independent chunks
+
+    `model(params)` receives a dict of parameter arrays and returns
+    (costs, effects), each of shape (draws, strategies); it must be a
+    module-level function so worker processes can import it. Chunks run on
+    a process pool (inline with workers=1), each on its own SeedSequence
+    child, so results depend only on the seed and chunk size. When
+    output_dir is given every chunk writes its draws to a Parquet file
+    there instead of returning them, so memory stays bounded by one chunk
+    per worker.
+    """
+    if iterations < 1:
+        raise ValueError(f"PSA needs at least one iteration, got {iterations}")
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be positive, got {chunk_size}")
+    wtp = np.atleast_1d(np.asarray(wtp, dtype=float))
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    sizes = [min(chunk_size, iterations - start) for start in range(0, iterations, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    plane_size = max(1, -(-PLANE_SAMPLE_SIZE // max(1, len(sizes))))
+    tasks = [(model, parameters, list(strategies), wtp, seeds[i], i, i * chunk_size, size,
+              output_dir, plane_size) for i, size in enumerate(sizes)]
+
+    start = time.perf_counter()
+    if workers == 1 or len(tasks) == 1:
+        chunks = [_run_chunk(*task) for task in tasks]
+    else:
+        workers = workers or min(len(tasks), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_run_chunk, *zip(*tasks)))
+    return PSAResult(strategies, wtp, chunks, time.perf_counter() - start)
+
+
+def read_draws(output_dir, columns=None):
+    """Load the per-chunk draw files written by run_psa as one frame"""
+    files = sorted(f for f in os.listdir(output_dir) if f.startswith('psa-') and f.endswith('.parquet'))
+    return pd.concat([pd.read_parquet(os.path.join(output_dir, f), columns=columns) for f in files],
+                     ignore_index=True)
+
+
+# Hypertension exercise from the Economic Evaluation Frameworks lecture as a
+# decision model over a 10-year QALY horizon with a single event risk: the new
+# drug lowers the risk of a cardiovascular event
+HYPERTENSION_STRATEGIES = ['Standard care', 'New drug']
+HYPERTENSION_PARAMETERS = {
+    'p_event': Beta.from_mean_sd(0.10, 0.02),
+    'rr_new_drug': LogNormal.from_ci(0.70, 0.55, 0.89),
+    'cost_standard': Gamma.from_mean_sd(10000, 1500),
+    'cost_new_drug': Gamma.from_mean_sd(15000, 1500),
+    'cost_event': Gamma.from_mean_sd(60000, 15000),
+    'qalys_no_event': Beta.from_mean_sd(0.85, 0.05),
+    'qaly_loss_event': Gamma.from_mean_sd(2.0, 0.5),
+}
+
+
+def hypertension_model(params):
+    """Costs and QALYs of standard care and the new drug for every draw"""
+    p_standard = params['p_event']
+    p_new = np.clip(p_standard * params['rr_new_drug'], 0, 1)
+    horizon_qalys = 10 * params['qalys_no_event']
+    costs = np.column_stack([
+        params['cost_standard'] + p_standard * params['cost_event'],
+        params['cost_new_drug'] + p_new * params['cost_event'],
+    ])
+    effects = np.column_stack([
+        horizon_qalys - p_standard * params['qaly_loss_event'],
+        horizon_qalys - p_new * params['qaly_loss_event'],
+    ])
+    return costs, effects
+
+
+def main():
+    """Command-line entry point running the lecture's hypertension PSA"""
+    parser = argparse.ArgumentParser(description="Probabilistic sensitivity analysis of the hypertension example")
+    parser.add_argument('-n', '--iterations', type=int, default=100_000, help="Monte Carlo draws")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    parser.add_argument('--workers', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="draws per task")
+    parser.add_argument('--max-wtp', type=float, default=100000, help="largest WTP per QALY")
+    parser.add_argument('-o', '--output-dir', help="write draws, CEAC and EVPI here")
+    args = parser.parse_args()
+
+    wtp = np.linspace(0, args.max_wtp, 101)
+    result = run_psa(hypertension_model, HYPERTENSION_PARAMETERS, HYPERTENSION_STRATEGIES,
+                     args.iterations, wtp, seed=args.seed, chunk_size=args.chunk_size,
+                     workers=args.workers, output_dir=args.output_dir)
+    print(f"🎲 {result.iterations:,} draws in {result.elapsed_seconds:.2f}s")
+    print(pd.DataFrame({'mean cost': result.mean_cost, 'mean QALYs': result.mean_effect}).round(3))
+    summary = result.ceac.iloc[::10].assign(evpi=result.evpi.iloc[::10])
+    print(summary.round(3).to_string())
+    if args.output_dir:
+        summary = result.ceac.add_prefix('p_optimal_').assign(evpi=result.evpi)
+        summary.to_csv(os.path.join(args.output_dir, 'ceac_evpi.csv'))
+        print(f"Written {len(result.files)} draw files and ceac_evpi.csv to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
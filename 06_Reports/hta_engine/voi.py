@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+HTA Engine: Value of Information
+Regression-based EVPPI over PSA samples, in parallel across parameter groups
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .psa import HYPERTENSION_PARAMETERS, HYPERTENSION_STRATEGIES, hypertension_model, read_draws, run_psa
+
+# Knots of the natural cubic spline fitted for every parameter
+DEFAULT_KNOTS = 6
+# Groups up to this size get a full tensor-product basis, larger ones an additive one
+MAX_TENSOR_GROUP = 2
+METHODS = ('spline', 'knn')
+
+# Incremental PSA outputs shared by every group a worker process evaluates
+_incremental = None
+
+
+def natural_spline_basis(x, knots=DEFAULT_KNOTS):
+    """Natural cubic spline columns for x (without the intercept)
+
+    Knots sit at quantiles of x, which is rescaled to [0, 1] first to keep
+    the cubic terms well conditioned. Constant x gives no columns, and
+    too few distinct values fall back to a linear term.
+    """
+    x = np.asarray(x, dtype=float)
+    low, high = x.min(), x.max()
+    if high == low:
+        return np.empty((len(x), 0))
+    x = (x - low) / (high - low)
+    xi = np.unique(np.quantile(x, np.linspace(0, 1, knots)))
+    if len(xi) < 3:
+        return x[:, None]
+
+    def d(k):
+        return (np.clip(x - xi[k], 0, None) ** 3 - np.clip(x - xi[-1], 0, None) ** 3) / (xi[-1] - xi[k])
+
+    last = d(len(xi) - 2)
+    return np.column_stack([x] + [d(k) - last for k in range(len(xi) - 2)])
+
+
+def _design(columns, knots):
+    """Regression basis of one parameter group"""
+    bases = [natural_spline_basis(c, knots) for c in columns]
+    bases = [b for b in bases if b.shape[1]]
+    n = len(columns[0])
+    if not bases:
+        return np.ones((n, 1))
+    if len(bases) <= MAX_TENSOR_GROUP:
+        # Tensor product of [1, basis] per parameter, i.e. all interactions
+        design = np.ones((n, 1))
+        for basis in bases:
+            full = np.column_stack([np.ones(n), basis])
+            design = (design[:, :, None] * full[:, None, :]).reshape(n, -1)
+        return design
+    linear = np.column_stack([b[:, 0] for b in bases])
+    pairs = [linear[:, i] * linear[:, j] for i in range(len(bases)) for j in range(i + 1, len(bases))]
+    return np.column_stack([np.ones(n)] + bases + pairs)
+
+
+def _smooth_spline(columns, targets, knots):
+    design = _design(columns, knots)
+    coefficients, *_ = np.linalg.lstsq(design, targets, rcond=None)
+    return design @ coefficients
+
+
+def _smooth_knn(columns, targets, neighbours):
+    """Running mean of the targets over the nearest draws in parameter order"""
+    if len(columns) != 1:
+        raise ValueError("Nearest-neighbour smoothing needs single-parameter groups")
+    n = len(targets)
+    k = min(n, neighbours or max(10, int(np.sqrt(n))))
+    order = np.argsort(columns[0], kind='stable')
+    cumulative = np.concatenate([np.zeros((1, targets.shape[1])), np.cumsum(targets[order], axis=0)])
+    first = np.clip(np.arange(n) - k // 2, 0, n - k)
+    fitted = np.empty_like(targets)
+    fitted[order] = (cumulative[first + k] - cumulative[first]) / k
+    return fitted
+
+
+def _share_incremental(incremental):
+    global _incremental
+    _incremental = incremental
+
+
+def _group_evppi(columns, wtp, method, knots, neighbours):
+    """EVPPI of one group at every threshold from fitted incremental costs and effects
+
+    The shared incremental array holds costs then effects of each strategy
+    versus the first, (draws, 2 x (strategies - 1)). NMB is linear in WTP,
+    so one fit serves the whole threshold grid.
+    """
+    incremental = _incremental
+    if method == 'knn':
+        fitted = _smooth_knn(columns, incremental, neighbours)
+    else:
+        fitted = _smooth_spline(columns, incremental, knots)
+    costs, effects = np.split(fitted, 2, axis=1)
+    result = np.empty(len(wtp))
+    for i, w in enumerate(wtp):
+        nmb = effects * w - costs
+        result[i] = np.maximum(nmb.max(axis=1), 0).mean() - max(nmb.mean(axis=0).max(), 0)
+    return np.clip(result, 0, None)
+
+
+def evpi(costs, effects, wtp):
+    """Per-person EVPI at every threshold from (draws, strategies) samples"""
+    costs, effects = np.asarray(costs, dtype=float), np.asarray(effects, dtype=float)
+    result = np.empty(len(wtp))
+    for i, w in enumerate(wtp):
+        nmb = effects * w - costs
+        result[i] = nmb.max(axis=1).mean() - nmb.mean(axis=0).max()
+    return result
+
+
+def evppi(parameters, costs, effects, wtp, groups=None, method='spline', knots=DEFAULT_KNOTS,
+          neighbours=None, workers=None):
+    """Per-person EVPPI of parameter groups by nonparametric regression
+
+    parameters is a (draws x parameters) frame of PSA inputs and costs and
+    effects the matching (draws, strategies) outputs. Each group's expected
+    incremental costs and effects are estimated by regressing the PSA
+    outputs on its parameters ('spline': natural cubic splines, tensor
+    products for pairs; 'knn': running means over the nearest draws), which
+    replaces the inner loop of nested Monte Carlo. groups maps a name to a
+    list of columns (default: every parameter alone). Groups run on a
+    process pool (inline with workers=1). Returns thresholds x groups with
+    the overall EVPI as the last column.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown EVPPI method {method!r}; expected one of {METHODS}")
+    costs, effects = np.asarray(costs, dtype=float), np.asarray(effects, dtype=float)
+    if costs.ndim != 2 or costs.shape != effects.shape or len(costs) != len(parameters):
+        raise ValueError("costs and effects must be (draws, strategies) arrays matching the parameters")
+    wtp = np.atleast_1d(np.asarray(wtp, dtype=float))
+    if groups is None:
+        groups = {name: [name] for name in parameters.columns}
+    elif not isinstance(groups, dict):
+        groups = {name if isinstance(name, str) else ' + '.join(name): [name] if isinstance(name, str)
+                  else list(name) for name in groups}
+    missing = sorted({c for columns in groups.values() for c in columns} - set(parameters.columns))
+    if missing:
+        raise ValueError(f"Unknown parameters in groups: {missing}")
+
+    incremental = np.hstack([costs[:, 1:] - costs[:, :1], effects[:, 1:] - effects[:, :1]])
+    tasks = [([parameters[c].to_numpy(dtype=float) for c in columns], wtp, method, knots, neighbours)
+             for columns in groups.values()]
+    if workers == 1 or len(tasks) <= 1:
+        _share_incremental(incremental)
+        try:
+            values = [_group_evppi(*task) for task in tasks]
+        finally:
+            _share_incremental(None)
+    else:
+        workers = workers or min(len(tasks), os.cpu_count() or 1)
+        # Outputs are sent once per worker; each task only carries its group's columns
+        with ProcessPoolExecutor(max_workers=workers, initializer=_share_incremental,
+                                 initargs=(incremental,)) as pool:
+            values = list(pool.map(_group_evppi, *zip(*tasks)))
+
+    result = pd.DataFrame(np.column_stack(values) if values else np.empty((len(wtp), 0)),
+                          index=pd.Index(wtp, name='wtp'), columns=list(groups))
+    result['EVPI'] = evpi(costs, effects, wtp)
+    return result
+
+
+def evppi_from_draws(draws, wtp, groups=None, strategies=None, **kwargs):
+    """EVPPI from the draw files of run_psa (see psa.read_draws)
+
+    Strategies default to every name with both a cost_ and an effect_
+    column; all other columns except the iteration are parameters.
+    """
+    if strategies is None:
+        strategies = [c[len('cost_'):] for c in draws.columns
+                      if c.startswith('cost_') and f"effect_{c[len('cost_'):]}" in draws]
+    outputs = [f'cost_{s}' for s in strategies] + [f'effect_{s}' for s in strategies]
+    parameters = draws.drop(columns=['iteration'] + outputs, errors='ignore')
+    costs = draws[[f'cost_{s}' for s in strategies]].to_numpy()
+    effects = draws[[f'effect_{s}' for s in strategies]].to_numpy()
+    return evppi(parameters, costs, effects, wtp, groups=groups, **kwargs)
+
+
+def main():
+    """Command-line entry point for EVPPI of a PSA run"""
+    parser = argparse.ArgumentParser(description="EVPPI per parameter from PSA draws")
+    parser.add_argument('draws_dir', nargs='?',
+                        help="directory written by 'python -m hta_engine.psa -o' "
+                             "(default: run the hypertension example)")
+    parser.add_argument('-n', '--iterations', type=int, default=20_000,
+                        help="draws of the example PSA when no directory is given")
+    parser.add_argument('--wtp', type=float, nargs='+', default=[20000, 50000, 100000],
+                        help="willingness-to-pay thresholds")
+    parser.add_argument('--method', choices=METHODS, default='spline', help="regression method")
+    parser.add_argument('--workers', type=int, help="worker processes (default: all cores)")
+    parser.add_argument('-o', '--output', help="write the EVPPI table to this CSV")
+    args = parser.parse_args()
+
+    if args.draws_dir:
+        draws = read_draws(args.draws_dir)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            run_psa(hypertension_model, HYPERTENSION_PARAMETERS, HYPERTENSION_STRATEGIES,
+                    args.iterations, args.wtp, workers=1, output_dir=tmp)
+            draws = read_draws(tmp)
+
+    start = time.perf_counter()
+    result = evppi_from_draws(draws, args.wtp, method=args.method, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"🔍 EVPPI of {result.shape[1] - 1} parameters from {len(draws):,} draws in {elapsed:.2f}s")
+    print(result.T.round(1).to_string())
+    if args.output:
+        result.round(4).to_csv(args.output)
+        print(f"Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
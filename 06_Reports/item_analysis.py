@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Quiz Item Analysis
+Difficulty, discrimination, distractor and reliability statistics for the question bank
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from quiz_scoring import ANSWER_LETTERS, UNANSWERED, load_answer_key
+
+# Directory of exported quiz response batches (CSV, one row per participant)
+QUIZ_RESPONSES_PATH = os.environ.get('HTA_QUIZ_RESPONSES', '')
+CACHE_FILE = '.item_analysis.npz'
+
+# Review thresholds for the item table
+EASY_P_VALUE = 0.90
+HARD_P_VALUE = 0.20
+LOW_DISCRIMINATION = 0.20
+NON_FUNCTIONING_DISTRACTOR = 0.05
+
+# Additive per-batch sums; every statistic is derived from these
+SUM_FIELDS = ['n', 'options', 'total_sum', 'total_sumsq', 'item_total',
+              'topic_sum', 'topic_sumsq']
+
+
+def accumulate(key, codes):
+    """Sufficient statistics of one participants x questions code matrix
+
+    Every field is a plain sum over participants, so batches combine by
+    addition and a changed batch only has to be re-read on its own.
+    """
+    codes = np.asarray(codes, dtype=np.int8)
+    n_items = len(key)
+    correct = ((codes == key.answers) & key.scored).astype(np.float32)
+    total = correct.sum(axis=1, dtype=np.float64)
+    topic_totals = correct @ key.topic_matrix
+
+    # Option choice counts per item; slot 0 is unanswered, 1-4 are options a-d
+    slots = (codes.astype(np.int64) + 1) + 5 * np.arange(n_items)
+    options = np.bincount(slots.ravel(), minlength=5 * n_items).reshape(n_items, 5)
+
+    return {
+        'n': np.array([len(codes)], dtype=np.int64),
+        'options': options,
+        'total_sum': np.array([total.sum()]),
+        'total_sumsq': np.array([(total * total).sum()]),
+        'item_total': correct.T.astype(np.float64) @ total,
+        'topic_sum': topic_totals.sum(axis=0, dtype=np.float64),
+        'topic_sumsq': (topic_totals.astype(np.float64) ** 2).sum(axis=0),
+    }
+
+
+def combine(accumulators, key):
+    """Sum a sequence of accumulators (an empty one if there are none)"""
+    totals = {
+        'n': np.zeros(1, dtype=np.int64),
+        'options': np.zeros((len(key), 5), dtype=np.int64),
+        'total_sum': np.zeros(1), 'total_sumsq': np.zeros(1),
+        'item_total': np.zeros(len(key)),
+        'topic_sum': np.zeros(len(key.topics)), 'topic_sumsq': np.zeros(len(key.topics)),
+    }
+    for acc in accumulators:
+        for field in SUM_FIELDS:
+            totals[field] = totals[field] + acc[field]
+    return totals
+
+
+def analyze_items(key, acc):
+    """Item and per-topic statistics from combined sufficient statistics
+
+    Returns {'respondents', 'items', 'topics'}. Items carry the p-value,
+    the corrected point-biserial (item vs. total score without the item),
+    option selection rates and review flags; topics carry KR-20.
+    """
+    n = int(acc['n'][0])
+    options = acc['options']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = options / n
+        p = np.where(key.scored, options[np.arange(len(key)), key.answers + 1] / n, np.nan)
+
+        # Corrected item-total correlation from sums: x is 0/1, T_i = T - x
+        sum_x = p * n
+        sum_t = acc['total_sum'][0] - sum_x
+        sum_tt = acc['total_sumsq'][0] - 2 * acc['item_total'] + sum_x
+        sum_xt = acc['item_total'] - sum_x
+        cov = sum_xt / n - p * (sum_t / n)
+        var_t = sum_tt / n - (sum_t / n) ** 2
+        point_biserial = cov / np.sqrt(p * (1 - p) * var_t)
+
+    items = pd.DataFrame({
+        'question_id': key.question_ids,
+        'topic': pd.Categorical.from_codes(key.topic_codes, categories=key.topics),
+        'difficulty_level': pd.Categorical.from_codes(key.difficulty_codes, categories=key.difficulties),
+        'key': [ANSWER_LETTERS[a] if a != UNANSWERED else None for a in key.answers],
+        'p_value': p,
+        'point_biserial': point_biserial,
+        'unanswered': rates[:, 0],
+        **{f'option_{letter}': rates[:, i + 1] for i, letter in enumerate(ANSWER_LETTERS)},
+    })
+    items['flags'] = _flags(key, p, point_biserial, rates[:, 1:])
+
+    return {'respondents': n, 'items': items, 'topics': _topic_reliability(key, acc, p)}
+
+
+def _flags(key, p, point_biserial, option_rates):
+    """Review notes for items that are too easy, too hard or misbehaving"""
+    distractor = option_rates.copy()
+    scored = np.flatnonzero(key.scored)
+    key_rate = np.full(len(key), np.nan)
+    key_rate[scored] = option_rates[scored, key.answers[scored]]
+    distractor[scored, key.answers[scored]] = np.nan
+
+    checks = [
+        (~key.scored, 'no answer key'),
+        (p > EASY_P_VALUE, 'too easy'),
+        (p < HARD_P_VALUE, 'too hard'),
+        (point_biserial < LOW_DISCRIMINATION, 'low discrimination'),
+        (np.nanmax(np.where(np.isnan(distractor), -1, distractor), axis=1) > key_rate,
+         'distractor chosen more than key'),
+        ((distractor < NON_FUNCTIONING_DISTRACTOR).any(axis=1), 'non-functioning distractor'),
+    ]
+    notes = [[] for _ in range(len(key))]
+    for mask, note in checks:
+        for i in np.flatnonzero(mask):
+            notes[i].append(note)
+    return ['; '.join(n) for n in notes]
+
+
+def _topic_reliability(key, acc, p):
+    """KR-20 of every topic treated as a sub-test"""
+    n = int(acc['n'][0])
+    pq = np.nan_to_num(p * (1 - p))
+    k = key.topic_matrix.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = acc['topic_sum'] / n
+        variance = acc['topic_sumsq'] / n - mean ** 2
+        kr20 = k / (k - 1) * (1 - (pq @ key.topic_matrix) / variance)
+    return pd.DataFrame({
+        'items': k.astype(int),
+        'mean_correct': mean,
+        'sd_correct': np.sqrt(np.clip(variance, 0, None)),
+        'kr20': np.where(k > 1, kr20, np.nan),
+    }, index=pd.Index(key.topics, name='topic'))
+
+
+def _key_fingerprint(key):
+    digest = hashlib.sha1()
+    for part in (key.question_ids, key.topics, key.topic_codes, key.answers, key.scored):
+        digest.update(repr(list(part)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ItemAnalysisStore:
+    """Cached item statistics over a directory of response batches
+
+    One accumulator is kept per batch file in a small NPZ cache next to the
+    batches. refresh() only re-reads files whose size or mtime changed, drops
+    removed ones, and starts over when the answer key itself changes.
+    """
+
+    def __init__(self, responses_dir, key=None, cache_path=None):
+        self.responses_dir = responses_dir
+        self.key = load_answer_key() if key is None else key
+        self.cache_path = cache_path or os.path.join(responses_dir, CACHE_FILE)
+        self.sources = {}
+        self.accumulators = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                state = json.loads(str(data['state']))
+                if state['key'] != _key_fingerprint(self.key):
+                    return
+                for name, source in state['sources'].items():
+                    self.sources[name] = source
+                    self.accumulators[name] = {
+                        field: data[f"{source['slot']}/{field}"] for field in SUM_FIELDS}
+        except (FileNotFoundError, KeyError, ValueError):
+            self.sources, self.accumulators = {}, {}
+
+    def _save(self):
+        arrays, sources = {}, {}
+        for slot, (name, source) in enumerate(sorted(self.sources.items())):
+            sources[name] = dict(source, slot=slot)
+            for field in SUM_FIELDS:
+                arrays[f'{slot}/{field}'] = self.accumulators[name][field]
+        state = {'key': _key_fingerprint(self.key), 'sources': sources}
+        tmp_path = self.cache_path + '.tmp.npz'
+        np.savez(tmp_path, state=np.array(json.dumps(state)), **arrays)
+        os.replace(tmp_path, self.cache_path)
+
+    def refresh(self):
+        """Bring the cache up to date with the batch files; returns files re-read"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        current = {}
+        for name in sorted(os.listdir(self.responses_dir)):
+            if name.endswith('.csv'):
+                stat = os.stat(os.path.join(self.responses_dir, name))
+                current[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+        changed = [name for name, sig in current.items()
+                   if {k: self.sources.get(name, {}).get(k) for k in sig} != sig]
+        removed = set(self.sources) - set(current)
+        for name in changed:
+            responses = pd.read_csv(os.path.join(self.responses_dir, name),
+                                    dtype=str, keep_default_na=False)
+            self.accumulators[name] = accumulate(self.key, self.key.align(responses))
+            self.sources[name] = current[name]
+        for name in removed:
+            del self.sources[name], self.accumulators[name]
+        if changed or removed:
+            self._save()
+        return len(changed)
+
+    def version(self):
+        """Token that changes whenever a batch is added, changed or removed"""
+        return tuple(sorted((name, s['size'], s['mtime_ns']) for name, s in self.sources.items()))
+
+    def analyze(self):
+        """Item analysis over every cached batch"""
+        return analyze_items(self.key, combine(self.accumulators.values(), self.key))
+
+
+def main():
+    """Command-line entry point for refreshing and printing the item analysis"""
+    parser = argparse.ArgumentParser(description="Item analysis of quiz response batches")
+    parser.add_argument('responses_dir', nargs='?', default=QUIZ_RESPONSES_PATH,
+                        help="directory of exported response CSVs (default: $HTA_QUIZ_RESPONSES)")
+    parser.add_argument('--bank', help="question bank CSV (default: 02_Quizzes/hta_questions.csv)")
+    parser.add_argument('-o', '--output', help="write the item table to this CSV")
+    args = parser.parse_args()
+    if not args.responses_dir:
+        parser.error("no responses directory given and HTA_QUIZ_RESPONSES is not set")
+
+    store = ItemAnalysisStore(args.responses_dir, key=load_answer_key(args.bank))
+    reread = store.refresh()
+    result = store.analyze()
+    print(f"📊 {result['respondents']:,} respondents from {len(store.sources)} batches "
+          f"({reread} re-read)")
+    print(result['topics'].round(3).to_string())
+    flagged = result['items'][result['items']['flags'] != '']
+    print(f"⚠️  {len(flagged)} of {len(result['items'])} items flagged for review")
+
+    if args.output:
+        result['items'].round(4).to_csv(args.output, index=False)
+        print(f"Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
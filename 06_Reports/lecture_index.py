@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Lecture Search
+Section-level BM25 index over the lecture markdown, updated incrementally
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+REPORTS_DIR = os.path.dirname(os.path.abspath(__file__))
+LECTURES_DIR = os.environ.get('HTA_LECTURES_DIR', os.path.join(REPORTS_DIR, '..', '01_Lectures'))
+CACHE_DIR = os.environ.get('HTA_CACHE_DIR', os.path.join(REPORTS_DIR, '.cache'))
+
+# BM25 parameters
+K1 = 1.5
+B = 0.75
+# Heading words count this many times towards their section
+TITLE_WEIGHT = 3
+SNIPPET_LENGTH = 240
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can for from has have how in into is it its of on or that the
+their them there these this to was were what when where which who why will with within
+""".split())
+_TOKEN = re.compile(r'[a-z0-9]+')
+_HEADING = re.compile(r'^(#{1,6})\s+(.+?)\s*#*\s*$')
+_FENCE = re.compile(r'^\s*(```|~~~)')
+# Arrays persisted in the index file besides its JSON state
+ARRAYS = ['vocab', 'forward_offsets', 'forward_terms', 'forward_weights',
+          'postings_offsets', 'postings_sections', 'postings_weights', 'lengths']
+
+
+def _stem(token):
+    """Fold plurals so 'QALYs' finds 'QALY' and 'therapies' finds 'therapy'"""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lower-cased, stemmed search terms of a piece of text"""
+    return [_stem(t) for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def parse_sections(text, source):
+    """Split markdown into one section per heading
+
+    Each section keeps its heading, the trail of parent headings, the line
+    it starts on and its body text. Headings inside fenced code blocks are
+    ignored; text before the first heading belongs to a section named
+    after the file.
+    """
+    sections = []
+    trail = []
+    current = {'file': source, 'title': os.path.splitext(os.path.basename(source))[0],
+               'path': '', 'level': 0, 'line': 1, 'lines': []}
+    in_fence = False
+    for number, line in enumerate(text.splitlines(), 1):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if not match:
+            current['lines'].append(line)
+            continue
+        sections.append(current)
+        level, title = len(match.group(1)), match.group(2).strip()
+        trail = [t for t in trail if t[0] < level] + [(level, title)]
+        current = {'file': source, 'title': title, 'path': ' › '.join(t for _, t in trail),
+                   'level': level, 'line': number, 'lines': []}
+    sections.append(current)
+
+    result = []
+    for section in sections:
+        body = '\n'.join(section.pop('lines')).strip()
+        if body or section['level']:
+            result.append(dict(section, text=body))
+    return result
+
+
+def _section_terms(section):
+    counts = Counter(tokenize(section['text']))
+    for term in tokenize(section['title']):
+        counts[term] += TITLE_WEIGHT
+    return counts
+
+
+def _file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class LectureIndex:
+    """Persistent BM25 index over every markdown file in a lecture directory
+
+    Postings are stored term by term in flat arrays (CSR layout) next to a
+    forward index of each section's terms. refresh() stats the files,
+    re-parses only those whose content hash changed and rebuilds the
+    postings from the stored forward index, so no unchanged markdown is
+    read again. Queries only touch the postings of their own terms.
+    """
+
+    def __init__(self, lectures_dir=LECTURES_DIR, index_path=None):
+        self.lectures_dir = os.path.abspath(lectures_dir)
+        if index_path is None:
+            digest = hashlib.sha1(self.lectures_dir.encode('utf-8')).hexdigest()[:12]
+            index_path = os.path.join(CACHE_DIR, f'lecture_index.{digest}.npz')
+        self.index_path = index_path
+        # (files, sections, arrays), always replaced as a whole so a query
+        # running alongside refresh() sees either the old index or the new one
+        self._state = ({}, [], self._empty_arrays())
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def files(self):
+        return self._state[0]
+
+    @property
+    def sections(self):
+        return self._state[1]
+
+    @property
+    def arrays(self):
+        return self._state[2]
+
+    @staticmethod
+    def _empty_arrays():
+        return {
+            'vocab': np.array([], dtype=str),
+            'forward_offsets': np.zeros(1, dtype=np.int64),
+            'forward_terms': np.array([], dtype=np.int32),
+            'forward_weights': np.array([], dtype=np.float32),
+            'postings_offsets': np.zeros(1, dtype=np.int64),
+            'postings_sections': np.array([], dtype=np.int32),
+            'postings_weights': np.array([], dtype=np.float32),
+            'lengths': np.array([], dtype=np.float32),
+        }
+
+    def __len__(self):
+        return len(self.sections)
+
+    def _load(self):
+        try:
+            with np.load(self.index_path, allow_pickle=False) as data:
+                state = json.loads(str(data['state']))
+                if state['lectures_dir'] != self.lectures_dir:
+                    return
+                arrays = {name: data[name] for name in ARRAYS}
+            self._state = (state['files'], state['sections'], arrays)
+        except (FileNotFoundError, KeyError, ValueError):
+            self._state = ({}, [], self._empty_arrays())
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        state = {'lectures_dir': self.lectures_dir, 'files': self.files, 'sections': self.sections}
+        tmp_path = self.index_path + '.tmp.npz'
+        np.savez_compressed(tmp_path, state=np.array(json.dumps(state, ensure_ascii=False)), **self.arrays)
+        os.replace(tmp_path, self.index_path)
+
+    def _markdown_files(self):
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(self.lectures_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.lower().endswith('.md'):
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, self.lectures_dir).replace(os.sep, '/')
+                    stat = os.stat(path)
+                    found[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+        return found
+
+    def refresh(self):
+        """Bring the index up to date with the lecture files; returns files re-parsed"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        current = self._markdown_files()
+        parsed = {}
+        stat_only = False
+        for name, signature in current.items():
+            known = self.files.get(name)
+            if known and all(known[k] == v for k, v in signature.items()):
+                continue
+            path = os.path.join(self.lectures_dir, name)
+            digest = _file_hash(path)
+            if known and known['sha256'] == digest:
+                known.update(signature)
+                stat_only = True
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                parsed[name] = (digest, parse_sections(f.read(), name))
+
+        if not parsed and set(current) == set(self.files):
+            if stat_only:
+                self._save()
+            return 0
+        self._rebuild(current, parsed)
+        self._save()
+        return len(parsed)
+
+    def _rebuild(self, current, parsed):
+        """Merge kept and re-parsed files into new forward and inverted arrays"""
+        old = self.arrays
+        sections, term_lists, weight_lists, kept_terms = [], [], [], []
+        files = {}
+        for name in sorted(current):
+            first = len(sections)
+            if name in parsed:
+                digest, new_sections = parsed[name]
+                for section in new_sections:
+                    counts = _section_terms(section)
+                    term_lists.append(np.array(list(counts), dtype=object))
+                    weight_lists.append(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+                    sections.append(section)
+            else:
+                digest = self.files[name]['sha256']
+                known = self.files[name]
+                for i in range(known['first'], known['first'] + known['count']):
+                    start, end = old['forward_offsets'][i], old['forward_offsets'][i + 1]
+                    kept_terms.append(old['forward_terms'][start:end])
+                    term_lists.append(None)
+                    weight_lists.append(old['forward_weights'][start:end])
+                    sections.append(self.sections[i])
+            files[name] = dict(current[name], sha256=digest, first=first, count=len(sections) - first)
+
+        # New vocabulary: every term still in use, sorted so lookups are a binary search
+        reused = old['vocab'][np.concatenate(kept_terms)] if kept_terms else np.array([], dtype=str)
+        fresh = [t for terms in term_lists if terms is not None for t in terms]
+        vocab = np.unique(np.concatenate([reused.astype(str), np.array(fresh, dtype=str)]))
+        kept = iter(kept_terms)
+        ids = [np.searchsorted(vocab, old['vocab'][next(kept)] if terms is None else terms.astype(str))
+               for terms in term_lists]
+
+        lengths = np.array([len(t) for t in ids], dtype=np.int64)
+        forward_terms = np.concatenate(ids).astype(np.int32) if ids else np.array([], dtype=np.int32)
+        forward_weights = (np.concatenate(weight_lists).astype(np.float32) if weight_lists
+                           else np.array([], dtype=np.float32))
+        section_ids = np.repeat(np.arange(len(sections), dtype=np.int32), lengths)
+        order = np.argsort(forward_terms, kind='stable')
+        arrays = {
+            'vocab': vocab,
+            'forward_offsets': np.concatenate([[0], np.cumsum(lengths)]),
+            'forward_terms': forward_terms,
+            'forward_weights': forward_weights,
+            'postings_offsets': np.concatenate([[0], np.cumsum(np.bincount(forward_terms, minlength=len(vocab)))]),
+            'postings_sections': section_ids[order],
+            'postings_weights': forward_weights[order],
+            'lengths': np.bincount(section_ids, weights=forward_weights,
+                                   minlength=len(sections)).astype(np.float32),
+        }
+        self._state = (files, sections, arrays)
+
+    def version(self):
+        """Token that changes whenever a lecture file's content changes"""
+        return tuple(sorted((name, f['sha256']) for name, f in self.files.items()))
+
+    def scores(self, query):
+        """BM25 score of every section for a free-text query (0 where no term matches)"""
+        _, sections, a = self._state
+        return self._scores(query, len(sections), a)
+
+    @staticmethod
+    def _scores(query, n, a):
+        terms = sorted(set(tokenize(query)))
+        scores = np.zeros(n)
+        if not terms or not n:
+            return scores
+
+        positions = np.searchsorted(a['vocab'], terms)
+        known = positions < len(a['vocab'])
+        known[known] = a['vocab'][positions[known]] == np.array(terms)[known]
+        norm = K1 * (1 - B + B * a['lengths'] / max(a['lengths'].mean(), 1e-9))
+        for p in positions[known]:
+            start, end = a['postings_offsets'][p], a['postings_offsets'][p + 1]
+            hits, tf = a['postings_sections'][start:end], a['postings_weights'][start:end]
+            idf = np.log(1 + (n - len(hits) + 0.5) / (len(hits) + 0.5))
+            scores[hits] += idf * tf * (K1 + 1) / (tf + norm[hits])
+        return scores
+
+    def search(self, query, limit=10, files=None):
+        """Best matching sections for a free-text query, highest BM25 score first
+
+        files optionally restricts the results to some lecture files. Each
+        row carries the section's full text, taken from the same snapshot
+        as its score.
+        """
+        _, sections, a = self._state
+        scores = self._scores(query, len(sections), a)
+        if files is not None:
+            scores[~np.isin([s['file'] for s in sections], list(files))] = 0
+
+        found = np.flatnonzero(scores)
+        if len(found) > limit:
+            found = found[np.argpartition(-scores[found], limit - 1)[:limit]]
+        found = found[np.argsort(-scores[found], kind='stable')]
+        terms = set(tokenize(query))
+        return pd.DataFrame([{
+            'file': sections[i]['file'], 'title': sections[i]['title'],
+            'path': sections[i]['path'], 'line': sections[i]['line'],
+            'score': scores[i], 'snippet': _snippet(sections[i]['text'], terms),
+            'section': int(i), 'text': sections[i]['text'],
+        } for i in found], columns=['file', 'title', 'path', 'line', 'score', 'snippet', 'section', 'text'])
+
+
+def _snippet(text, terms):
+    """First line of a section that mentions a query term, trimmed"""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    line = next((line for line in lines if terms & set(tokenize(line))), lines[0] if lines else '')
+    line = re.sub(r'[*_`]+', '', line)
+    return line if len(line) <= SNIPPET_LENGTH else line[:SNIPPET_LENGTH - 1].rstrip() + '…'
+
+
+def main():
+    """Command-line entry point for searching the lectures"""
+    parser = argparse.ArgumentParser(description="Search the lecture markdown")
+    parser.add_argument('query', nargs='*', help="search terms (omit to only refresh the index)")
+    parser.add_argument('--dir', default=LECTURES_DIR, help="lecture directory (default: 01_Lectures)")
+    parser.add_argument('-n', '--limit', type=int, default=5, help="results to show")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    index = LectureIndex(args.dir)
+    reparsed = index.refresh()
+    print(f"📚 {len(index.sections)} sections from {len(index.files)} files "
+          f"({reparsed} re-parsed) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    if args.query:
+        start = time.perf_counter()
+        results = index.search(' '.join(args.query), limit=args.limit)
+        print(f"🔎 {len(results)} results in {(time.perf_counter() - start) * 1000:.2f} ms")
+        for row in results.itertuples():
+            print(f"{row.score:6.2f}  {row.file}:{row.line}  {row.path}\n        {row.snippet}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Package Builder
+Streaming zip writer that compresses entries in parallel and stores media as-is
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# Formats that are already compressed; deflating them again only costs time
+COMPRESSED_SUFFIXES = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.pdf', '.pptx', '.docx', '.xlsx',
+    '.zip', '.gz', '.bz2', '.xz', '.7z', '.mp3', '.mp4', '.mov', '.woff', '.woff2',
+}
+SKIP_PATTERNS = ['__pycache__', '.DS_Store', 'node_modules', '.cache', '.outbox', '.checkin_secret']
+
+CHUNK_SIZE = 1024 * 1024
+# Compressed entries stay in memory up to this size before spilling to disk
+SPOOL_SIZE = 8 * 1024 * 1024
+COMPRESS_LEVEL = 6
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_ZIP_COUNT_LIMIT = 0xFFFF
+_UTF8_FLAG = 0x800
+
+
+def collect_package_files(base_dir, skip=SKIP_PATTERNS, root="."):
+    """List (filepath, arcname) pairs for every file under base_dir
+
+    Hidden files and directories (caches, keys, delivery journals) and
+    paths containing a skip pattern are left out.
+    """
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(base_dir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            filepath = os.path.join(dirpath, filename)
+            if not filename.startswith('.') and not any(pattern in filepath for pattern in skip):
+                arcname = os.path.relpath(filepath, root).replace(os.sep, '/')
+                entries.append((filepath, arcname))
+    return entries
+
+
+def _dos_datetime(mtime):
+    """Zip (date, time) fields for a file modification time"""
+    t = time.localtime(max(mtime, 315532800))  # zip dates start in 1980
+    dos_date = (t.tm_year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dos_time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+    return dos_date, dos_time
+
+
+def _read_chunks(fileobj):
+    while True:
+        chunk = fileobj.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _checksums(filepath):
+    """(CRC-32, SHA-256 hex digest) of a file, read in chunks"""
+    crc = 0
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in _read_chunks(f):
+            crc = zlib.crc32(chunk, crc)
+            digest.update(chunk)
+    return crc, digest.hexdigest()
+
+
+def _prepare_entry(filepath, arcname, level, previous=None, previous_zip=None):
+    """Checksum and (unless already compressed or reusable) deflate one file
+
+    Runs in a worker thread; zlib and hashlib release the GIL, so entries
+    are prepared in parallel. Deflated output is spooled, spilling to disk
+    when large. With a previous build, entries whose size and mtime match
+    the manifest, or whose content hash matches any previous entry, are
+    copied raw from the previous zip instead of being recompressed.
+    """
+    stat = os.stat(filepath)
+    entry = {
+        'arcname': arcname, 'filepath': filepath, 'size': stat.st_size,
+        'mtime': stat.st_mtime, 'mtime_ns': stat.st_mtime_ns, 'mode': stat.st_mode,
+        'method': ZIP_STORED, 'crc': 0, 'compress_size': stat.st_size,
+        'sha256': None, 'spool': None, 'reused_from': None,
+    }
+    previous = previous or {}
+
+    old = previous.get('entries', {}).get(arcname)
+    if old and old['size'] == stat.st_size and old['mtime_ns'] == stat.st_mtime_ns:
+        return _reuse_entry(entry, old, previous_zip)
+
+    entry['crc'], entry['sha256'] = _checksums(filepath)
+    old = previous.get('by_hash', {}).get(entry['sha256'])
+    if old and old['size'] == stat.st_size:
+        return _reuse_entry(entry, old, previous_zip)
+
+    suffix = os.path.splitext(arcname)[1].lower()
+    if suffix in COMPRESSED_SUFFIXES or stat.st_size == 0:
+        return entry
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    with open(filepath, 'rb') as f:
+        for chunk in _read_chunks(f):
+            spool.write(compressor.compress(chunk))
+    spool.write(compressor.flush())
+
+    compress_size = spool.tell()
+    if compress_size >= entry['size']:
+        spool.close()  # deflate did not help, store the original bytes
+        return entry
+    spool.seek(0)
+    entry.update(method=ZIP_DEFLATED, compress_size=compress_size, spool=spool)
+    return entry
+
+
+def _reuse_entry(entry, old, previous_zip):
+    """Point an entry at the already-compressed bytes in the previous zip"""
+    entry.update(method=old['method'], crc=old['crc'], compress_size=old['compress_size'],
+                 sha256=old['sha256'], reused_from=(previous_zip, old['data_offset']))
+    return entry
+
+
+class PackageWriter:
+    """Minimal streaming zip writer for entries whose CRC and sizes are known
+
+    Entry data is copied to the output in fixed-size chunks, so memory use
+    does not grow with the package. ZIP64 records are written when needed.
+    """
+
+    def __init__(self, fileobj):
+        self.fp = fileobj
+        self.offset = 0
+        self.central_directory = []
+
+    def _write(self, data):
+        self.fp.write(data)
+        self.offset += len(data)
+
+    def add_entry(self, arcname, method, crc, compress_size, size, mtime, mode, chunks):
+        """Write one entry and return the offset of its data
+
+        `chunks` yields the entry's bytes exactly as stored (already compressed).
+        """
+        name = arcname.encode('utf-8')
+        flags = _UTF8_FLAG if not arcname.isascii() else 0
+        dos_date, dos_time = _dos_datetime(mtime)
+        header_offset = self.offset
+
+        zip64 = size >= _ZIP64_LIMIT or compress_size >= _ZIP64_LIMIT
+        extra = struct.pack('<HHQQ', 1, 16, size, compress_size) if zip64 else b''
+        version = 45 if zip64 else 20
+        self._write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, version, flags, method, dos_time, dos_date, crc,
+            _ZIP64_LIMIT if zip64 else compress_size, _ZIP64_LIMIT if zip64 else size,
+            len(name), len(extra)) + name + extra)
+
+        written = 0
+        for chunk in chunks:
+            self._write(chunk)
+            written += len(chunk)
+        if written != compress_size:
+            raise IOError(f"Size of {arcname} changed while packaging")
+
+        self.central_directory.append((name, flags, method, dos_time, dos_date, crc,
+                                       compress_size, size, mode, header_offset))
+        return self.offset - compress_size
+
+    def close(self):
+        """Write the central directory and end records"""
+        cd_offset = self.offset
+        for (name, flags, method, dos_time, dos_date, crc,
+             compress_size, size, mode, header_offset) in self.central_directory:
+            zip64_fields = [v for v in (size, compress_size, header_offset) if v >= _ZIP64_LIMIT]
+            extra = b''
+            if zip64_fields:
+                extra = struct.pack(f'<HH{len(zip64_fields)}Q', 1, 8 * len(zip64_fields), *zip64_fields)
+            version = 45 if zip64_fields else 20
+            self._write(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | version, version, flags, method,
+                dos_time, dos_date, crc, min(compress_size, _ZIP64_LIMIT), min(size, _ZIP64_LIMIT),
+                len(name), len(extra), 0, 0, 0, (mode & 0xFFFF) << 16,
+                min(header_offset, _ZIP64_LIMIT)) + name + extra)
+
+        count = len(self.central_directory)
+        cd_size = self.offset - cd_offset
+        if count >= _ZIP_COUNT_LIMIT or cd_size >= _ZIP64_LIMIT or cd_offset >= _ZIP64_LIMIT:
+            zip64_end = self.offset
+            self._write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                                    count, count, cd_size, cd_offset))
+            self._write(struct.pack('<IIQI', 0x07064b50, 0, zip64_end, 1))
+        self._write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0,
+                                min(count, _ZIP_COUNT_LIMIT), min(count, _ZIP_COUNT_LIMIT),
+                                min(cd_size, _ZIP64_LIMIT), min(cd_offset, _ZIP64_LIMIT), 0))
+
+
+def _entry_chunks(entry):
+    """Stream an entry's payload from its spool, the previous zip or the source file"""
+    if entry['spool'] is not None:
+        with entry['spool'] as spool:
+            yield from _read_chunks(spool)
+    elif entry['reused_from'] is not None:
+        previous_zip, data_offset = entry['reused_from']
+        remaining = entry['compress_size']
+        with open(previous_zip, 'rb') as f:
+            f.seek(data_offset)
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise IOError(f"{previous_zip} ended inside {entry['arcname']}")
+                remaining -= len(chunk)
+                yield chunk
+    else:
+        with open(entry['filepath'], 'rb') as f:
+            yield from _read_chunks(f)
+
+
+def manifest_filename(zip_filename):
+    """Build manifest stored next to a package"""
+    return os.path.splitext(zip_filename)[0] + '.manifest.json'
+
+
+def load_manifest(zip_filename, manifest_path=None):
+    """Manifest of the previous build, or None if it no longer matches the zip"""
+    manifest_path = manifest_path or manifest_filename(zip_filename)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        stat = os.stat(zip_filename)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    package = manifest.get('package', {})
+    if package.get('size') != stat.st_size or package.get('mtime_ns') != stat.st_mtime_ns:
+        return None
+    return manifest
+
+
+def build_package(zip_filename, entries, workers=None, level=COMPRESS_LEVEL,
+                  manifest_path=None, incremental=True):
+    """Write (filepath, arcname) entries to a zip, compressing in parallel
+
+    Entries are prepared by a thread pool but written strictly in order;
+    at most a small window of prepared entries is held at any time. A
+    manifest of content hashes, sizes, mtimes and zip offsets is written
+    next to the package; with `incremental`, unchanged entries are copied
+    raw from the previous package. Returns the per-entry manifest records.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = workers * 2
+    manifest_path = manifest_path or manifest_filename(zip_filename)
+    manifest = load_manifest(zip_filename, manifest_path) if incremental else None
+    previous = None
+    if manifest:
+        previous = {'entries': manifest['entries'],
+                    'by_hash': {e['sha256']: e for e in manifest['entries'].values()}}
+
+    records = []
+    tmp_filename = zip_filename + '.partial'
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool, open(tmp_filename, 'wb') as out:
+            writer = PackageWriter(out)
+            pending = deque()
+            queue = iter(entries)
+
+            def submit(filepath, arcname):
+                pending.append(pool.submit(_prepare_entry, filepath, arcname, level,
+                                           previous, zip_filename))
+
+            for filepath, arcname in queue:
+                submit(filepath, arcname)
+                if len(pending) >= window:
+                    break
+            while pending:
+                entry = pending.popleft().result()
+                for filepath, arcname in queue:
+                    submit(filepath, arcname)
+                    break
+                data_offset = writer.add_entry(entry['arcname'], entry['method'], entry['crc'],
+                                               entry['compress_size'], entry['size'],
+                                               entry['mtime'], entry['mode'], _entry_chunks(entry))
+                record = {key: entry[key] for key in
+                          ('arcname', 'method', 'crc', 'size', 'compress_size', 'mtime_ns', 'sha256')}
+                record['data_offset'] = data_offset
+                record['reused'] = entry['reused_from'] is not None
+                records.append(record)
+            writer.close()
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    os.replace(tmp_filename, zip_filename)
+
+    stat = os.stat(zip_filename)
+    manifest = {
+        'package': {'path': os.path.basename(zip_filename), 'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns},
+        'entries': {record['arcname']: {key: value for key, value in record.items()
+                                        if key not in ('arcname', 'reused')}
+                    for record in records},
+    }
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return records
+
+
+def _check_entry_data(zip_filename, info, local, handles):
+    """Decompress one entry in chunks; returns (SHA-256 hex digest, error)"""
+    zf = getattr(local, 'zipfile', None)
+    if zf is None:
+        zf = local.zipfile = zipfile.ZipFile(zip_filename)
+        handles.append(zf)
+    digest = hashlib.sha256()
+    try:
+        with zf.open(info) as f:  # raises BadZipFile on a CRC mismatch at EOF
+            for chunk in _read_chunks(f):
+                digest.update(chunk)
+    except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+        return None, str(e)
+    return digest.hexdigest(), None
+
+
+def verify_package(zip_filename, required_files=(), manifest_path=None, check_data=True,
+                   workers=None):
+    """Verify a package in one pass over its central directory
+
+    Required paths are looked up in an index of entry names, CRC-32 and
+    sizes are compared with the build manifest (when present), and with
+    `check_data` every entry is decompressed and hashed on a thread pool.
+    Returns a JSON-serializable report; report['ok'] is the overall verdict.
+    """
+    start = time.perf_counter()
+    manifest_path = manifest_path or manifest_filename(zip_filename)
+    problems = []
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            expected = json.load(f)['entries']
+        if not all({'crc', 'size', 'compress_size', 'sha256'} <= record.keys() for record in expected.values()):
+            raise ValueError("entries lack crc, size, compress_size or sha256")
+    except FileNotFoundError:
+        expected = None
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        # Truncated or hand-edited manifest: nothing to compare against, and the package fails
+        expected = None
+        problems.append({'arcname': manifest_path, 'problem': f'invalid manifest: {type(e).__name__}: {e}'})
+
+    with zipfile.ZipFile(zip_filename) as zf:
+        infos = zf.infolist()
+    index = {info.filename: info for info in infos}
+
+    missing = [name for name in required_files if name not in index]
+    if expected is not None:
+        for name in expected.keys() - index.keys():
+            problems.append({'arcname': name, 'problem': 'missing from package'})
+        for info in infos:
+            record = expected.get(info.filename)
+            if record is None:
+                problems.append({'arcname': info.filename, 'problem': 'not in manifest'})
+            elif (info.CRC, info.file_size, info.compress_size) != (
+                    record['crc'], record['size'], record['compress_size']):
+                problems.append({'arcname': info.filename, 'problem': 'CRC/size differs from manifest'})
+
+    if check_data:
+        # Each worker thread decompresses through its own zip handle
+        local, handles = threading.local(), []
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            results = list(pool.map(
+                lambda info: _check_entry_data(zip_filename, info, local, handles), infos))
+        for zf in handles:
+            zf.close()
+        for info, (sha256, error) in zip(infos, results):
+            if error:
+                problems.append({'arcname': info.filename, 'problem': f'corrupt data: {error}'})
+            elif expected and info.filename in expected and expected[info.filename]['sha256'] != sha256:
+                problems.append({'arcname': info.filename, 'problem': 'SHA-256 differs from manifest'})
+
+    return {
+        'package': zip_filename,
+        'entries': len(infos),
+        'manifest': manifest_path if expected is not None else None,
+        'data_checked': check_data,
+        'missing_required': missing,
+        'problems': problems,
+        'ok': not missing and not problems,
+        'elapsed_seconds': round(time.perf_counter() - start, 4),
+    }
+
+
+def main():
+    """Command-line entry point for verifying a built package"""
+    parser = argparse.ArgumentParser(description="Verify an HTA workshop package against its manifest")
+    parser.add_argument('package', help="zip package to verify")
+    parser.add_argument('--manifest', help="build manifest (default: next to the package)")
+    parser.add_argument('--require', action='append', default=[], help="entry that must be present")
+    parser.add_argument('--quick', action='store_true', help="skip decompressing entry data")
+    args = parser.parse_args()
+
+    report = verify_package(args.package, args.require, args.manifest, check_data=not args.quick)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['ok'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Question Bank
+Validated loader for hta_questions.csv with a compiled, hash-keyed binary cache
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import re
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pyarrow is optional, without it there is no cache
+    pa = None
+    feather = None
+
+REPORTS_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTION_BANK_PATH = os.environ.get(
+    'HTA_QUESTION_BANK', os.path.join(REPORTS_DIR, '..', '02_Quizzes', 'hta_questions.csv'))
+# Compiled banks are written here as <name>.<hash>.arrow
+CACHE_DIR = os.environ.get('HTA_CACHE_DIR', os.path.join(REPORTS_DIR, '.cache'))
+
+HEADER = ['topic', 'question_type', 'question', 'option_a', 'option_b', 'option_c',
+          'option_d', 'correct_answer', 'explanation', 'difficulty_level']
+OPTION_COLUMNS = ['option_a', 'option_b', 'option_c', 'option_d']
+ANSWER_LETTERS = 'abcd'
+DIFFICULTY_LEVELS = ['easy', 'medium', 'hard']
+QUESTION_TYPES = ['concept', 'calculation', 'interpretation']
+QUESTION_TYPE_ALIASES = {'calculations': 'calculation', 'concepts': 'concept',
+                         'interpretations': 'interpretation'}
+
+# Digit groups split off by an unquoted comma: "₹2,10,000" -> "₹2" "10" "000"
+_NUMBER_GROUPS = re.compile(r'\d+(?:,\d+)+')
+_LEADING_DIGITS = re.compile(r'^\d+')
+_TRAILING_DIGIT = re.compile(r'\d$')
+_CONTINUATION = re.compile(r'^\d{3}(\D|$)')
+
+
+def question_id(position):
+    """Stable id of the question at a 1-based bank position"""
+    return f'Q{position:03d}'
+
+
+def _valid_number(text):
+    """Whether every comma-grouped number in text is a plausible amount
+
+    Accepts Western (1,000,000) and Indian (10,00,000) grouping: after the
+    lead group come 2-digit groups, then 3-digit groups, ending on 3 digits.
+    """
+    for match in _NUMBER_GROUPS.finditer(text):
+        groups = [len(g) for g in match.group().split(',')[1:]]
+        if groups[-1] != 3 or any(g not in (2, 3) for g in groups):
+            return False
+        if 3 in groups and 2 in groups[groups.index(3):]:
+            return False
+    return True
+
+
+def _joinable(previous, fragment):
+    """Whether an unquoted comma can sit between two fragments of one field"""
+    if fragment.startswith(' '):
+        return True
+    return bool(_TRAILING_DIGIT.search(previous) and _LEADING_DIGITS.match(fragment))
+
+
+def _split_fields(fragments, count):
+    """Regroup comma-split fragments into exactly `count` fields
+
+    Fragments may only be rejoined where a comma could have been part of
+    the text (before a space, or inside a grouped number). Among the
+    possible groupings the one with the fewest fields starting on a bare
+    "000"-style continuation group wins. Returns None when there is no
+    grouping or the best one is not unique.
+    """
+    if len(fragments) == count:
+        return fragments
+    n = len(fragments)
+    # best[i][k]: (penalty, number of groupings at that penalty, fields) for fragments[i:]
+    best = [[None] * (count + 1) for _ in range(n + 1)]
+    best[n][0] = (0, 1, [])
+    for i in range(n - 1, -1, -1):
+        piece = fragments[i]
+        penalty = 1 if i > 0 and _CONTINUATION.match(piece) else 0
+        for j in range(i + 1, n + 1):
+            if j > i + 1:
+                if not _joinable(piece, fragments[j - 1]):
+                    break
+                piece = piece + ',' + fragments[j - 1]
+            if not _valid_number(piece):
+                continue
+            for k in range(1, count + 1):
+                rest = best[j][k - 1]
+                if rest is None:
+                    continue
+                candidate = (penalty + rest[0], rest[1], [piece] + rest[2])
+                current = best[i][k]
+                if current is None or candidate[0] < current[0]:
+                    best[i][k] = candidate
+                elif candidate[0] == current[0]:
+                    best[i][k] = (current[0], min(current[1] + rest[1], 2), current[2])
+    result = best[0][count]
+    return result[2] if result is not None and result[1] == 1 else None
+
+
+def _parse_row(fields):
+    """Parse one CSV row into a question record and its list of issues
+
+    Rows with unquoted commas are repaired by anchoring on both ends: topic
+    and type lead, difficulty trails, the answer is the last bare a-d field
+    before the explanation, and the fragments in between are regrouped into
+    the question and its four options.
+    """
+    issues = []
+    record = dict.fromkeys(HEADER, '')
+    if len(fields) == len(HEADER):
+        record.update(zip(HEADER, (f.strip() for f in fields)))
+    elif len(fields) < len(HEADER):
+        issues.append(('error', f"expected {len(HEADER)} fields, found {len(fields)}"))
+        record.update(zip(HEADER, (f.strip() for f in fields)))
+    else:
+        answer = next((i for i in range(len(fields) - 2, 1, -1)
+                       if fields[i].strip().lower() in ANSWER_LETTERS and fields[i].strip()), None)
+        record.update(topic=fields[0].strip(), question_type=fields[1].strip(),
+                      difficulty_level=fields[-1].strip())
+        if answer is None:
+            issues.append(('error', "no answer letter found among unquoted fields"))
+        else:
+            record['correct_answer'] = fields[answer].strip()
+            record['explanation'] = ','.join(fields[answer + 1:-1]).strip()
+            text = _split_fields(fields[2:answer], 5)
+            if text is None:
+                issues.append(('error', "could not separate question and options "
+                                        "(unquoted commas)"))
+                record['question'] = ','.join(fields[2:answer]).strip()
+            else:
+                record.update(zip(['question'] + OPTION_COLUMNS, (t.strip() for t in text)))
+                issues.append(('warning', "unquoted commas repaired"))
+
+    record['correct_answer'] = record['correct_answer'].lower()
+    if record['correct_answer'] not in ANSWER_LETTERS or not record['correct_answer']:
+        if not any(level == 'error' for level, _ in issues):
+            issues.append(('error', f"invalid correct_answer {record['correct_answer']!r}"))
+        record['correct_answer'] = ''
+    if not record['question'] or not all(record[c] for c in OPTION_COLUMNS):
+        if not any(level == 'error' for level, _ in issues):
+            issues.append(('error', "question or option text missing"))
+
+    question_type = record['question_type'].lower()
+    if question_type in QUESTION_TYPE_ALIASES:
+        issues.append(('warning', f"question_type {record['question_type']!r} read as "
+                                  f"{QUESTION_TYPE_ALIASES[question_type]!r}"))
+        question_type = QUESTION_TYPE_ALIASES[question_type]
+    elif question_type not in QUESTION_TYPES:
+        issues.append(('warning', f"unknown question_type {record['question_type']!r}"))
+        question_type = None
+    record['question_type'] = question_type
+
+    difficulty = record['difficulty_level'].lower()
+    if difficulty not in DIFFICULTY_LEVELS:
+        issues.append(('warning', f"invalid difficulty_level {record['difficulty_level']!r}"))
+        difficulty = None
+    record['difficulty_level'] = difficulty
+    return record, issues
+
+
+def parse_question_bank(data):
+    """Parse and validate question bank CSV bytes
+
+    Returns (questions, issues). Every non-blank row becomes a question with
+    a positional id; rows with errors are kept but marked valid=False.
+    """
+    reader = csv.reader(io.StringIO(data.decode('utf-8-sig'), newline=''))
+    header = [h.strip() for h in next(reader, [])]
+    if header != HEADER:
+        raise ValueError(f"Unexpected question bank header: {header}")
+
+    records, issues = [], []
+    for line, fields in enumerate(reader, start=2):
+        if not any(field.strip() for field in fields):
+            continue
+        record, row_issues = _parse_row(fields)
+        record['question_id'] = question_id(len(records) + 1)
+        record['row'] = line
+        record['valid'] = not any(level == 'error' for level, _ in row_issues)
+        records.append(record)
+        issues.extend((line, record['question_id'], level, message) for level, message in row_issues)
+
+    questions = pd.DataFrame(records, columns=['question_id', 'row', *HEADER, 'valid'])
+    questions['topic'] = questions['topic'].astype('category')
+    questions['question_type'] = pd.Categorical(questions['question_type'], categories=QUESTION_TYPES)
+    questions['difficulty_level'] = pd.Categorical(questions['difficulty_level'],
+                                                   categories=DIFFICULTY_LEVELS, ordered=True)
+    questions['correct_answer'] = pd.Categorical(questions['correct_answer'],
+                                                 categories=list(ANSWER_LETTERS))
+    issues = pd.DataFrame(issues, columns=['row', 'question_id', 'severity', 'message'])
+    issues['severity'] = issues['severity'].astype('category')
+    return questions, issues
+
+
+class QuestionBank:
+    """Parsed question bank plus the validation report it was built with"""
+
+    def __init__(self, questions, issues, source_hash, path=None):
+        self.questions = questions
+        self.issues = issues
+        self.source_hash = source_hash
+        self.path = path
+
+    def __len__(self):
+        return len(self.questions)
+
+    def valid(self):
+        """Questions without errors (usable in quiz forms)"""
+        return self.questions[self.questions['valid']]
+
+    def errors(self):
+        return self.issues[self.issues['severity'] == 'error']
+
+
+def _cache_path(path, source_hash):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f'{name}.{source_hash[:16]}.arrow')
+
+
+def _read_cache(cache_path):
+    table = feather.read_table(cache_path, memory_map=True)
+    frame = table.to_pandas()
+    kind = frame.pop('_kind')
+    questions = frame[kind == 'question'].drop(columns=['severity', 'message'])
+    issues = frame.loc[kind == 'issue', ['row', 'question_id', 'severity', 'message']]
+    questions = questions.reset_index(drop=True)
+    questions['row'] = questions['row'].astype(int)
+    questions['valid'] = questions['valid'].astype(bool)
+    issues = issues.reset_index(drop=True)
+    issues['row'] = issues['row'].astype(int)
+    return questions, issues
+
+
+def _write_cache(cache_path, questions, issues):
+    """Store questions and issues as one Arrow IPC file, replaced atomically"""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    frame = pd.concat([questions.assign(_kind='question'), issues.assign(_kind='issue')],
+                      ignore_index=True)
+    frame['_kind'] = frame['_kind'].astype('category')
+    for column in ['topic', 'question_type', 'difficulty_level', 'correct_answer', 'severity']:
+        if not isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].astype('category')
+    tmp_path = cache_path + '.tmp'
+    feather.write_feather(frame, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, cache_path)
+
+
+def load_question_bank(path=None, use_cache=True):
+    """Load and validate the question bank, reusing the compiled cache
+
+    The CSV is hashed on every call; a compiled copy named after that hash
+    is read (memory-mapped) when present, otherwise the CSV is parsed,
+    validated and the compiled copy written for next time.
+    """
+    path = os.path.abspath(path or QUESTION_BANK_PATH)
+    with open(path, 'rb') as f:
+        data = f.read()
+    source_hash = hashlib.sha256(data).hexdigest()
+
+    cache_path = _cache_path(path, source_hash)
+    if use_cache and feather is not None and os.path.exists(cache_path):
+        try:
+            return QuestionBank(*_read_cache(cache_path), source_hash, path)
+        except (OSError, KeyError, ValueError, pa.ArrowException):
+            pass  # unreadable cache, rebuild it below
+
+    questions, issues = parse_question_bank(data)
+    if use_cache and feather is not None:
+        _write_cache(cache_path, questions, issues)
+    return QuestionBank(questions, issues, source_hash, path)
+
+
+def main():
+    """Command-line entry point for validating the question bank"""
+    parser = argparse.ArgumentParser(description="Validate the quiz question bank")
+    parser.add_argument('bank', nargs='?', help="question bank CSV (default: 02_Quizzes/hta_questions.csv)")
+    parser.add_argument('--no-cache', action='store_true', help="always parse the CSV")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    bank = load_question_bank(args.bank, use_cache=not args.no_cache)
+    elapsed = time.perf_counter() - start
+    print(f"📚 {len(bank)} questions ({len(bank.valid())} valid) loaded in {elapsed * 1000:.1f} ms")
+    for issue in bank.issues.itertuples():
+        icon = '❌' if issue.severity == 'error' else '⚠️ '
+        print(f"{icon} line {issue.row} ({issue.question_id}): {issue.message}")
+    return 1 if len(bank.errors()) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Quiz Form Generator
+Balanced, per-participant quiz variants drawn from topic x difficulty strata
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from question_bank import HEADER, load_question_bank
+
+# Random keys drawn per chunk of participants (participants x stratum size)
+MAX_CHUNK_CELLS = 4_000_000
+UNRATED = 'unrated'
+
+
+class StratifiedSampler:
+    """Topic x difficulty index over the valid questions of a bank
+
+    The index is built once; every form then draws the same number of
+    questions from each stratum, so all variants share one blueprint.
+    """
+
+    def __init__(self, bank):
+        self.questions = bank.valid().reset_index(drop=True)
+        difficulty = self.questions['difficulty_level'].astype(object).fillna(UNRATED)
+        strata = pd.MultiIndex.from_arrays([self.questions['topic'].astype(object), difficulty],
+                                           names=['topic', 'difficulty_level'])
+        codes, self.strata = pd.factorize(strata, sort=False)
+        # Bank positions of the questions in each stratum
+        self.members = [np.flatnonzero(codes == i) for i in range(len(self.strata))]
+        self.topics = pd.unique(self.questions['topic'].astype(object))
+
+    def sizes(self):
+        return pd.Series([len(m) for m in self.members], index=self.strata, name='questions')
+
+    def blueprint(self, length):
+        """Questions per stratum for a form of `length` items
+
+        Strata get shares proportional to their size (largest remainder),
+        so each form mirrors the topic and difficulty mix of the bank.
+        """
+        sizes = self.sizes()
+        if not 0 < length <= sizes.sum():
+            raise ValueError(f"Form length must be between 1 and {sizes.sum()}, got {length}")
+        exact = sizes / sizes.sum() * length
+        counts = np.floor(exact).astype(int)
+        remainder = (exact - counts).sort_values(ascending=False, kind='stable')
+        counts[remainder.index[:length - counts.sum()]] += 1
+        return counts.rename('count')
+
+    def _check_blueprint(self, blueprint):
+        blueprint = pd.Series(blueprint).reindex(self.strata, fill_value=0).astype(int)
+        too_many = blueprint[blueprint > self.sizes()]
+        if len(too_many):
+            raise ValueError(f"Blueprint asks for more questions than available: {too_many.to_dict()}")
+        return blueprint
+
+    def sample(self, n_forms, blueprint, seed=42):
+        """Bank positions for n_forms forms, shape (n_forms, form length)
+
+        Items are drawn without replacement within each stratum, grouped
+        into topic sections in bank order and shuffled within each section.
+        The same seed, form count and blueprint always give the same forms.
+        """
+        blueprint = self._check_blueprint(blueprint)
+        rng = np.random.default_rng(seed)
+        sections = {topic: [] for topic in self.topics}
+        for (topic, _), count, members in zip(self.strata, blueprint, self.members):
+            if count:
+                sections[topic].append(self._draw(rng, n_forms, members, count))
+
+        blocks = []
+        for parts in sections.values():
+            if parts:
+                block = np.concatenate(parts, axis=1)
+                order = np.argsort(rng.random(block.shape), axis=1)
+                blocks.append(np.take_along_axis(block, order, axis=1))
+        return np.concatenate(blocks, axis=1) if blocks else np.empty((n_forms, 0), dtype=np.int64)
+
+    @staticmethod
+    def _draw(rng, n_forms, members, count):
+        """`count` distinct members per form, via the smallest random keys"""
+        drawn = np.empty((n_forms, count), dtype=np.int64)
+        chunk = max(1, MAX_CHUNK_CELLS // len(members))
+        for start in range(0, n_forms, chunk):
+            keys = rng.random((min(chunk, n_forms - start), len(members)))
+            if count < len(members):
+                picked = np.argpartition(keys, count - 1, axis=1)[:, :count]
+            else:
+                picked = np.argsort(keys, axis=1)
+            drawn[start:start + len(keys)] = members[picked]
+        return drawn
+
+
+def generate_forms(participant_ids, length=30, seed=42, bank=None, blueprint=None):
+    """One balanced quiz variant per participant
+
+    Returns (forms, questions): forms is a long frame with form_id,
+    participant_id, position and question_id; questions is the valid bank.
+    """
+    bank = load_question_bank() if bank is None else bank
+    sampler = StratifiedSampler(bank)
+    blueprint = sampler.blueprint(length) if blueprint is None else blueprint
+    positions = sampler.sample(len(participant_ids), blueprint, seed=seed)
+
+    n_forms, form_length = positions.shape
+    form_ids = np.array([f'F{i:05d}' for i in range(1, n_forms + 1)], dtype=object)
+    forms = pd.DataFrame({
+        'form_id': np.repeat(form_ids, form_length),
+        'participant_id': np.repeat(np.asarray(participant_ids, dtype=object), form_length),
+        'position': np.tile(np.arange(1, form_length + 1), n_forms),
+        'question_id': sampler.questions['question_id'].to_numpy()[positions.ravel()],
+    })
+    return forms, sampler.questions
+
+
+def write_forms_csv(path, forms, questions):
+    """Long CSV in the question bank column layout, one row per form item"""
+    columns = ['question_id'] + HEADER
+    table = forms.merge(questions[columns], on='question_id', how='left', sort=False)
+    table.to_csv(path, index=False)
+
+
+def write_forms_json(path, forms, questions, seed):
+    """Compact JSON: question texts once, then each form as a list of ids"""
+    used = questions[questions['question_id'].isin(forms['question_id'].unique())]
+    records = used[['question_id'] + HEADER].astype(object).where(used.notna(), None)
+    # Forms are stored form after form with a fixed length, so ids reshape into rows
+    length = int(forms['position'].max()) if len(forms) else 0
+    if length:
+        form_ids = forms['form_id'].to_numpy()[::length]
+        participant_ids = forms['participant_id'].to_numpy()[::length]
+        question_ids = forms['question_id'].to_numpy().reshape(len(form_ids), length).tolist()
+    else:
+        form_ids = participant_ids = question_ids = []
+    payload = {
+        'generated': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'seed': seed,
+        'length': length,
+        'questions': {r['question_id']: r for r in records.to_dict('records')},
+        'forms': [
+            {'form_id': form_id, 'participant_id': participant_id, 'question_ids': ids}
+            for form_id, participant_id, ids in zip(form_ids, participant_ids, question_ids)
+        ],
+    }
+    with open(path, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+        json.dump(payload, f, ensure_ascii=False, default=str)
+
+
+def main():
+    """Command-line entry point for bulk form generation"""
+    parser = argparse.ArgumentParser(description="Generate per-participant quiz variants")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('-n', '--forms', type=int, help="number of forms (ids P001..)")
+    group.add_argument('--participants', help="CSV with an 'id' column, one form per row")
+    parser.add_argument('--length', type=int, default=30, help="questions per form")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    parser.add_argument('--bank', help="question bank CSV (default: 02_Quizzes/hta_questions.csv)")
+    parser.add_argument('-o', '--output', required=True, help="output .csv or .json")
+    args = parser.parse_args()
+
+    if args.participants:
+        participant_ids = pd.read_csv(args.participants, usecols=['id'], dtype=str)['id'].tolist()
+    else:
+        participant_ids = [f'P{i:03d}' for i in range(1, args.forms + 1)]
+
+    bank = load_question_bank(args.bank)
+    start = time.perf_counter()
+    forms, questions = generate_forms(participant_ids, args.length, args.seed, bank=bank)
+    if os.path.splitext(args.output)[1].lower() == '.json':
+        write_forms_json(args.output, forms, questions, args.seed)
+    else:
+        write_forms_csv(args.output, forms, questions)
+    elapsed = time.perf_counter() - start
+    print(f"📝 {len(participant_ids):,} forms x {args.length} questions written to "
+          f"{args.output} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
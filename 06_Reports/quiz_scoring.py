@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Quiz Scoring
+Scores participant x question response matrices against the question bank key
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from question_bank import ANSWER_LETTERS, DIFFICULTY_LEVELS, load_question_bank
+
+# Response cells that are not an answer letter (blank, NaN, other text) score as unanswered
+UNANSWERED = -1
+
+_LETTER_CODES = {letter: code for code, letter in enumerate(ANSWER_LETTERS)}
+
+
+def _letter_code(value):
+    """Answer code of one response value: a single letter after trimming and lowercasing"""
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    return _LETTER_CODES.get(str(value).strip().lower(), UNANSWERED)
+
+
+def read_answer_key(path=None):
+    """Question id, topic, difficulty and correct answer of every bank question
+
+    Questions whose row failed validation keep their id but have no answer,
+    so they are left out of every score.
+    """
+    questions = load_question_bank(path).questions
+    key = questions[['question_id', 'topic', 'difficulty_level', 'correct_answer']].astype(object)
+    key.loc[~questions['valid'], 'correct_answer'] = None
+    return key
+
+
+def encode_responses(responses):
+    """Answer codes (0-3, UNANSWERED) for a matrix of letter or code responses"""
+    values = responses.to_numpy() if isinstance(responses, pd.DataFrame) else np.asarray(responses)
+    if values.dtype.kind in 'iuf':
+        valid = (values >= 0) & (values < len(ANSWER_LETTERS))
+        return np.where(valid, values, UNANSWERED).astype(np.int8)
+    # Responses repeat a handful of values, so each distinct one is decoded once;
+    # factorize codes NaN/None as -1, which indexes the UNANSWERED sentinel
+    codes, uniques = pd.factorize(values.ravel())
+    lookup = np.array([_letter_code(value) for value in uniques] + [UNANSWERED], dtype=np.int8)
+    return lookup[codes].reshape(values.shape)
+
+
+class AnswerKey:
+    """Correct answers plus topic and difficulty membership of every question
+
+    Topic and difficulty memberships are kept as 0/1 matrices so a whole
+    response matrix is scored with one comparison and two matrix products.
+    """
+
+    def __init__(self, questions):
+        questions = questions.reset_index(drop=True)
+        self.question_ids = pd.Index(questions['question_id'])
+        self.answers = encode_responses(questions['correct_answer'].to_numpy()[None, :])[0]
+
+        self.topics = pd.Index(pd.unique(questions['topic']))
+        self.topic_codes = self.topics.get_indexer(questions['topic'])
+        self.difficulties = pd.Index(DIFFICULTY_LEVELS)
+        self.difficulty_codes = self.difficulties.get_indexer(questions['difficulty_level'])
+
+        self.topic_matrix = self._membership(self.topic_codes, len(self.topics))
+        self.difficulty_matrix = self._membership(self.difficulty_codes, len(self.difficulties))
+        # Questions without a valid key are left out of every score
+        self.scored = self.answers != UNANSWERED
+        self.topic_matrix[~self.scored] = 0
+        self.difficulty_matrix[~self.scored] = 0
+
+    @staticmethod
+    def _membership(codes, size):
+        matrix = np.zeros((len(codes), size), dtype=np.float32)
+        valid = codes >= 0
+        matrix[np.flatnonzero(valid), codes[valid]] = 1
+        return matrix
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def align(self, responses):
+        """Reorder a response frame's question columns to the key order
+
+        Questions missing from the frame count as unanswered; columns that
+        are not question ids are ignored.
+        """
+        codes = np.full((len(responses), len(self)), UNANSWERED, dtype=np.int8)
+        present = self.question_ids.get_indexer(responses.columns)
+        columns = np.flatnonzero(present >= 0)
+        if len(columns):
+            codes[:, present[columns]] = encode_responses(responses.iloc[:, columns])
+        return codes
+
+    def score(self, responses, index=None):
+        """Score a participants x questions response matrix in one pass
+
+        `responses` is a DataFrame with question-id columns, or an array
+        whose columns follow the key order, holding letters or answer codes.
+        Returns {'total', 'topic', 'difficulty'} frames: total holds correct,
+        answered and percentage score; topic and difficulty hold percentages.
+        """
+        if isinstance(responses, pd.DataFrame):
+            index = responses.index if index is None else index
+            codes = self.align(responses)
+        else:
+            codes = encode_responses(responses)
+            if codes.ndim != 2 or codes.shape[1] != len(self):
+                raise ValueError(f"Expected a (participants, {len(self)}) response matrix, "
+                                 f"got shape {codes.shape}")
+        index = pd.RangeIndex(len(codes)) if index is None else index
+
+        correct = (codes == self.answers) & self.scored
+        answered = ((codes != UNANSWERED) & self.scored).sum(axis=1)
+        correct_f = correct.astype(np.float32)
+        total_correct = correct.sum(axis=1)
+        n_scored = int(self.scored.sum())
+
+        def percentages(matrix, labels):
+            items = matrix.sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = (correct_f @ matrix) / np.where(items > 0, items, np.nan) * 100
+            return pd.DataFrame(values, index=index, columns=labels)
+
+        total = pd.DataFrame({
+            'correct': total_correct,
+            'answered': answered,
+            'score': total_correct / n_scored * 100 if n_scored else np.nan,
+        }, index=index)
+        return {
+            'total': total,
+            'topic': percentages(self.topic_matrix, self.topics),
+            'difficulty': percentages(self.difficulty_matrix, self.difficulties),
+        }
+
+
+def load_answer_key(path=None):
+    """Answer key for the question bank at path (the workshop bank by default)"""
+    return AnswerKey(read_answer_key(path))
+
+
+def main():
+    """Command-line entry point for scoring exported quiz responses"""
+    parser = argparse.ArgumentParser(description="Score quiz responses against the question bank")
+    parser.add_argument('responses', help="CSV with one row per participant and Q001.. answer columns")
+    parser.add_argument('--bank', help="question bank CSV (default: 02_Quizzes/hta_questions.csv)")
+    parser.add_argument('--id-column', default='id', help="participant id column")
+    parser.add_argument('-o', '--output', help="write total, topic and difficulty scores to this CSV")
+    args = parser.parse_args()
+
+    key = load_answer_key(args.bank)
+    responses = pd.read_csv(args.responses, dtype=str, keep_default_na=False)
+    if args.id_column in responses:
+        responses = responses.set_index(args.id_column)
+
+    start = time.perf_counter()
+    scores = key.score(responses)
+    elapsed = time.perf_counter() - start
+    print(f"🧠 Scored {len(responses):,} responses x {len(key)} questions in {elapsed:.3f}s "
+          f"(mean score {scores['total']['score'].mean():.1f}%)")
+
+    if args.output:
+        combined = pd.concat([scores['total'],
+                              scores['topic'].add_prefix('topic: '),
+                              scores['difficulty'].add_prefix('difficulty: ')], axis=1)
+        combined.round(2).to_csv(args.output)
+        print(f"Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Registration Ingestion
+Incrementally loads exported registration form responses into a Parquet store
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - fcntl is POSIX-only, elsewhere ingestion is not serialised
+    fcntl = None
+
+# Response sheet headers (see 05_Admin_Forms/registration_form.gs) -> participant fields
+FORM_COLUMNS = {
+    'Timestamp': 'registration_date',
+    'Email Address': 'email',
+    'Full Name (as per ID)': 'name',
+    'Current Designation/Position': 'designation',
+    'Institution/Organization': 'institution',
+    'Department/Specialty': 'specialty',
+    'Mobile Number': 'mobile',
+    'Highest Qualification': 'qualification',
+    'Professional Experience (in years)': 'experience_years',
+    'Prior knowledge of Health Technology Assessment': 'hta_knowledge',
+    'Registration Category': 'category',
+    'Transaction Reference Number': 'transaction_reference',
+    'Amount Paid (₹)': 'amount_paid',
+    'Do you need accommodation?': 'accommodation_required',
+}
+
+# Participant fields stored as categoricals once loaded
+CATEGORICAL_COLUMNS = [
+    'designation', 'institution', 'specialty', 'qualification', 'hta_knowledge',
+    'category', 'payment_status', 'attendance_day1', 'attendance_day2',
+    'accommodation_required',
+]
+
+# Per-user home for registration-side state kept outside the package tree
+# (pass signing key without a store, email delivery journal)
+STATE_DIR = os.environ.get('HTA_STATE_DIR', os.path.join(os.path.expanduser('~'), '.hta_workshop'))
+STATE_FILE = 'state.json'
+# Held while ingesting so concurrent ingesters never append the same rows twice
+LOCK_FILE = '.ingest.lock'
+# Bytes before the read offset that must match for a tail-only re-read
+TAIL_FINGERPRINT_BYTES = 256
+BATCH_SUFFIXES = ('.csv', '.jsonl', '.json')
+
+
+def _fingerprint(path, offset):
+    """Hash of the bytes just before offset, used to detect rewritten exports"""
+    start = max(0, offset - TAIL_FINGERPRINT_BYTES)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+def _empty_mark():
+    return {'timestamp': None, 'row_id': None, 'boundary_emails': []}
+
+
+def _read_batch(path, offset=0, header=b''):
+    """Read an exported CSV/JSONL batch, optionally only the bytes after offset
+
+    Returns (raw frame, end offset, CSV header line). A .json export is
+    one array, so it is always read whole.
+    """
+    if path.endswith('.json'):
+        offset = 0
+    with open(path, 'rb') as f:
+        if offset == 0 and path.endswith('.csv'):
+            header = f.readline()
+            offset = f.tell()
+        f.seek(offset)
+        data = f.read()
+
+    end = offset + len(data)
+    if not data.strip():
+        return pd.DataFrame(), end, header
+
+    if path.endswith('.csv'):
+        raw = pd.read_csv(io.BytesIO(header + data), dtype=str, keep_default_na=False)
+    else:
+        raw = pd.read_json(io.BytesIO(data), lines=path.endswith('.jsonl'), dtype=False)
+    return raw, end, header
+
+
+def normalize_responses(raw, first_id=1):
+    """Map raw form responses onto the dashboard participant schema"""
+    df = raw.rename(columns=FORM_COLUMNS)
+    n = len(df)
+
+    def get(col):
+        if col not in df:
+            return pd.Series([''] * n, index=df.index)
+        return df[col].astype(str).str.strip()
+
+    reference = get('transaction_reference')
+    amount = pd.to_numeric(get('amount_paid').str.replace(',', ''), errors='coerce')
+    accommodation = get('accommodation_required')
+
+    out = pd.DataFrame({
+        'id': [f'P{i:03d}' for i in range(first_id, first_id + n)],
+        'name': get('name'),
+        'email': get('email'),
+        'mobile': get('mobile'),
+        'designation': get('designation'),
+        'institution': get('institution'),
+        'specialty': get('specialty'),
+        'qualification': get('qualification'),
+        'experience_years': pd.to_numeric(get('experience_years'), errors='coerce'),
+        'hta_knowledge': get('hta_knowledge'),
+        'category': get('category'),
+        'payment_status': np.where((reference != '') & (amount > 0), 'Paid', 'Pending'),
+        'registration_date': pd.to_datetime(df['registration_date'], errors='coerce')
+        if 'registration_date' in df else pd.Series(pd.NaT, index=df.index),
+        'attendance_day1': 'Unknown',
+        'attendance_day2': 'Unknown',
+        'quiz_score': np.nan,
+        'feedback_rating': np.nan,
+        'accommodation_required': np.where(accommodation.str.startswith('Yes'), 'Yes', 'No'),
+        'transaction_reference': reference,
+        'amount_paid': amount,
+    })
+    if 'row_id' in df:
+        out['row_id'] = pd.to_numeric(df['row_id'], errors='coerce')
+    return out.reset_index(drop=True)
+
+
+class RegistrationStore:
+    """Append-only Parquet store of registrations with per-export high-water marks
+
+    The state file records the Parquet parts written so far and, for every
+    export file seen, how far it has been read and its high-water mark
+    (latest response timestamp, or sheet row id when the export carries
+    one). The store-wide mark is the latest across all exports.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._state_stat = None
+        self.state = self._load_state()
+        # Batches ingest_directory could not read, by path: size, mtime_ns, error
+        self.failed = {}
+
+    def _load_state(self):
+        state_path = os.path.join(self.path, STATE_FILE)
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                stat = os.fstat(f.fileno())
+                self._state_stat = (stat.st_mtime_ns, stat.st_size)
+                return json.load(f)
+        except FileNotFoundError:
+            return {
+                'rows': 0, 'parts': [], 'updated': None,
+                'high_water_mark': _empty_mark(),
+                'sources': {},
+            }
+
+    def _save_state(self):
+        state_path = os.path.join(self.path, STATE_FILE)
+        with open(state_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(state_path + '.tmp', state_path)
+        stat = os.stat(state_path)
+        self._state_stat = (stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def _locked(self):
+        """Hold the store's ingest lock, with the state reloaded from disk"""
+        with open(os.path.join(self.path, LOCK_FILE), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                self.state = self._load_state()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Reload the state if another process has ingested since; returns whether it did"""
+        try:
+            stat = os.stat(os.path.join(self.path, STATE_FILE))
+        except FileNotFoundError:
+            return False
+        if (stat.st_mtime_ns, stat.st_size) == self._state_stat:
+            return False
+        self.state = self._load_state()
+        return True
+
+    def pending(self, directory):
+        """Export batches in a directory that are new or changed since they were ingested
+
+        Only stats the files, so it is cheap enough to call on every page view.
+        Batches that failed to ingest count again only once they change.
+        """
+        changed = []
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(BATCH_SUFFIXES):
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                key = os.path.abspath(path)
+                source = self.state['sources'].get(key) or self.failed.get(key)
+                if not source or source['size'] != stat.st_size or source['mtime_ns'] != stat.st_mtime_ns:
+                    changed.append(path)
+        return changed
+
+    def version(self):
+        """Token that changes whenever new rows are appended"""
+        return (self.state['rows'], len(self.state['parts']), self.state['updated'])
+
+    def _new_rows(self, batch, mark):
+        """Rows of a normalized batch that lie beyond a source's high-water mark"""
+        if 'row_id' in batch and batch['row_id'].notna().all():
+            if mark['row_id'] is None:
+                return batch
+            return batch[batch['row_id'] > mark['row_id']]
+
+        batch = batch[batch['registration_date'].notna()]
+        if mark['timestamp'] is None:
+            return batch
+        hwm = pd.Timestamp(mark['timestamp'])
+        at_mark = batch['registration_date'] == hwm
+        seen = batch['email'].isin(mark['boundary_emails'])
+        return batch[(batch['registration_date'] > hwm) | (at_mark & ~seen)]
+
+    def _advance_mark(self, rows, mark):
+        if 'row_id' in rows and rows['row_id'].notna().any():
+            mark['row_id'] = float(rows['row_id'].max())
+        latest = rows['registration_date'].max()
+        if pd.notna(latest):
+            previous = pd.Timestamp(mark['timestamp']) if mark['timestamp'] else None
+            at_latest = rows.loc[rows['registration_date'] == latest, 'email'].tolist()
+            if previous is not None and latest == previous:
+                mark['boundary_emails'] = sorted(set(mark['boundary_emails']) | set(at_latest))
+            elif previous is None or latest > previous:
+                mark['timestamp'] = latest.isoformat()
+                mark['boundary_emails'] = sorted(set(at_latest))
+
+    def ingest(self, path):
+        """Append the new rows of one exported batch; returns the number added"""
+        with self._locked():
+            return self._ingest(path)
+
+    def _ingest(self, path):
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        source = self.state['sources'].get(key)
+        if source and source['size'] == stat.st_size and source['mtime_ns'] == stat.st_mtime_ns:
+            return 0
+
+        # Appended-to exports are read from the previous offset; rewritten ones in full
+        offset, header = 0, b''
+        if (source and stat.st_size >= source['offset']
+                and _fingerprint(path, source['offset']) == source['fingerprint']):
+            offset, header = source['offset'], source['header'].encode('utf-8')
+        raw, end, header = _read_batch(path, offset, header)
+
+        # Each export keeps its own mark: row ids and timestamps from one sheet
+        # say nothing about another (an older batch, another edition's form)
+        if source is None:
+            mark = _empty_mark()
+        else:
+            # Sources recorded before marks were kept per file use the store-wide one
+            mark = source.get('high_water_mark', dict(self.state['high_water_mark']))
+        added = 0
+        if len(raw):
+            first_id = self.state['rows'] + 1
+            rows = self._new_rows(normalize_responses(raw), mark)
+            if len(rows):
+                rows = rows.assign(id=[f'P{i:03d}' for i in range(first_id, first_id + len(rows))])
+                part = f"part-{len(self.state['parts']) + 1:05d}.parquet"
+                rows.to_parquet(os.path.join(self.path, part), index=False)
+                self._advance_mark(rows, mark)
+                self._advance_mark(rows, self.state['high_water_mark'])
+                self.state['parts'].append(part)
+                self.state['rows'] += len(rows)
+                self.state['updated'] = datetime.now().isoformat()
+                added = len(rows)
+
+        self.state['sources'][key] = {
+            'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'offset': end,
+            'fingerprint': _fingerprint(path, end), 'header': header.decode('utf-8'),
+            'high_water_mark': mark,
+        }
+        self._save_state()
+        return added
+
+    def ingest_directory(self, directory):
+        """Ingest every export batch in a directory in name order
+
+        A batch that cannot be read is skipped and recorded in self.failed,
+        so one bad file does not hold up the others.
+        """
+        added = 0
+        with self._locked():
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(BATCH_SUFFIXES):
+                    path = os.path.join(directory, name)
+                    key = os.path.abspath(path)
+                    try:
+                        added += self._ingest(path)
+                    except (OSError, ValueError, KeyError) as e:
+                        # Earlier batches are already saved; drop this one's partial state
+                        self.state = self._load_state()
+                        try:
+                            stat = os.stat(path)
+                        except FileNotFoundError:
+                            continue  # removed while we were reading it
+                        self.failed[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                            'error': f'{type(e).__name__}: {e}'}
+                    else:
+                        self.failed.pop(key, None)
+        return added
+
+    def read(self):
+        """Load all stored registrations as one participant frame"""
+        if not self.state['parts']:
+            return normalize_responses(pd.DataFrame({'Timestamp': []}))
+        df = pd.concat([pd.read_parquet(os.path.join(self.path, part))
+                        for part in self.state['parts']], ignore_index=True)
+        for column in CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype('category')
+        return df
+
+
+def main():
+    """Command-line entry point for ingesting exported registration batches"""
+    parser = argparse.ArgumentParser(description="Ingest registration form exports into a Parquet store")
+    parser.add_argument('store', help="registration store directory")
+    parser.add_argument('batches', nargs='+', help="exported CSV/JSONL files or directories")
+    args = parser.parse_args()
+
+    store = RegistrationStore(args.store)
+    for batch in args.batches:
+        if os.path.isdir(batch):
+            added = store.ingest_directory(batch)
+        else:
+            added = store.ingest(batch)
+        print(f"📥 {batch}: {added} new registrations")
+    for path, failure in store.failed.items():
+        print(f"⚠️ Skipped {path}: {failure['error']}")
+    print(f"✅ Store holds {store.state['rows']} registrations "
+          f"(high-water mark: {store.state['high_water_mark']['timestamp']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Quiz Remediation
+Question-to-lecture links and per-participant reading lists built in one batch
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from lecture_index import CACHE_DIR, LectureIndex, tokenize
+from package_builder import ZIP_DEFLATED, PackageWriter
+from question_bank import load_question_bank
+from quiz_scoring import UNANSWERED, AnswerKey, read_answer_key
+from report_engine import TEMPLATES_DIR, CompiledTemplate
+from sample_data import generate_quiz_responses
+
+# Lecture sections linked to every question
+SECTIONS_PER_QUESTION = 3
+# Sections recommended to every participant
+SECTIONS_PER_PARTICIPANT = 3
+LINK_COLUMNS = ['question_id', 'rank', 'section', 'file', 'title', 'path', 'line', 'score', 'weight']
+TEMPLATE_FILE = 'remediation.md.tmpl'
+
+
+def match_topics(topics, index):
+    """Lecture file that best matches each quiz topic by shared words
+
+    Both the lecture's first heading and its file name count, so
+    "Foundations of HTA" finds 01_Foundations_of_HTA.md. Topics with no
+    shared words map to None.
+    """
+    lectures = {}
+    for section in index.sections:
+        if section['level'] == 1 and section['file'] not in lectures:
+            stem = os.path.splitext(os.path.basename(section['file']))[0].replace('_', ' ')
+            lectures[section['file']] = set(tokenize(section['title'] + ' ' + stem))
+    matches = {}
+    for topic in topics:
+        words = set(tokenize(topic))
+        overlap = {name: len(words & terms) / max(len(words), 1) for name, terms in lectures.items()}
+        best = max(overlap, key=overlap.get, default=None)
+        matches[topic] = best if best is not None and overlap[best] > 0 else None
+    return matches
+
+
+def build_links(questions, index, per_question=SECTIONS_PER_QUESTION):
+    """Lecture sections each question covers, best first
+
+    Every question is searched with its text, correct option and
+    explanation, within the lecture that matches its topic (all lectures
+    when none does). weight is the section's share of the question's
+    link scores, so every linked question sums to one.
+    """
+    files = match_topics(pd.unique(questions['topic'].dropna()), index)
+    section_files = np.array([s['file'] for s in index.sections], dtype=object)
+    rows = []
+    for question in questions.itertuples(index=False):
+        answer = getattr(question, f'option_{question.correct_answer}', '') \
+            if isinstance(question.correct_answer, str) else ''
+        text = ' '.join(str(part) for part in (question.question, answer, question.explanation)
+                        if isinstance(part, str))
+        scores = index.scores(text)
+        lecture = files.get(question.topic)
+        if lecture is not None:
+            scores[section_files != lecture] = 0
+        found = np.flatnonzero(scores)
+        found = found[np.argsort(-scores[found], kind='stable')][:per_question]
+        for rank, i in enumerate(found, 1):
+            section = index.sections[i]
+            rows.append((question.question_id, rank, int(i), section['file'], section['title'],
+                         section['path'], section['line'], scores[i], scores[i] / scores[found].sum()))
+    return pd.DataFrame(rows, columns=LINK_COLUMNS)
+
+
+def load_links(bank=None, index=None, per_question=SECTIONS_PER_QUESTION, use_cache=True):
+    """Question links for a bank and lecture index, cached per content version
+
+    The links are rebuilt only when the question bank, a lecture file or
+    the number of links per question changes.
+    """
+    bank = load_question_bank() if bank is None else bank
+    if index is None:
+        index = LectureIndex()
+        index.refresh()
+    version = json.dumps([bank.source_hash, index.version(), per_question])
+    cache_path = os.path.join(CACHE_DIR, f"remediation_links.{hashlib.sha1(version.encode()).hexdigest()[:16]}.csv")
+    if use_cache and os.path.exists(cache_path):
+        return pd.read_csv(cache_path, dtype={'question_id': str})
+    links = build_links(bank.questions, index, per_question)
+    if use_cache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        links.to_csv(cache_path + '.tmp', index=False)
+        os.replace(cache_path + '.tmp', cache_path)
+    return links
+
+
+def remediation_plan(key, codes, links, participant_ids=None, per_participant=SECTIONS_PER_PARTICIPANT):
+    """Recommended sections for every participant from one response matrix
+
+    Missed questions (wrong or unanswered) are multiplied by the question x
+    section link weights, so a section's need score is how much of the
+    participant's missed material it covers; the top sections per
+    participant come from one argpartition. Returns a long frame with
+    participant, rank, the section and the ids of the missed questions it
+    covers.
+    """
+    codes = np.asarray(codes)
+    participant_ids = np.arange(len(codes)) if participant_ids is None else np.asarray(participant_ids)
+    sections, section_codes = np.unique(links['section'].to_numpy(), return_inverse=True)
+    question_codes = key.question_ids.get_indexer(links['question_id'])
+    linked = question_codes >= 0
+    weights = np.zeros((len(key), len(sections)), dtype=np.float32)
+    weights[question_codes[linked], section_codes[linked]] = links['weight'].to_numpy()[linked]
+
+    missed = (codes != key.answers) & key.scored
+    need = missed.astype(np.float32) @ weights
+    k = min(per_participant, len(sections))
+    if not k:
+        return pd.DataFrame(columns=['participant', 'rank', 'need'] + LINK_COLUMNS[2:7] + ['questions'])
+    top = np.argpartition(-need, k - 1, axis=1)[:, :k] if k < len(sections) else np.tile(np.arange(k), (len(need), 1))
+    top = np.take_along_axis(top, np.argsort(-np.take_along_axis(need, top, axis=1), axis=1, kind='stable'), axis=1)
+    top_need = np.take_along_axis(need, top, axis=1)
+
+    rows, ranks = np.nonzero(top_need > 0)
+    chosen = top[rows, ranks]
+    # Missed questions behind each recommendation; the id lists are joined
+    # once per distinct question set rather than once per row
+    covers = missed[rows] & (weights[:, chosen].T > 0)
+    packed = np.ascontiguousarray(np.packbits(covers, axis=1))
+    patterns, pattern_codes = np.unique(packed.view(np.dtype((np.void, packed.shape[1]))).ravel(),
+                                        return_inverse=True)
+    ids = key.question_ids.to_numpy()
+    labels = np.array([', '.join(ids[np.unpackbits(np.frombuffer(p, np.uint8), count=len(ids)).astype(bool)])
+                       for p in patterns], dtype=object)
+    questions = labels[pattern_codes]
+
+    info = links.drop_duplicates('section').set_index('section').loc[sections[chosen]]
+    return pd.DataFrame({
+        'participant': participant_ids[rows],
+        'rank': ranks + 1,
+        'need': top_need[rows, ranks],
+        'section': sections[chosen],
+        'file': info['file'].to_numpy(),
+        'title': info['title'].to_numpy(),
+        'path': info['path'].to_numpy(),
+        'line': info['line'].to_numpy(),
+        'questions': questions,
+    })
+
+
+def remediation_reports(plan, scores, n_scored, template=None):
+    """Markdown feedback per participant, from a plan and AnswerKey.score output
+
+    The template is compiled once and the per-participant lists are
+    assembled with grouped string operations before rendering.
+    """
+    if template is None:
+        with open(os.path.join(TEMPLATES_DIR, TEMPLATE_FILE), 'r', encoding='utf-8') as f:
+            template = CompiledTemplate(f.read(), TEMPLATE_FILE)
+    total, topic = scores['total'], scores['topic']
+
+    topic_lines = pd.Series('', index=topic.index)
+    for name in topic.columns:
+        values = topic[name].map(lambda v: '–' if pd.isna(v) else f'{v:.0f}%')
+        topic_lines += f'- {name}: ' + values + '\n'
+    # A cohort that missed nothing has an empty plan, whose columns cannot be concatenated
+    recommendations = pd.Series(dtype=object)
+    if len(plan):
+        items = (plan['rank'].astype(str) + '. **' + plan['title'] + '** (' + plan['file'] + ', line '
+                 + plan['line'].astype(str) + ')\n   ' + plan['path'] + '\n   Covers missed questions: '
+                 + plan['questions'])
+        recommendations = items.groupby(plan['participant'].to_numpy()).agg('\n'.join)
+
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M')
+    return pd.Series([template.render({
+        'participant': participant,
+        'correct': int(total.at[participant, 'correct']),
+        'scored': n_scored,
+        'score': total.at[participant, 'score'],
+        'topic_scores': topic_lines[participant].rstrip('\n'),
+        'recommendations': recommendations.get(participant, 'No missed questions. Well done!'),
+        'generated': generated,
+    }) for participant in total.index], index=total.index, name='report')
+
+
+def write_reports_zip(fileobj, reports):
+    """One markdown file per participant in a deflated zip"""
+    writer = PackageWriter(fileobj)
+    mtime = time.time()
+    for participant, text in reports.items():
+        data = text.encode('utf-8')
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+        packed = compressor.compress(data) + compressor.flush()
+        writer.add_entry(f'{participant}.md', ZIP_DEFLATED, zlib.crc32(data), len(packed), len(data),
+                         mtime, 0o644, [packed])
+    writer.close()
+
+
+def main():
+    """Command-line entry point for remediation plans and reports"""
+    parser = argparse.ArgumentParser(description="Per-participant lecture reading lists from quiz responses")
+    parser.add_argument('responses', nargs='?',
+                        help="CSV with one row per participant and Q001.. answer columns "
+                             "(default: simulated responses)")
+    parser.add_argument('-n', '--sample', type=int, default=45, help="simulated participants without a CSV")
+    parser.add_argument('--bank', help="question bank CSV (default: 02_Quizzes/hta_questions.csv)")
+    parser.add_argument('--id-column', default='id', help="participant id column")
+    parser.add_argument('-o', '--output', help="write the long remediation plan to this CSV")
+    parser.add_argument('--reports', help="write one markdown report per participant into this zip")
+    args = parser.parse_args()
+
+    bank = load_question_bank(args.bank)
+    key = AnswerKey(read_answer_key(args.bank))
+    if args.responses:
+        responses = pd.read_csv(args.responses, dtype=str, keep_default_na=False)
+        if args.id_column in responses:
+            responses = responses.set_index(args.id_column)
+        codes, ids = key.align(responses), responses.index.to_numpy()
+    else:
+        codes = generate_quiz_responses(key.answers, n=args.sample)
+        codes[:, ~key.scored] = UNANSWERED
+        ids = np.array([f'P{i:03d}' for i in range(1, args.sample + 1)], dtype=object)
+
+    start = time.perf_counter()
+    links = load_links(bank)
+    linked = time.perf_counter()
+    plan = remediation_plan(key, codes, links, ids)
+    planned = time.perf_counter()
+    print(f"🔗 {links['question_id'].nunique()} questions linked to {links['section'].nunique()} sections "
+          f"in {linked - start:.2f}s")
+    print(f"📚 Reading lists for {len(ids):,} participants in {planned - linked:.2f}s")
+    print(plan.groupby('title').size().sort_values(ascending=False).head(5).to_string())
+
+    if args.output:
+        plan.to_csv(args.output, index=False)
+        print(f"Written to {args.output}")
+    if args.reports:
+        reports = remediation_reports(plan, key.score(codes, index=pd.Index(ids)), int(key.scored.sum()))
+        with open(args.reports, 'wb') as f:
+            write_reports_zip(f, reports)
+        print(f"{len(reports):,} reports written to {args.reports} in {time.perf_counter() - planned:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
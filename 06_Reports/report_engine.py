@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Report Engine
+Compiled report templates rendered in batches across workshop editions
+"""
+
+import argparse
+import os
+import string
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+
+from workshop_registry import load_registry
+
+REPORTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(REPORTS_DIR, 'templates')
+
+# Template file and per-workshop output file name (formatted with the record)
+TEMPLATES = {
+    'final_package_report': ('final_package_report.md.tmpl', '{id}_FINAL_PACKAGE_REPORT.md'),
+    'workflow_log': ('workflow_log.txt.tmpl', '{id}_workflow_log.txt'),
+}
+WRITE_BUFFER = 1024 * 1024
+
+
+class CompiledTemplate:
+    """Template parsed once into literal text and {field[:spec]} slots"""
+
+    def __init__(self, text, name='<string>'):
+        self.name = name
+        self.parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            if field is not None and (conversion or not field.isidentifier()):
+                raise ValueError(f"{name}: unsupported placeholder {{{field}}}")
+            self.parts.append((literal, field, spec or ''))
+        self.fields = sorted({field for _, field, _ in self.parts if field})
+
+    def render(self, context):
+        """Fill the template from a mapping of field values"""
+        missing = [field for field in self.fields if field not in context]
+        if missing:
+            raise KeyError(f"{self.name}: missing fields {missing}")
+        out = []
+        for literal, field, spec in self.parts:
+            out.append(literal)
+            if field:
+                out.append(format(context[field], spec))
+        return ''.join(out)
+
+
+@lru_cache(maxsize=None)
+def load_template(name):
+    """Compiled template by name, read and parsed once per process"""
+    with open(os.path.join(TEMPLATES_DIR, TEMPLATES[name][0]), 'r', encoding='utf-8') as f:
+        return CompiledTemplate(f.read(), name)
+
+
+def _timestamp():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def render_report(name, metadata=None, generated=None):
+    """Render one report for one workshop record"""
+    context = dict(metadata or {})
+    context['generated'] = generated or _timestamp()
+    return load_template(name).render(context)
+
+
+def _render_chunk(name, records, output_dir, generated):
+    """Render and write a chunk of reports; runs inside a worker process"""
+    template = load_template(name)
+    timings = []
+    for record in records:
+        start = time.perf_counter()
+        text = template.render(dict(record, generated=generated))
+        render_seconds = time.perf_counter() - start
+        path = os.path.join(output_dir, TEMPLATES[name][1].format(**record))
+        with open(path, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as f:
+            f.write(text)
+        timings.append({'workshop_id': record['id'], 'path': path,
+                        'render_seconds': render_seconds, 'bytes': len(text.encode('utf-8'))})
+    return timings
+
+
+def render_batch(name, records, output_dir, workers=None, chunk_size=50):
+    """Render one report per workshop record in parallel across processes
+
+    Records are split into chunks so each worker compiles the template once
+    and writes its outputs itself. Returns per-report timings in input order.
+    """
+    records = [dict(record) for record in records]
+    os.makedirs(output_dir, exist_ok=True)
+    generated = _timestamp()
+    chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks) or 1)
+
+    if workers == 1:
+        results = [_render_chunk(name, chunk, output_dir, generated) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_chunk, [name] * len(chunks), chunks,
+                                    [output_dir] * len(chunks), [generated] * len(chunks)))
+    return [timing for chunk in results for timing in chunk]
+
+
+def main():
+    """Command-line entry point for rendering reports for every edition"""
+    parser = argparse.ArgumentParser(description="Render workshop reports for all registry editions")
+    parser.add_argument('output_dir', help="directory for the rendered reports")
+    parser.add_argument('--template', default='final_package_report', choices=sorted(TEMPLATES))
+    parser.add_argument('--registry', help="registry file or directory (default: workshop_metadata.json)")
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    registry = load_registry(args.registry)
+    start = time.perf_counter()
+    timings = render_batch(args.template, list(registry), args.output_dir, workers=args.workers)
+    elapsed = time.perf_counter() - start
+
+    render_ms = sorted(t['render_seconds'] * 1000 for t in timings)
+    print(f"📝 Rendered {len(timings)} reports in {elapsed:.2f}s")
+    if render_ms:
+        print(f"   Render time per report: median {render_ms[len(render_ms) // 2]:.3f} ms, "
+              f"max {render_ms[-1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
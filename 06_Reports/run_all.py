@@ -4,166 +4,22 @@ HTA Workshop Complete Package Generator
 Creates final deliverable package with all workshop materials
 """
 
+import json
 import os
 import zipfile
-import json
 from datetime import datetime
-import shutil
 
-def generate_final_report():
+from package_builder import build_package, collect_package_files, verify_package
+from report_engine import render_report
+from workshop_registry import load_workshop_metadata
+
+def generate_final_report(workshop_id=None):
     """Generate a comprehensive final report"""
     try:
-        # Load workshop metadata
-        with open('06_Reports/workshop_metadata.json', 'r') as f:
-            metadata = json.load(f)
-
-        report = f"""
-# HTA Workshop 2025 - Final Package Report
-
-Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-## Workshop Overview
-- **Title**: {metadata['title']}
-- **Date**: {metadata['date']}
-- **Venue**: {metadata['venue']}
-- **Organizer**: {metadata['organizer']}
-- **Target Audience**: {metadata['target_audience']}
-
-## Package Contents
-
-### Educational Materials
-- 6 Comprehensive Lecture Modules
-  1. Foundations of HTA
-  2. Economic Evaluation Frameworks
-  3. Measuring Resource Use
-  4. Valuing Health Outcomes
-  5. Interpreting Economic Evidence
-  6. Translating HTA into Policy
-
-- 6 Professional PowerPoint Presentations
-- 4 Educational Infographics (PNG)
-- 60-Question Assessment Quiz System
-
-### Administrative Tools
-- Automated Registration Form (Google Apps Script)
-- Analytics Dashboard (Streamlit App)
-- Workshop Metadata Database
-- QR Code Check-in System
-
-### Technical Specifications
-- Content Format: Markdown + PDF-compatible
-- Presentations: PowerPoint 2016+ compatible
-- Automation: Python 3.8+, Google Apps Script
-- Dashboard: Streamlit 1.0+ compatible
-
-## Quality Assurance Checklist
-
-### Content Quality
-✅ Medical accuracy verified
-✅ Academic rigor maintained
-✅ Indian healthcare context included
-✅ Cultural sensitivity addressed
-
-### Technical Quality
-✅ File integrity verified
-✅ Cross-platform compatibility
-✅ Automated error checking
-✅ Responsive design elements
-
-### Educational Standards
-✅ Learning objectives defined
-✅ Discussion questions included
-✅ Practical exercises integrated
-✅ Reference citations provided
-
-## Usage Instructions
-
-### For Workshop Organizers
-1. **Setup Phase**:
-   - Deploy registration form in Google Forms
-   - Configure payment gateway integration
-   - Set up accommodation arrangements
-
-2. **Pre-Workshop**:
-   - Distribute lecture presentations
-   - Share quiz system with participants
-   - Conduct pre-assessment
-
-3. **During Workshop**:
-   - Use infographics for key concept visualization
-   - Deploy quiz for assessment
-   - Monitor attendance through dashboard
-
-4. **Post-Workshop**:
-   - Generate certificates
-   - Collect feedback via dashboard
-   - Export comprehensive analytics
-
-### Required Software
-- **Presentations**: PowerPoint Viewer or Google Slides
-- **Dashboard**: Python 3.8+ with Streamlit
-- **Registration**: Google Forms/Sheets account
-- **PDF Viewer**: Any modern PDF reader
-
-## Technical Requirements
-
-### System Requirements
-- **Operating System**: Windows 10+, macOS 10.15+, Ubuntu 18.04+
-- **Memory**: 4GB RAM minimum
-- **Storage**: 500MB free space
-- **Internet**: Required for Google services
-
-### Browser Compatibility
-- Chrome 90+
-- Firefox 88+
-- Safari 14+
-- Edge 90+
-
-## Security & Privacy
-
-### Data Protection
-- Compliant with GDPR requirements
-- Secure data transmission protocols
-- Encrypted participant information
-- Anonymous feedback collection
-
-### Access Control
-- Role-based permissions
-- Secure file storage
-- Audit trail logging
-- Automatic data cleanup
-
-## Support & Maintenance
-
-### Technical Support
-- Documentation included
-- Video tutorials available
-- Email support: coordinator@pgimer.edu.in
-- Help desk: +91-9876543210
-
-### Updates & Versioning
-- Version 1.0 (Initial Release)
-- Modularity for easy updates
-- Template system for customization
-- Backward compatibility maintained
-
-## About the System
-
-### Development
-- **Created by**: Cline AI Assistant
-- **Methodology**: Didactic content creation
-- **Standards**: WHO HTA guidelines
-- **Validation**: Medical education protocols
-
-### Partners
-- Postgraduate Institute of Medical Education and Research (PGIMER)
-- National Academy of Medical Sciences (NAMSCON)
-- Ministry of Health and Family Welfare Guidelines
-
----
+        # Load workshop metadata from the shared registry
+        metadata = load_workshop_metadata(workshop_id)
 
-*This package represents a comprehensive, automated educational resource system for Health Technology Assessment training.*
-"""
+        report = render_report('final_package_report', metadata)
         return report
 
     except Exception as e:
@@ -184,22 +40,20 @@ def create_package_zip():
         with open(f"{base_dir}/06_Reports/FINAL_PACKAGE_REPORT.md", 'w', encoding='utf-8') as f:
             f.write(final_report)
 
-        # Create zip file
-        with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Add all workshop files
-            for root, dirs, files in os.walk(base_dir):
-                for file in files:
-                    filepath = os.path.join(root, file)
-                    # Skip certain files/directories
-                    if not any(skip in filepath for skip in ['__pycache__', '.DS_Store', 'node_modules']):
-                        # Create relative path for zip
-                        arcname = os.path.relpath(filepath, ".")
-                        zipf.write(filepath, arcname)
+        # Create zip file (media stored as-is, text deflated in parallel,
+        # unchanged files copied from the previous build via its manifest)
+        entries = collect_package_files(base_dir)
+        records = build_package(zip_filename, entries)
 
         # Verify zip file
         if os.path.exists(zip_filename):
             zip_size = os.path.getsize(zip_filename) / (1024 * 1024)  # Size in MB
-            print(".2f"        else:
+            reused = sum(1 for record in records if record['reused'])
+            stored = sum(1 for record in records
+                         if record['method'] == zipfile.ZIP_STORED and not record['reused'])
+            print(f"📦 Package created: {zip_filename} ({zip_size:.2f} MB, {len(records)} files, "
+                  f"{reused} unchanged, {stored} stored without recompression)")
+        else:
             raise Exception("Zip file creation failed")
 
         return zip_filename
@@ -209,34 +63,36 @@ def create_package_zip():
         return None
 
 def verify_package_integrity(zip_filename):
-    """Verify all critical components are in the package"""
+    """Verify all critical components and entry checksums of the package"""
     try:
-        with zipfile.ZipFile(zip_filename, 'r') as zipf:
-            file_list = zipf.namelist()
-
-            # Check for critical components
-            required_files = [
-                'HTA_Workshop_2025/README.md',
-                'HTA_Workshop_2025/06_Reports/workshop_metadata.json',
-                'HTA_Workshop_2025/01_Lectures/01_Foundations_of_HTA.md',
-                'HTA_Workshop_2025/03_Presentations/01_Foundations_of_HTA_presentation.pptx',
-                'HTA_Workshop_2025/04_Infographics/hta_concept_flow.png',
-                'HTA_Workshop_2025/02_Quizzes/hta_questions.csv',
-                'HTA_Workshop_2025/05_Admin_Forms/registration_form.gs',
-                'HTA_Workshop_2025/06_Reports/hta_dashboard.py'
-            ]
-
-            missing_files = []
-            for required in required_files:
-                if not any(required in file for file in file_list):
-                    missing_files.append(required)
-
-            if missing_files:
-                print(f"⚠️  Warning: Missing files: {missing_files}")
-                return False
-            else:
-                print("✅ Package integrity verified")
-                return True
+        # Check for critical components
+        required_files = [
+            'HTA_Workshop_2025/README.md',
+            'HTA_Workshop_2025/06_Reports/workshop_metadata.json',
+            'HTA_Workshop_2025/01_Lectures/01_Foundations_of_HTA.md',
+            'HTA_Workshop_2025/03_Presentations/01_Foundations_of_HTA_presentation.pptx',
+            'HTA_Workshop_2025/04_Infographics/hta_concept_flow.png',
+            'HTA_Workshop_2025/02_Quizzes/hta_questions.csv',
+            'HTA_Workshop_2025/05_Admin_Forms/registration_form.gs',
+            'HTA_Workshop_2025/06_Reports/hta_dashboard.py'
+        ]
+
+        report = verify_package(zip_filename, required_files)
+
+        # Machine-readable report next to the package
+        report_filename = f"{os.path.splitext(zip_filename)[0]}.verify.json"
+        with open(report_filename, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+        if report['missing_required']:
+            print(f"⚠️  Warning: Missing files: {report['missing_required']}")
+        for problem in report['problems']:
+            print(f"⚠️  Warning: {problem['arcname']}: {problem['problem']}")
+
+        if report['ok']:
+            print(f"✅ Package integrity verified ({report['entries']} entries "
+                  f"in {report['elapsed_seconds']:.2f}s)")
+        return report['ok']
 
     except Exception as e:
         print(f"Error verifying package: {e}")
@@ -244,122 +100,7 @@ def verify_package_integrity(zip_filename):
 
 def create_workflow_log():
     """Create detailed workflow execution log"""
-    workflow_log = f"""
-# HTA Workshop Package Generation Log
-
-Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-## Pipeline Execution Summary
-
-### Phase 1: Infrastructure Setup
-✅ Project folder structure created
-✅ README documentation generated
-✅ Workshop metadata extracted
-
-### Phase 2: Content Development
-✅ 6 Comprehensive lecture modules created
-✅ 6 Professional PowerPoint presentations generated
-✅ 4 Educational infographics designed
-✅ 60-question quiz system development
-✅ Registration form automation implemented
-
-### Phase 3: Analytics & Administration
-✅ Real-time analytics dashboard created
-✅ Automated email confirmation system
-✅ QR code check-in integration
-✅ Payment tracking capabilities
-
-### Phase 4: Quality Assurance
-✅ Content validation completed
-✅ Technical compatibility verified
-✅ Educational standards met
-✅ Indian healthcare context integrated
-
-### Phase 5: Packaging & Delivery
-Processing Time: Instant (automated pipeline)
-Package Integrity: Verified
-Total Files: 20+ components
-Compression: ZIP format
-
-## Technical Specifications
-
-### Educational Content
-- Lectures: 6 modules (80+ pages each)
-- Presentations: 10 slides per topic (60+ slides total)
-- Infographics: 4 high-resolution PNG files
-- Assessment: 60 multiple-choice questions
-
-### Administrative Tools
-- Registration: Automated Google Forms system
-- Analytics: Streamlit dashboard with 7+ views
-- Reports: Comprehensive data visualization
-- Certificates: Automated generation pipeline
-
-### Technical Compatibility
-- OS Support: Windows, macOS, Linux
-- Browser Support: Chrome, Firefox, Safari, Edge
-- Cloud Integration: Google Workspace ready
-- Data Security: GDPR compliant
-
-## Deployment Instructions
-
-### Quick Start
-1. Unzip HTA_Workshop_Package_2025.zip
-2. Open HTA_Workshop_2025 folder
-3. Read README.md for detailed setup
-4. Deploy in order: Forms → Presentations → Dashboard
-
-### Recommended Workflow
-1. **Week 1-2**: Setup registration system
-2. **Week 3-4**: Prepare venues and materials
-3. **Workshop Days**: Deploy presentations and analytics
-4. **Post-Workshop**: Generate certificates and reports
-
-## Quality Metrics
-
-### Content Quality
-- Medical accuracy: Verified by clinical standards
-- Academic depth: PG resident level
-- Cultural relevance: Indian healthcare context
-- Pedagogical effectiveness: Interactive learning
-
-### Technical Quality
-- Automation level: 95% automated
-- Error handling: Comprehensive
-- Performance: Optimized for 50+ participants
-- Scalability: Modular architecture
-
-## Future Maintenance
-
-### Version Control
-- v1.0 - Initial release
-- Template system for updates
-- Backward compatibility guaranteed
-
-### Support Channels
-- Documentation: Complete user guides
-- Training videos: Step-by-step tutorials
-- Support desk: coordinator@pgimer.edu.in
-- Community forum: Planned for Q2 2025
-
-## Acknowledgments
-
-### Development Team
-- Cline AI Assistant: Content creation and automation
-- PGIMER Faculty: Medical expertise and validation
-- NAMSCON Partners: Policy insights and guidance
-
-### Partners & Contributors
-- Ministry of Health and Family Welfare
-- WHO CHOICE Program
-- National Health Systems Resource Centre
-- Various medical institutions and experts
-
----
-
-*Package generation completed successfully*
-*Ready for distribution and deployment*
-"""
+    workflow_log = render_report('workflow_log')
 
     # Save workflow log
     with open("HTA_Workshop_2025/06_Reports/workflow_log.txt", 'w', encoding='utf-8') as f:
@@ -391,7 +132,8 @@ def main():
 
                 # Display package summary
                 package_size = os.path.getsize(zip_filename) / (1024 * 1024)  # MB
-                print(".2f"                print("\n📋 Package Contents Summary:")
+                print(f"📦 Package size: {package_size:.2f} MB")
+                print("\n📋 Package Contents Summary:")
                 print("   📚 1. Lectures (6 modules)")
                 print("   📊 2. Presentations (6 PowerPoint decks)")
                 print("   🎨 3. Infographics (4 visual aids)")
@@ -400,8 +142,12 @@ def main():
                 print("   📈 6. Analytics Dashboard (comprehensive)")
                 print("   📄 7. Documentation & Reports")
 
-                print("
-🎯 Deployment Ready!"                print("   1. Unzip the package"                print("   2. Read README.md"                print("   3. Deploy registration form"                print("   4. Launch analytics dashboard"                print("   5. Start workshop delivery!"
+                print("\n🎯 Deployment Ready!")
+                print("   1. Unzip the package")
+                print("   2. Read README.md")
+                print("   3. Deploy registration form")
+                print("   4. Launch analytics dashboard")
+                print("   5. Start workshop delivery!")
                 return True
             else:
                 print("❌ Package verification failed!")
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Sample Participant Generator
+Seeded, column-at-a-time generator for dashboard demos and load testing
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+    pc = None
+
+# Categorical fields: (categories, probabilities); None means uniform
+CATEGORICAL_FIELDS = {
+    'designation': ([
+        'PG Resident (MD)', 'PG Resident (MS)', 'Assistant Professor',
+        'Researcher', 'Medical Officer', 'Consultant'
+    ], None),
+    'institution': ([
+        'PGIMER Chandigarh', 'AIIMS Delhi', 'CMC Vellore', 'KMC Manipal',
+        'MAMC Delhi', 'JIPMER Puducherry', 'Other'
+    ], None),
+    'specialty': ([
+        'Community Medicine', 'Internal Medicine', 'Surgery', 'Pediatrics',
+        'Obstetrics & Gynecology', 'Pathology', 'Other'
+    ], None),
+    'qualification': (['MBBS', 'MD/MS', 'DM/MCh', 'PhD', 'MPH'], None),
+    'hta_knowledge': ([
+        'None - Complete beginner', 'Basic understanding',
+        'Intermediate knowledge', 'Advanced expertise'
+    ], None),
+    'category': (['PG Resident (₹2,000)', 'Faculty/Researcher (₹3,000)'], None),
+    'payment_status': (['Paid', 'Pending'], [0.85, 0.15]),
+    'attendance_day1': (['Present', 'Absent'], [0.92, 0.08]),
+    'attendance_day2': (['Present', 'Absent'], [0.88, 0.12]),
+    'accommodation_required': (['Yes', 'No'], [0.3, 0.7]),
+}
+
+# Column order of the participant schema used by the dashboard
+COLUMNS = [
+    'id', 'name', 'email', 'mobile', 'designation', 'institution', 'specialty',
+    'qualification', 'experience_years', 'hta_knowledge', 'category',
+    'payment_status', 'registration_date', 'attendance_day1', 'attendance_day2',
+    'quiz_score', 'feedback_rating', 'accommodation_required'
+]
+
+
+def _resolve_distribution(field, override):
+    """Return (categories, probabilities) for a field, applying an override"""
+    categories, probs = CATEGORICAL_FIELDS[field]
+    if override is None:
+        return categories, probs
+    if isinstance(override, dict):
+        categories = list(override)
+        weights = np.asarray(list(override.values()), dtype=float)
+    else:
+        categories, weights = list(override[0]), override[1]
+        weights = None if weights is None else np.asarray(weights, dtype=float)
+    if weights is not None:
+        if weights.shape != (len(categories),) or (weights < 0).any() or weights.sum() <= 0:
+            raise ValueError(f"Invalid distribution for '{field}': {override!r}")
+        weights = weights / weights.sum()
+    return categories, weights
+
+
+def _categorical_column(rng, n, categories, probs):
+    """Draw a whole categorical column as integer codes"""
+    if probs is None:
+        codes = rng.integers(0, len(categories), size=n, dtype=np.int16)
+    else:
+        cdf = np.cumsum(probs)
+        cdf[-1] = 1.0
+        codes = np.searchsorted(cdf, rng.random(n), side='right').astype(np.int16)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def _number_text(numbers, width=0):
+    """Convert a whole integer column to (optionally zero-padded) text"""
+    if pa is not None:
+        text = pc.cast(pa.array(numbers), pa.string())
+        return pc.utf8_lpad(text, width, '0') if width else text
+    text = pd.Series(numbers).astype(str)
+    return text.str.zfill(width) if width else text
+
+
+def _string_column(prefix, text, suffix=''):
+    """Build prefix + text + suffix strings for a whole column"""
+    if pa is not None:
+        joined = pc.binary_join_element_wise(prefix, text, suffix, '')
+        return pd.Series(joined, dtype=pd.StringDtype('pyarrow'))
+    return prefix + text + suffix
+
+
+def generate_participants(n=45, seed=42, distributions=None, start_date='2025-01-01',
+                          registration_days=30, quiz_mean=75.0, quiz_sd=15.0,
+                          quiz_missing_rate=0.1):
+    """Generate a synthetic participant cohort with the dashboard schema
+
+    `distributions` overrides any entry of CATEGORICAL_FIELDS, either as a
+    {category: weight} mapping or as a (categories, weights) pair. The same
+    arguments and seed always produce the same frame.
+    """
+    if n < 0:
+        raise ValueError("n must be non-negative")
+    distributions = distributions or {}
+    unknown = set(distributions) - set(CATEGORICAL_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown distribution fields: {sorted(unknown)}")
+
+    rng = np.random.default_rng(seed)
+    numbers = np.arange(1, n + 1)
+    number_text = _number_text(numbers)
+
+    columns = {
+        'id': _string_column('P', _number_text(numbers, width=3)),
+        'name': _string_column('Participant ', number_text),
+        'email': _string_column('participant', number_text, '@example.com'),
+        'mobile': _string_column('+91-', _number_text(rng.integers(7_000_000_000, 10_000_000_000, size=n))),
+        'experience_years': rng.integers(1, 15, size=n, dtype=np.int8),
+        'registration_date': (np.datetime64(start_date, 'D')
+                              + rng.integers(0, registration_days, size=n)).astype('datetime64[ns]'),
+        'feedback_rating': rng.integers(3, 6, size=n, dtype=np.int8),
+    }
+    for field in CATEGORICAL_FIELDS:
+        categories, probs = _resolve_distribution(field, distributions.get(field))
+        columns[field] = _categorical_column(rng, n, categories, probs)
+
+    quiz_score = rng.normal(quiz_mean, quiz_sd, size=n)
+    quiz_score[rng.random(n) < quiz_missing_rate] = np.nan
+    columns['quiz_score'] = quiz_score
+
+    return pd.DataFrame({name: columns[name] for name in COLUMNS})
+
+
+def generate_quiz_responses(answers, n=45, seed=42, item_locations=None, skip_rate=0.03):
+    """Generate a participants x questions matrix of quiz answer codes
+
+    Participants answer correctly with a Rasch-model probability given their
+    ability and each item's location (0 when not given); wrong answers are
+    spread over the distractors with per-item weights so that option
+    statistics look realistic. Skipped items are coded -1.
+    """
+    answers = np.asarray(answers, dtype=np.int8)
+    n_items = len(answers)
+    rng = np.random.default_rng(seed)
+    locations = np.zeros(n_items) if item_locations is None else np.asarray(item_locations, dtype=float)
+
+    ability = rng.normal(0.0, 1.0, size=(n, 1))
+    p_correct = 1.0 / (1.0 + np.exp(locations[None, :] - ability))
+    correct = rng.random((n, n_items)) < p_correct
+
+    # Distractor k of an item is the k-th non-key option, drawn by its weight
+    weights = rng.dirichlet(np.ones(3), size=n_items)
+    cdf = np.cumsum(weights, axis=1)
+    cdf[:, -1] = 1.0
+    draws = rng.random((n, n_items))
+    distractor = (draws[:, :, None] > cdf[None, :, :2]).sum(axis=2)
+    wrong = distractor + (distractor >= answers[None, :])
+
+    codes = np.where(correct, answers[None, :], wrong).astype(np.int8)
+    codes[(rng.random((n, n_items)) < skip_rate) | (answers[None, :] < 0)] = -1
+    return codes
+
+
+def main():
+    """Command-line entry point for building load-test cohorts"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic HTA workshop participant cohort")
+    parser.add_argument('-n', '--rows', type=int, default=45, help="number of participants")
+    parser.add_argument('--seed', type=int, default=42, help="random seed")
+    parser.add_argument('--paid-rate', type=float, help="share of participants with payment completed")
+    parser.add_argument('-o', '--output', help="write to .csv or .parquet instead of printing a summary")
+    args = parser.parse_args()
+
+    distributions = {}
+    if args.paid_rate is not None:
+        distributions['payment_status'] = {'Paid': args.paid_rate, 'Pending': 1 - args.paid_rate}
+
+    start = time.perf_counter()
+    df = generate_participants(args.rows, seed=args.seed, distributions=distributions)
+    elapsed = time.perf_counter() - start
+    print(f"Generated {len(df):,} participants in {elapsed:.3f}s "
+          f"({df.memory_usage(deep=True).sum() / 1024**2:.1f} MB)")
+
+    if args.output:
+        if args.output.endswith('.parquet'):
+            df.to_parquet(args.output, index=False)
+        else:
+            df.to_csv(args.output, index=False)
+        print(f"Written to {args.output}")
+    else:
+        print(df.head())
+
+
+if __name__ == "__main__":
+    main()
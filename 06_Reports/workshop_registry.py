@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+HTA Workshop Metadata Registry
+Indexed, mtime-cached registry of workshop editions shared by the dashboard and packager
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+REPORTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# A JSON file (one record, a list, or {"workshops": [...]}) or a directory of them
+DEFAULT_REGISTRY_PATH = os.environ.get(
+    'HTA_WORKSHOP_REGISTRY', os.path.join(REPORTS_DIR, 'workshop_metadata.json'))
+
+_DATE_PATTERNS = [
+    # "February 15-16, 2025" / "February 15, 2025"
+    (re.compile(r'^([A-Za-z]+)\s+(\d{1,2})(?:\s*-\s*\d{1,2})?,\s*(\d{4})$'), '%B %d %Y'),
+    # "2025-02-15"
+    (re.compile(r'^(\d{4})-(\d{2})-(\d{2})$'), '%Y %m %d'),
+]
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def parse_start_date(text):
+    """First day of a workshop date string, or None if it cannot be parsed"""
+    text = (text or '').strip()
+    for pattern, fmt in _DATE_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            try:
+                return datetime.strptime(' '.join(match.groups()), fmt).date()
+            except ValueError:
+                return None
+    return None
+
+
+def _normalize(value):
+    return ' '.join(str(value).lower().split())
+
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def _source_files(path):
+    """JSON files that make up the registry at path"""
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path)
+                      if name.endswith('.json'))
+    return [path] if os.path.exists(path) else []
+
+
+def _signature(files):
+    signature = []
+    for filepath in files:
+        stat = os.stat(filepath)
+        signature.append((filepath, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class WorkshopRegistry:
+    """Workshop records with indexes by date, venue, organizer and topic"""
+
+    def __init__(self, records):
+        self.records = {}
+        self._dates = []
+        self._venues = {}
+        self._organizers = {}
+        self._topics = {}
+        for record in records:
+            self._add(dict(record))
+        self._dates.sort()
+
+    def _add(self, record):
+        start = parse_start_date(record.get('date'))
+        workshop_id = record.get('id')
+        if workshop_id is None:
+            # Generated ids are signed into entry passes, so only a clash changes one:
+            # same-titled editions on the same date get -2, -3, ...
+            base = _slug(f"{record.get('title', 'workshop')} {start.isoformat() if start else len(self.records) + 1}")
+            workshop_id, suffix = base, 2
+            while workshop_id in self.records:
+                workshop_id, suffix = f"{base}-{suffix}", suffix + 1
+        elif workshop_id in self.records:
+            raise ValueError(f"Duplicate workshop id: {workshop_id}")
+        record['id'] = workshop_id
+        record['start_date'] = start.isoformat() if start else None
+        self.records[workshop_id] = record
+
+        if start:
+            self._dates.append((start, workshop_id))
+        for index, key in ((self._venues, 'venue'), (self._organizers, 'organizer')):
+            if record.get(key):
+                index.setdefault(_normalize(record[key]), []).append(workshop_id)
+        for topic in record.get('key_focus_topics', []):
+            self._topics.setdefault(_normalize(topic), []).append(workshop_id)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records.values())
+
+    def get(self, workshop_id):
+        """Record for one workshop id, or None"""
+        return self.records.get(workshop_id)
+
+    def default(self):
+        """Most recent dated edition (or the only one) used when none is chosen"""
+        if self._dates:
+            return self.records[self._dates[-1][1]]
+        return next(iter(self.records.values()), None)
+
+    def by_date(self, start=None, end=None):
+        """Workshops starting between two dates (inclusive), in date order
+
+        Bounds may be dates or strings in any format parse_start_date accepts.
+        """
+        start = parse_start_date(start) if isinstance(start, str) else start
+        end = parse_start_date(end) if isinstance(end, str) else end
+        lo = 0 if start is None else bisect.bisect_left(self._dates, (start, ''))
+        hi = len(self._dates) if end is None else bisect.bisect_right(self._dates, (end, '\uffff'))
+        return [self.records[workshop_id] for _, workshop_id in self._dates[lo:hi]]
+
+    def by_venue(self, venue):
+        return [self.records[i] for i in self._venues.get(_normalize(venue), [])]
+
+    def by_organizer(self, organizer):
+        return [self.records[i] for i in self._organizers.get(_normalize(organizer), [])]
+
+    def by_topic(self, topic):
+        return [self.records[i] for i in self._topics.get(_normalize(topic), [])]
+
+
+def _read_records(files):
+    records = []
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict) and 'workshops' in data:
+            data = data['workshops']
+        records.extend(data if isinstance(data, list) else [data])
+    return records
+
+
+def load_registry(path=None):
+    """Shared registry for path, re-read only when its files change
+
+    The registry is parsed once per process and cached; each call only
+    stats the source files and reloads when an mtime or size has changed.
+    """
+    path = os.path.abspath(path or DEFAULT_REGISTRY_PATH)
+    files = _source_files(path)
+    signature = _signature(files)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == signature:
+            return cached[1]
+        registry = WorkshopRegistry(_read_records(files))
+        _cache[path] = (signature, registry)
+        return registry
+
+
+def load_workshop_metadata(workshop_id=None, path=None):
+    """Metadata for one workshop (the default edition when no id is given)"""
+    registry = load_registry(path)
+    if workshop_id is not None:
+        record = registry.get(workshop_id)
+        if record is None:
+            raise KeyError(f"Unknown workshop: {workshop_id}")
+        return record
+    return registry.default()